@@ -0,0 +1,75 @@
+"""Testy API – wersje danych i przeładowanie bez blokowania żądań."""
+
+import os, sys, time, shutil, socket, threading, subprocess, urllib.request, urllib.error
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import wup_api
+
+@pytest.fixture
+def base_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(wup_api, "_DANE", {})
+    monkeypatch.setattr(wup_api, "_PRZELADOWANIA", {})
+    (tmp_path / "dane" / "zwolnienia").mkdir(parents=True)
+    return str(tmp_path)
+
+def test_przeladowanie_nie_blokuje_zadan(base_dir, monkeypatch):
+    start, koniec = threading.Event(), threading.Event()
+    wersje = iter(["v1", "v2"])
+    def wczytaj(foldery, stan):
+        w = next(wersje)
+        if w == "v2":
+            start.set(); koniec.wait(10)
+        return {"stan": stan, "wersja": w}
+    monkeypatch.setattr(wup_api, "_wczytaj", wczytaj)
+
+    assert wup_api.dane(base_dir)["wersja"] == "v1"
+    assert wup_api.dane(base_dir)["wersja"] == "v1"   # odcisk świeży – bez ponownego sprawdzania
+
+    open(os.path.join(base_dir, "dane", "zwolnienia", "2025-01.xlsx"), "wb").close()
+    wup_api._DANE[base_dir]["sprawdzono"] -= wup_api.STAN_CO
+    watek = threading.Thread(target=wup_api.dane, args=(base_dir,))
+    watek.start()
+    assert start.wait(10)
+    assert wup_api.dane(base_dir)["wersja"] == "v1"   # przeładowanie trwa – poprzednia wersja od razu
+    koniec.set(); watek.join(10)
+    assert wup_api.dane(base_dir)["wersja"] == "v2"
+
+# ══════════════════════════════════════════════════════════
+# ETAG – ta sama wersja danych po restarcie serwera
+# ══════════════════════════════════════════════════════════
+
+KATALOG = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _serwer(base_dir):
+    """Osobny proces wup_api na wolnym porcie → (proces, adres)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); port = s.getsockname()[1]
+    proces = subprocess.Popen([sys.executable, "wup_api.py", "--port", str(port), "--base-dir", base_dir],
+                              cwd=KATALOG, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    adres = f"http://127.0.0.1:{port}/api/kpi"
+    for _ in range(600):
+        try:
+            urllib.request.urlopen(adres, timeout=5).close()
+            return proces, adres
+        except OSError: time.sleep(0.1)
+    proces.kill()
+    pytest.fail("serwer API nie wystartował")
+
+def _etag(adres, poprzedni=None):
+    zadanie = urllib.request.Request(adres, headers={"If-None-Match": poprzedni} if poprzedni else {})
+    try:
+        with urllib.request.urlopen(zadanie, timeout=30) as r: return r.status, r.headers["ETag"]
+    except urllib.error.HTTPError as e: return e.code, e.headers["ETag"]
+
+def test_etag_po_restarcie_serwera(tmp_path):
+    zrodlo = os.path.join(KATALOG, "dane", "stopa_bezrobocia", "2024-07.xlsx")
+    if not os.path.exists(zrodlo): pytest.skip("brak pliku stopa_bezrobocia/2024-07.xlsx")
+    os.makedirs(tmp_path / "dane" / "stopa_bezrobocia")
+    shutil.copy(zrodlo, tmp_path / "dane" / "stopa_bezrobocia")
+    etagi = []
+    for _ in range(2):
+        proces, adres = _serwer(str(tmp_path))
+        try: etagi.append(_etag(adres, etagi[0][1] if etagi else None))
+        finally: proces.kill(); proces.wait()
+    assert etagi[0][0] == 200 and etagi[1] == (304, etagi[0][1])
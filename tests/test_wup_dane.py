@@ -0,0 +1,132 @@
+"""Testy warstwy danych (wup_dane) – bez plików z repozytorium, na folderach tymczasowych."""
+
+import os, sys, shutil, subprocess
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import wup_dane
+
+KATALOG = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _python(kod, *argv, **env):
+    """Kod w osobnym procesie (świeży import wup_dane) → stdout."""
+    return subprocess.run([sys.executable, "-c", kod, *argv], cwd=KATALOG, check=True, text=True,
+                          capture_output=True, env={**os.environ, **env}).stdout
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(wup_dane, "_STAN", {})
+    (tmp_path / "2025-01.xlsx").write_bytes(b"skoroszyt")
+    return str(tmp_path)
+
+# ══════════════════════════════════════════════════════════
+# MANIFEST – plik, którego nie udało się sparsować
+# ══════════════════════════════════════════════════════════
+
+def test_nieudane_parsowanie_ponowione_przy_odswiezeniu(folder, monkeypatch):
+    wywolania = []
+    def parser(p):
+        wywolania.append(p["sciezka"])
+        if len(wywolania) == 1:
+            raise PermissionError("plik zablokowany")
+        return pd.DataFrame({"Okres": [p["nazwa_pl"]], "Sort_key": [p["sort_key"]], "Zwolnieni": [5]})
+    sub, _, sort = wup_dane.ZBIORY["zwolnienia"]
+    monkeypatch.setitem(wup_dane.ZBIORY, "zwolnienia", (sub, parser, sort))
+
+    pliki = wup_dane.znajdz_pliki(folder)
+    assert wup_dane._aktualizuj_tabele("zwolnienia", folder, pliki).empty
+    manifest, _ = wup_dane._STAN[folder]
+    assert manifest["2025-01.xlsx"]["blad"].startswith("PermissionError")
+
+    # Ten sam plik (rozmiar, mtime, sha1) – także po restarcie procesu (manifest z dysku)
+    wup_dane._STAN.clear()
+    surowa = wup_dane._aktualizuj_tabele("zwolnienia", folder, pliki)
+    assert len(wywolania) == 2
+    assert surowa["Zwolnieni"].tolist() == [5]
+    manifest, _ = wup_dane._STAN[folder]
+    assert manifest["2025-01.xlsx"]["blad"] is None and manifest["2025-01.xlsx"]["wiersze"] == 1
+
+    wup_dane._aktualizuj_tabele("zwolnienia", folder, pliki)
+    assert len(wywolania) == 2   # udany plik nie jest parsowany ponownie
+
+# ══════════════════════════════════════════════════════════
+# SCHEMAT – liczności
+# ══════════════════════════════════════════════════════════
+
+def test_typuj_ulamek_zostaje_float():
+    df = wup_dane._typuj(pd.DataFrame({"Rok": [2025, 2025, 2025],
+                                       "Zwolnieni": [3.0, 2.5, None],
+                                       "Zgłoszeni": [4.0, None, 7.0]}))
+    assert df["Zwolnieni"].dtype == "float64" and df["Zwolnieni"].tolist()[:2] == [3.0, 2.5]
+    assert df["Zgłoszeni"].dtype == "Int32" and df["Zgłoszeni"].isna().tolist() == [False, True, False]
+    assert df["Rok"].dtype == "int16"
+
+def test_typuj_przepelnienie_zostaje_float():
+    df = wup_dane._typuj(pd.DataFrame({"Zwolnieni": [1, 2**40]}))
+    assert df["Zwolnieni"].dtype == "float64"
+
+# ══════════════════════════════════════════════════════════
+# GEOJSON – poziomy uproszczenia
+# ══════════════════════════════════════════════════════════
+
+def test_geojson_dla_zoomu_zaokragla_w_gore():
+    mapa = {"geojson": "pełny", "poziomy": {z: z for z in wup_dane.ZOOM_POZIOMY}}
+    assert wup_dane.geojson_dla_zoomu(mapa, 3) == 4
+    assert wup_dane.geojson_dla_zoomu(mapa, 5.0) == 5
+    assert wup_dane.geojson_dla_zoomu(mapa, 5.6) == 6
+    assert wup_dane.geojson_dla_zoomu(mapa, 7.2) == "pełny"
+
+def test_tolerancja_skalowana_szerokoscia():
+    assert wup_dane._tolerancja(6, 52) == pytest.approx(wup_dane._tolerancja(6) * 0.6157, rel=1e-3)
+
+# ══════════════════════════════════════════════════════════
+# WERSJE KODU – stałe między procesami
+# ══════════════════════════════════════════════════════════
+
+def test_wersje_kodu_stale_miedzy_procesami():
+    kod = "import wup_dane as w; print(w.WERSJA_ARKUSZY, w.WERSJA_KODU, w.WERSJA_GEOJSON, w.WERSJA_EKSPORTU)"
+    wersje = {_python(kod, PYTHONHASHSEED=ziarno) for ziarno in ("1", "2")}
+    assert len(wersje) == 1
+    assert wersje == {" ".join([wup_dane.WERSJA_ARKUSZY, wup_dane.WERSJA_KODU,
+                                wup_dane.WERSJA_GEOJSON, wup_dane.WERSJA_EKSPORTU]) + "\n"}
+
+# ══════════════════════════════════════════════════════════
+# TABELE – ponowne użycie w innym procesie
+# ══════════════════════════════════════════════════════════
+
+# Drugi proces: parsery podmienione na liczniki – gotowa tabela nie może ich wywołać
+WCZYTAJ_BEZ_PARSOWANIA = """
+import sys, wup_dane as w
+wywolania = []
+for n, (sub, parser, sort) in list(w.ZBIORY.items()):
+    w.ZBIORY[n] = (sub, lambda p, parser=parser: wywolania.append(p) or parser(p), sort)
+wiersze = [len(w.LOADERY[n](f"{sys.argv[1]}/dane/{w.ZBIORY[n][0]}")) for n in ("zwolnienia", "stopa_bezrobocia")]
+print(len(wywolania), *wiersze)
+"""
+
+@pytest.fixture
+def base_dir(tmp_path):
+    for sub, plik in (("zwolnienia", "IV_2025.xlsx"), ("stopa_bezrobocia", "2024-07.xlsx")):
+        zrodlo = os.path.join(KATALOG, "dane", sub, plik)
+        if not os.path.exists(zrodlo): pytest.skip(f"brak pliku {sub}/{plik}")
+        os.makedirs(tmp_path / "dane" / sub)
+        shutil.copy(zrodlo, tmp_path / "dane" / sub / plik)
+    return str(tmp_path)
+
+def test_convert_uzywany_przez_inny_proces(base_dir):
+    subprocess.run([sys.executable, "wup_dane.py", "--convert", "--workers", "1", "--base-dir", base_dir],
+                   cwd=KATALOG, check=True, capture_output=True)
+    wywolania, *wiersze = map(int, _python(WCZYTAJ_BEZ_PARSOWANIA, base_dir).split())
+    assert wywolania == 0 and all(wiersze)
+
+def test_tabela_przyrostowo_miedzy_procesami(base_dir):
+    wywolania, *_ = map(int, _python(WCZYTAJ_BEZ_PARSOWANIA, base_dir).split())
+    assert wywolania == 2   # pierwszy proces – oba pliki
+    wywolania, *wiersze = map(int, _python(WCZYTAJ_BEZ_PARSOWANIA, base_dir).split())
+    assert wywolania == 0 and all(wiersze)   # kolejny – gotowa tabela.parquet z manifestem
+    zrodlo = os.path.join(KATALOG, "dane", "stopa_bezrobocia", "2024-08.xlsx")
+    if not os.path.exists(zrodlo): pytest.skip("brak pliku stopa_bezrobocia/2024-08.xlsx")
+    shutil.copy(zrodlo, os.path.join(base_dir, "dane", "stopa_bezrobocia"))
+    wywolania, _, stopa = map(int, _python(WCZYTAJ_BEZ_PARSOWANIA, base_dir).split())
+    assert wywolania == 1 and stopa > wiersze[1]   # tylko nowy plik
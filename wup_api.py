@@ -0,0 +1,252 @@
+"""
+WUP Mazowieckie – API HTTP/JSON (tylko odczyt)
+==============================================
+Bezgłowy proces na tej samej warstwie danych co aplikacja (wup_dane) – dla intranetu
+i odświeżeń BI zamiast scrapowania UI Streamlit albo ponownego parsowania XLSX.
+
+    python wup_api.py [--host 127.0.0.1] [--port 8502] [--base-dir ...]
+
+Endpointy (GET/HEAD, listy wartości po przecinku):
+    /api                   – lista endpointów, wersja danych
+    /api/kpi               – najnowsze KPI Mazowsza i m. Warszawy z deltami m/m i r/r
+    /api/migawka[?zbior=...][&typ=...]
+                           – najnowsze wartości wszystkich jednostek (wup_dane.migawka)
+    /api/szereg?miara=Stopa|Stan_koniec[&powiat=...][&od=RRRRMM][&do=RRRRMM]
+                           – szeregi czasowe powiatów
+    /api/zwolnienia[?by=Okres,Powiat,PKD][&okres=...][&powiat=...][&pkd=...]
+                           – sumy zwolnień grupowych (kostka) + liczba firm
+
+ETag i Last-Modified wynikają z wersji zbiorów (odcisk plików + wersja kodu) – te same
+po restarcie i w każdym procesie API na tych danych, więc klient odpytuje warunkowo
+(If-None-Match / If-Modified-Since → 304).
+Odpowiedzi kompresowane gzip, gdy klient wysyła Accept-Encoding: gzip.
+"""
+
+import os, sys, json, gzip, time, hashlib, argparse, threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pandas as pd
+import wup_dane
+from wup_dane import BASE_DIR
+
+ODPOWIEDZI_LIMIT = 256   # zapamiętane ciała odpowiedzi na wersję danych (LRU)
+GZIP_OD = 512            # mniejszych odpowiedzi nie kompresujemy
+
+MIARY_SZEREGU = {"Stopa": ("stopa_bezrobocia", "Nazwa"), "Stan_koniec": ("bezrobocie", "Region")}
+WYMIARY_ZWOLNIEN = wup_dane.KOSTKA_WYMIARY + ["Nazwa"]
+
+# ══════════════════════════════════════════════════════════
+# DANE – wczytanie i wersja
+# ══════════════════════════════════════════════════════════
+# base_dir → {"stan","wersja","zmiana","ramki","kostka","migawka","odpowiedzi","sprawdzono"};
+# przeładowanie (przyrostowe – wup_dane) tylko, gdy zmieni się odcisk plików któregoś zbioru.
+# Odcisk sprawdzany co STAN_CO s. Nowa wersja budowana poza _DANE_LOCK (blokada przeładowania
+# per base_dir) i podmieniana na końcu – w trakcie żądania dostają poprzednią wersję (i 304).
+
+STAN_CO = 2.0   # s – jak często żądania sprawdzają odcisk plików (stat folderów danych)
+
+_DANE = {}
+_DANE_LOCK = threading.Lock()   # krótko: odczyt/podmiana _DANE, LRU odpowiedzi
+_PRZELADOWANIA = {}             # base_dir → Lock – jedno przeładowanie naraz
+
+def _przeladowanie(base_dir):
+    with _DANE_LOCK:
+        return _PRZELADOWANIA.setdefault(base_dir, threading.Lock())
+
+def _wczytaj(foldery, stan):
+    ramki = {n: wup_dane.LOADERY[n](f) for n, f in foldery.items() if os.path.isdir(f)}
+    mtime = max((m for s in stan for (_, _, m) in s), default=time.time_ns())
+    return {"stan": stan, "ramki": ramki, "odpowiedzi": OrderedDict(),
+            "wersja": hashlib.sha1(repr([wup_dane.WERSJA_SCHEMATU, wup_dane.WERSJA_KODU, stan])
+                                   .encode()).hexdigest()[:16],
+            "zmiana": mtime // 10**9,
+            "kostka": wup_dane.kostka_zwolnien(ramki.get("zwolnienia", pd.DataFrame())),
+            "migawka": wup_dane.migawka(ramki)}
+
+def _swieze(d):
+    return d is not None and time.monotonic() - d["sprawdzono"] < STAN_CO
+
+def dane(base_dir=BASE_DIR):
+    """Bieżąca wersja danych base_dir; czeka na wczytanie tylko, gdy nie ma jeszcze żadnej."""
+    with _DANE_LOCK:
+        d = _DANE.get(base_dir)
+    if _swieze(d): return d
+    blokada = _przeladowanie(base_dir)
+    if not blokada.acquire(blocking=d is None):
+        return d   # inny wątek sprawdza/przeładowuje – do podmiany poprzednia wersja
+    try:
+        with _DANE_LOCK:
+            d = _DANE.get(base_dir)
+        if _swieze(d): return d
+        foldery = {n: os.path.join(base_dir, "dane", sub) for n, (sub, _, _) in wup_dane.ZBIORY.items()}
+        stan = tuple(wup_dane.stan_folderu(f) if os.path.isdir(f) else () for f in foldery.values())
+        if d is None or d["stan"] != stan:
+            d = _wczytaj(foldery, stan)
+        d["sprawdzono"] = time.monotonic()
+        with _DANE_LOCK:
+            _DANE[base_dir] = d
+        return d
+    finally:
+        blokada.release()
+
+# ══════════════════════════════════════════════════════════
+# ENDPOINTY – parametry zapytania → obiekt JSON
+# ══════════════════════════════════════════════════════════
+
+def _lista(param, nazwa):
+    wartosci = [v.strip() for w in param.get(nazwa, []) for v in w.split(",") if v.strip()]
+    return wartosci or None
+
+def _rekordy(df):
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+def api_indeks(d, param):
+    return {"endpointy": {"/api/kpi": "najnowsze KPI Mazowsza i m. Warszawy",
+                          "/api/migawka": "najnowsze wartości jednostek: zbior, typ",
+                          "/api/szereg": "szereg powiatów: miara=" + "|".join(MIARY_SZEREGU) + ", powiat, od, do",
+                          "/api/zwolnienia": "sumy zwolnień: by=" + ",".join(WYMIARY_ZWOLNIEN) + ", okres, powiat, pkd"},
+            "zbiory": {n: len(df) for n, df in d["ramki"].items()}}
+
+def api_kpi(d, param):
+    return {"kpi": _rekordy(wup_dane.kpi_najnowsze(d["migawka"]))}
+
+def api_migawka(d, param):
+    m = d["migawka"]
+    for nazwa, kol in (("zbior", "Zbiór"), ("typ", "Typ")):
+        if _lista(param, nazwa): m = m[m[kol].isin(_lista(param, nazwa))]
+    return {"migawka": _rekordy(m)}
+
+def api_szereg(d, param):
+    miara = (_lista(param, "miara") or ["Stopa"])[0]
+    if miara not in MIARY_SZEREGU:
+        raise ValueError(f"miara: jedna z {', '.join(MIARY_SZEREGU)}")
+    zbior, kol = MIARY_SZEREGU[miara]
+    df = d["ramki"].get(zbior)
+    if df is None or df.empty:
+        return {"miara": miara, "szereg": []}
+    m = df["Typ"] == "powiat"
+    powiaty = _lista(param, "powiat")
+    if powiaty:
+        m &= df[kol].astype(str).str.casefold().isin({p.casefold() for p in powiaty})
+    for nazwa, porownanie in (("od", df["Sort_key"].ge), ("do", df["Sort_key"].le)):
+        if _lista(param, nazwa):
+            try: m &= porownanie(int(_lista(param, nazwa)[0]))
+            except ValueError: raise ValueError(f"{nazwa}: okres w postaci RRRRMM")
+    wynik = (df.loc[m, [kol, "Okres", "Rok", "Miesiąc_num", "Sort_key", miara]]
+               .rename(columns={kol: "Powiat"}).sort_values(["Powiat", "Sort_key"]))
+    wynik["Okres"] = wynik["Okres"].astype(str)
+    return {"miara": miara, "szereg": _rekordy(wynik)}
+
+def api_zwolnienia(d, param):
+    by = _lista(param, "by") or ["Okres"]
+    if set(by) - set(WYMIARY_ZWOLNIEN):
+        raise ValueError(f"by: wymiary z {', '.join(WYMIARY_ZWOLNIEN)}")
+    wybor = wup_dane.wybierz_z_kostki(d["kostka"], _lista(param, "okres"), _lista(param, "pkd"),
+                                      _lista(param, "powiat"))
+    if wybor["firmy"].empty:
+        return {"by": by, "zwolnienia": []}
+    wynik = wup_dane.agreguj_zwolnienia(wybor, by, firmy=True)
+    for k in wynik.columns.intersection(by): wynik[k] = wynik[k].astype(str)
+    return {"by": by, "zwolnienia": _rekordy(wynik)}
+
+ENDPOINTY = {"/api": api_indeks, "/api/kpi": api_kpi, "/api/migawka": api_migawka,
+             "/api/szereg": api_szereg, "/api/zwolnienia": api_zwolnienia}
+
+def odpowiedz(d, sciezka, zapytanie):
+    """(ciało JSON, ciało gzip) dla wersji danych d – liczone raz, potem z LRU."""
+    klucz = (sciezka, zapytanie)
+    with _DANE_LOCK:
+        if klucz in d["odpowiedzi"]:
+            d["odpowiedzi"].move_to_end(klucz)
+            return d["odpowiedzi"][klucz]
+    obiekt = ENDPOINTY[sciezka](d, parse_qs(zapytanie))
+    cialo = json.dumps({"wersja": d["wersja"], **obiekt}, ensure_ascii=False, separators=(",", ":")).encode()
+    wynik = (cialo, gzip.compress(cialo, 6) if len(cialo) >= GZIP_OD else None)
+    with _DANE_LOCK:
+        d["odpowiedzi"][klucz] = wynik
+        while len(d["odpowiedzi"]) > ODPOWIEDZI_LIMIT:
+            d["odpowiedzi"].popitem(last=False)
+    return wynik
+
+# ══════════════════════════════════════════════════════════
+# SERWER HTTP
+# ══════════════════════════════════════════════════════════
+
+class Obsluga(BaseHTTPRequestHandler):
+    base_dir = BASE_DIR
+    server_version = "wup-api/1"
+
+    def _wyslij(self, kod, cialo=b"", naglowki=()):
+        self.send_response(kod)
+        for k, v in naglowki: self.send_header(k, v)
+        self.send_header("Content-Length", str(len(cialo)))
+        self.end_headers()
+        if self.command != "HEAD": self.wfile.write(cialo)
+
+    def _blad(self, kod, tekst):
+        cialo = json.dumps({"blad": tekst}, ensure_ascii=False).encode()
+        self._wyslij(kod, cialo, [("Content-Type", "application/json; charset=utf-8")])
+
+    def _niezmienione(self, etag, zmiana):
+        inm = self.headers.get("If-None-Match")
+        if inm is not None:
+            return inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))
+        ims = self.headers.get("If-Modified-Since")
+        try: return ims is not None and zmiana <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError): return False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        sciezka = url.path.rstrip("/") or "/api"
+        if sciezka not in ENDPOINTY:
+            return self._blad(404, f"nieznany endpoint {url.path}")
+        try:
+            d = dane(self.base_dir)
+            # Słaby ETag – ta sama wersja danych w wariancie gzip i bez kompresji
+            etag = f'W/"{d["wersja"]}"'
+            naglowki = [("ETag", etag), ("Last-Modified", formatdate(d["zmiana"], usegmt=True)),
+                        ("Cache-Control", "no-cache"), ("Vary", "Accept-Encoding")]
+            if self._niezmienione(etag, d["zmiana"]):
+                return self._wyslij(304, naglowki=naglowki)
+            cialo, spakowane = odpowiedz(d, sciezka, url.query)
+        except ValueError as e:
+            return self._blad(400, str(e))
+        except Exception as e:
+            self.log_error("%s: %r", self.path, e)
+            return self._blad(500, "błąd serwera")
+        naglowki.append(("Content-Type", "application/json; charset=utf-8"))
+        if spakowane is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            cialo = spakowane
+            naglowki.append(("Content-Encoding", "gzip"))
+        self._wyslij(200, cialo, naglowki)
+
+    do_HEAD = do_GET
+
+def uruchom(host="127.0.0.1", port=8502, base_dir=BASE_DIR):
+    obsluga = type("Obsluga", (Obsluga,), {"base_dir": base_dir})
+    serwer = ThreadingHTTPServer((host, port), obsluga)
+    serwer.daemon_threads = True
+    return serwer
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WUP Mazowieckie – API HTTP/JSON (tylko odczyt)")
+    parser.add_argument("--host", default="127.0.0.1", help="adres nasłuchu (domyślnie tylko lokalnie)")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--base-dir", default=BASE_DIR, help="folder zawierający dane/")
+    args = parser.parse_args(argv)
+    serwer = uruchom(args.host, args.port, args.base_dir)
+    t0 = time.perf_counter()
+    dane(args.base_dir)   # rozgrzanie – pierwsze żądanie nie czeka na wczytanie
+    print(f"Dane wczytane w {time.perf_counter()-t0:.1f} s · http://{args.host}:{args.port}/api")
+    try:
+        serwer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serwer.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,18 +13,34 @@ Struktura folderów:
     wojewodztwa.geojson     ← granice województw Polski
 
 Optymalizacja:
-    - Konwersja XLSX → Parquet (uruchom raz: python wup_auto_app.py --convert)
-    - @st.cache_data na wszystkich wczytaniach
-    - Logika danych oddzielona od UI (funkcje w sekcji DATA_LAYER)
+    - Konwersja XLSX → Parquet (uruchom raz: python wup_auto_app.py --convert [--workers N])
+    - @st.cache_resource na wczytaniach – ramki współdzielone przez sesje, bez kopii
+    - Zbiory i GeoJSON wczytywane równolegle w tle; strona czeka tylko na swoje zbiory
+    - Logika danych oddzielona od UI (moduł wup_dane.py)
+    - Figury Plotly w LRU wspólnym dla sesji (klucz: odcisk zbioru + parametry wykresu)
+    - Pomiary: WUP_POMIARY=1 streamlit run wup_auto_app.py – spany loaderów, plików,
+      arkuszy, bloków stron i wykresów (panel 🩺 Diagnostyka, logi JSON, plik Prometheus)
 """
 
-import os, re, glob, json, argparse, sys
+import os, sys, time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import wup_dane
+from wup_dane import BASE_DIR
+
+if __name__ == "__main__" and {"--convert","--memory","--sql"} & set(sys.argv[1:]):
+    sys.exit(wup_dane.main(sys.argv[1:]))
+
+# Ramki z cache są współdzielone przez wszystkie sesje (cache_resource) – strony
+# tylko je czytają; Copy-on-Write kopiuje dane dopiero przy zapisie do ramki pochodnej.
+pd.set_option("mode.copy_on_write", True)
+
+# Span całego przebiegu skryptu (wup_dane.pomiar) – przy wyłączonych pomiarach pusty
+pomiar_przebiegu = wup_dane.przebieg()
 
 # ══════════════════════════════════════════════════════════
 # KONFIGURACJA
@@ -35,21 +51,6 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-MIESIAC_PL = {
-    1:"Styczeń",2:"Luty",3:"Marzec",4:"Kwiecień",5:"Maj",6:"Czerwiec",
-    7:"Lipiec",8:"Sierpień",9:"Wrzesień",10:"Październik",11:"Listopad",12:"Grudzień"
-}
-ROMAN = {"I":1,"II":2,"III":3,"IV":4,"V":5,"VI":6,
-         "VII":7,"VIII":8,"IX":9,"X":10,"XI":11,"XII":12}
-PL_NAMES = {
-    "styczen":1,"styczeń":1,"luty":2,"marzec":3,"kwiecien":4,"kwiecień":4,
-    "maj":5,"czerwiec":6,"lipiec":7,"sierpien":8,"sierpień":8,
-    "wrzesien":9,"wrzesień":9,"pazdziernik":10,"październik":10,
-    "listopad":11,"grudzien":12,"grudzień":12,
-}
-
 # Kolory brandingowe WUP / Mazowsze
 C_RED    = "#c0392b"   # główny akcent – czerwień mazowiecka
 C_RED2   = "#e74c3c"   # jaśniejszy czerwony
@@ -163,333 +164,127 @@ hr { border-color: #e2e8f0 !important; margin: 14px 0 !important; }
 """, unsafe_allow_html=True)
 
 # ══════════════════════════════════════════════════════════
-# DATA LAYER – logika wczytywania (oddzielona od UI)
+# DATA LAYER – logika wczytywania w wup_dane.py (tu tylko cache Streamlit)
 # ══════════════════════════════════════════════════════════
-
-PKD_OPISY = {
-    "6419Z":"Usługi kredytowe","6499Z":"Inne usługi finansowe",
-    "6619Z":"Wspomaganie finansów","6622Z":"Agenci ubezpieczeniowi",
-    "6110Z":"Telekomunikacja przewodowa","6120Z":"Telekomunikacja bezprzewodowa",
-    "6190Z":"Pozostała telekomunikacja","6201Z":"Oprogramowanie",
-    "6202Z":"Doradztwo IT","6209Z":"Inne usługi IT",
-    "6311Z":"Przetwarzanie danych","6312Z":"Portale internetowe",
-    "4711Z":"Handel detaliczny","4719Z":"Handel detaliczny (inne)",
-    "4920Z":"Transport kolejowy towarów","5310Z":"Poczta",
-    "5320Z":"Usługi kurierskie","2042Z":"Chemia gospodarcza",
-    "2222Z":"Opakowania z tworzyw","2351Z":"Produkcja cementu",
-    "2910B":"Produkcja pojazdów","7311Z":"Agencje reklamowe",
-    "7021Z":"Public relations","8220Z":"Call center",
-    "9200Z":"Gry losowe i zakłady",
-}
-
-def normalizuj_pkd(pkd):
-    return re.sub(r'[.\s]', '', str(pkd).strip()).upper()
-
-def parsuj_nazwe(nazwa):
-    m = re.match(r'^(\d{4})[-_.](\d{1,2})$', nazwa)
-    if m: return int(m.group(1)), int(m.group(2))
-    m = re.match(r'^(\d{1,2})[-_.](\d{4})$', nazwa)
-    if m: return int(m.group(2)), int(m.group(1))
-    m = re.match(r'^(X{0,3}(?:IX|IV|V?I{0,3}))[-_.](\d{4})$', nazwa, re.IGNORECASE)
-    if m and m.group(1).upper() in ROMAN: return int(m.group(2)), ROMAN[m.group(1).upper()]
-    m = re.match(r'^([a-ząćęłńóśźż]+)[-_.](\d{4})$', nazwa, re.IGNORECASE)
-    if m and m.group(1).lower() in PL_NAMES: return int(m.group(2)), PL_NAMES[m.group(1).lower()]
-    return None
-
-def znajdz_pliki(folder):
-    wyniki = []
-    wszystkie = glob.glob(os.path.join(folder,"*.xlsx")) + glob.glob(os.path.join(folder,"*.xls"))
-    seen = set()
-    for s in wszystkie:
-        if s.lower() not in seen:
-            seen.add(s.lower())
-            nazwa = os.path.splitext(os.path.basename(s))[0]
-            parsed = parsuj_nazwe(nazwa)
-            if parsed:
-                r,m = parsed
-                if 1<=m<=12 and 2000<=r<=2100:
-                    wyniki.append({"sciezka":s,"rok":r,"miesiac":m,
-                                   "nazwa_pl":f"{MIESIAC_PL[m]} {r}",
-                                   "sort_key":r*100+m})
-    return sorted(wyniki, key=lambda x: x["sort_key"])
-
-def _parquet_path(xlsx_path):
-    d = os.path.join(os.path.dirname(xlsx_path), "__cache__")
-    os.makedirs(d, exist_ok=True)
-    base = os.path.splitext(os.path.basename(xlsx_path))[0]
-    return os.path.join(d, base+".parquet")
-
-def _load_excel_or_parquet(path, **kwargs):
-    """Wczytuje z parquet jeśli istnieje i jest nowszy, inaczej z xlsx i zapisuje parquet."""
-    pq = _parquet_path(path)
-    if os.path.exists(pq) and os.path.getmtime(pq) >= os.path.getmtime(path):
-        try: return pd.read_parquet(pq)
-        except Exception: pass
-    try:
-        df = pd.read_excel(path, **kwargs)
-        try: df.to_parquet(pq, index=False)
-        except Exception: pass
-        return df
-    except Exception:
-        return pd.DataFrame()
-
-GUS_DO_GEO = {
-    "białobrzeski":"powiat białobrzeski","ciechanowski":"powiat ciechanowski",
-    "garwoliński":"powiat garwoliński","gostyniński":"powiat gostyniński",
-    "grodziski":"powiat grodziski","grójecki":"powiat grójecki",
-    "kozienicki":"powiat kozienicki","legionowski":"powiat legionowski",
-    "lipski":"powiat lipski","łosicki":"powiat łosicki",
-    "makowski":"powiat makowski","miński":"powiat miński",
-    "mławski":"powiat mławski","nowodworski":"powiat nowodworski",
-    "ostrołęcki":"powiat ostrołęcki","ostrowski":"powiat ostrowski",
-    "otwocki":"powiat otwocki","piaseczyński":"powiat piaseczyński",
-    "płocki":"powiat płocki","płoński":"powiat płoński",
-    "pruszkowski":"powiat pruszkowski","przasnyski":"powiat przasnyski",
-    "przysuski":"powiat przysuski","pułtuski":"powiat pułtuski",
-    "radomski":"powiat radomski","siedlecki":"powiat siedlecki",
-    "sierpecki":"powiat sierpecki","sochaczewski":"powiat sochaczewski",
-    "sokołowski":"powiat sokołowski","szydłowiecki":"powiat szydłowiecki",
-    "warszawski zachodni":"powiat warszawski zachodni",
-    "węgrowski":"powiat węgrowski","wołomiński":"powiat wołomiński",
-    "wyszkowski":"powiat wyszkowski","zwoleński":"powiat zwoleński",
-    "żuromiński":"powiat żuromiński","żyrardowski":"powiat żyrardowski",
-    "m. ostrołęka":"powiat Ostrołęka","m. płock":"powiat Płock",
-    "m. radom":"powiat Radom","m. siedlce":"powiat Siedlce",
-    "m. warszawa":"powiat Warszawa","warszawa":"powiat Warszawa",
-}
-
-NUTS2_DO_GEO = {
-    "PL21":"małopolskie","PL22":"śląskie","PL41":"wielkopolskie",
-    "PL42":"zachodniopomorskie","PL43":"lubuskie","PL51":"dolnośląskie",
-    "PL52":"opolskie","PL61":"kujawsko-pomorskie","PL62":"warmińsko-mazurskie",
-    "PL63":"pomorskie","PL71":"łódzkie","PL72":"świętokrzyskie",
-    "PL81":"lubelskie","PL82":"podkarpackie","PL84":"podlaskie",
-    "PL9":"mazowieckie","PL91":"mazowieckie","PL92":"mazowieckie",
-}
+# cache_resource: jeden obiekt na proces, bez kopii (pickle) przy każdym wywołaniu.
+# Zwrócone ramki i GeoJSON są TYLKO DO ODCZYTU – nie przypisywać do nich kolumn.
+# Wczytania zbiorów i GeoJSON zwracają Future z puli wątków (odczyt Parquet i plików
+# zwalnia GIL): startują razem przy pierwszym przebiegu, kolejne sesje i reruny dostają
+# ten sam – zwykle gotowy – wynik. Strona czeka tylko na zbiory z ZBIORY_STRON.
+
+# on_release: st.cache_resource.clear() (np. benchmark stron) zamyka pulę zamiast porzucać jej wątki
+@st.cache_resource(show_spinner=False, on_release=lambda pula: pula.shutdown(wait=True))
+def pula_wczytan():
+    return ThreadPoolExecutor(max_workers=5, thread_name_prefix="wczytanie")
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def wczytaj_geojson(sciezka, stan):
+    """Future: GeoJSON + indeks nazwa→id + uproszczone geometrie per zoom (wup_dane.wczytaj_geojson)."""
+    return pula_wczytan().submit(wup_dane.wczytaj_geojson, sciezka)
 
 @st.cache_data(show_spinner=False)
-def wczytaj_geojson(sciezka):
-    try:
-        with open(sciezka,"r",encoding="utf-8") as f:
-            return json.load(f)
-    except Exception: return {}
+def stan_folderu(folder):
+    """Odcisk plików folderu – czyszczony tylko przyciskiem „Odśwież dane”."""
+    return wup_dane.stan_folderu(folder)
 
 @st.cache_data(show_spinner=False)
-def wczytaj_zwolnienia(folder):
-    pliki = znajdz_pliki(folder)
-    records = []
-    for p in pliki:
-        try:
-            try: xl = pd.read_excel(p["sciezka"], sheet_name="dane", header=None)
-            except Exception: xl = pd.read_excel(p["sciezka"], header=None)
-            for i in range(7, len(xl)):
-                vals = list(xl.iloc[i])
-                powiat = vals[1] if len(vals)>1 else None
-                if not isinstance(powiat,str) or len(powiat.strip())<2: continue
-                if any(x in powiat.lower() for x in ["powiat","suma","ogółem","razem"]): continue
-                def g(idx):
-                    v = vals[idx] if idx<len(vals) else None
-                    return None if (v is None or (isinstance(v,float) and np.isnan(v))) else v
-                pkd_raw = str(g(5) or "").strip()
-                pkd = normalizuj_pkd(pkd_raw)
-                records.append({
-                    "Okres":p["nazwa_pl"],"Rok":p["rok"],"Miesiąc_num":p["miesiac"],
-                    "Sort_key":p["sort_key"],"Powiat":str(g(1) or "").strip(),
-                    "Nazwa":re.sub(r"\s{2,}"," ",str(g(3) or "").strip())[:70],
-                    "PKD":pkd,"PKD_opis":PKD_OPISY.get(pkd,pkd_raw[:30]),
-                    "Zgłoszeni":pd.to_numeric(g(6),errors="coerce") or 0,
-                    "Wypow_zmieniające":pd.to_numeric(g(7),errors="coerce") or 0,
-                    "Zwolnieni":pd.to_numeric(g(8),errors="coerce") or 0,
-                    "Monitorowani":pd.to_numeric(g(9),errors="coerce") or 0,
-                })
-        except Exception: continue
-    df = pd.DataFrame(records)
-    if not df.empty:
-        kolejnosc = list(dict.fromkeys([p["nazwa_pl"] for p in pliki]))
-        df["Okres"] = pd.Categorical(df["Okres"],categories=kolejnosc,ordered=True)
-        df = df.sort_values("Sort_key")
-    return df, pliki
+def stan_pliku(sciezka):
+    """Wersja pliku GeoJSON (rozmiar, mtime_ns) – jak stan_folderu, czyszczona przyciskiem „Odśwież dane”."""
+    try: s = os.stat(sciezka)
+    except OSError: return None
+    return s.st_size, s.st_mtime_ns
+
+# `stan` jest tylko kluczem cache: nowy odcisk → loader dociąga zmienione pliki
+@st.cache_resource(show_spinner=False, max_entries=2)
+def wczytaj_zwolnienia(folder, stan):
+    return pula_wczytan().submit(wup_dane.wczytaj_zwolnienia, folder)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def kostka_zwolnien(folder, stan):
+    return wup_dane.kostka_zwolnien(wczytaj_zwolnienia(folder, stan).result()[0])
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def wczytaj_bezrobocie(folder, stan):
+    return pula_wczytan().submit(wup_dane.wczytaj_bezrobocie, folder)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def wczytaj_stopa_bezrobocia(folder, stan):
+    return pula_wczytan().submit(wup_dane.wczytaj_stopa_bezrobocia, folder)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def migawka(stany, _ramki):
+    """Najnowsze wartości jednostek + KPI; stany – odciski folderów _ramki (klucz cache)."""
+    tabela = wup_dane.migawka(_ramki)
+    kpi = wup_dane.kpi_najnowsze(tabela)
+    return {"tabela": tabela, "kpi": {(w["Jednostka"], w["Miara"]): w for w in kpi.to_dict("records")},
+            "okres": "" if tabela.empty else tabela.loc[tabela["Sort_key"].idxmax(), "Okres"]}
+
+# Zbiory potrzebne stronie – pozostałe wczytują się dalej w tle
+ZBIORY_STRON = {
+    "pulpit":     ("stopa_bezrobocia", "geojson", "geojson_woj"),
+    "bezrobotni": ("bezrobocie",),
+    "stopa":      ("stopa_bezrobocia", "geojson", "geojson_woj"),
+    "zwolnienia": ("zwolnienia",),
+    "dane":       ("zwolnienia", "bezrobocie", "stopa_bezrobocia"),
+    "sql":        (),
+}
+ETYKIETY_WCZYTAN = {"zwolnienia": "Zwolnienia", "bezrobocie": "Bezrobocie", "stopa_bezrobocia": "Stopa bezr.",
+                    "geojson": "Granice powiatów", "geojson_woj": "Granice województw"}
+
+def _status_wczytania(nazwa, fut, folder):
+    """Wiersz statusu w sidebarze; None – gotowy zbiór bez danych albo wczytany GeoJSON."""
+    etykieta = ETYKIETY_WCZYTAN[nazwa]
+    if not fut.done():
+        postep = folder and wup_dane.postep_wczytania(folder)
+        return f"⏳ {etykieta}" + (f": {postep[0]}/{postep[1]} plików" if postep else "…")
+    if fut.exception() is not None:
+        return f"❌ {etykieta}: {type(fut.exception()).__name__}"
+    wynik = fut.result()
+    if nazwa == "zwolnienia":
+        return f"✅ {etykieta}: {len(wynik[1])} mies." if wynik[1] else None
+    if nazwa.startswith("geojson") or wynik.empty:
+        return None
+    return f"✅ {etykieta}: {wynik[['Rok','Miesiąc_num']].drop_duplicates().shape[0]} mies."
+
+def _tekst_statusu(wczytania):
+    return "  \n".join(filter(None, (_status_wczytania(n, f, folder) for n, (f, folder, _) in wczytania.items())))
+
+def czekaj_na_wczytania(wczytania, nazwy, status, komunikat=None):
+    """wczytania: nazwa → (Future, folder, funkcja z cache). Odświeża status w sidebarze, aż gotowe będą nazwy."""
+    ostatni = None
+    while True:
+        tekst = _tekst_statusu(wczytania)
+        if tekst != ostatni:
+            status.caption(tekst) if tekst else status.empty()
+            ostatni = tekst
+        czekajace = [n for n in nazwy if n in wczytania and not wczytania[n][0].done()]
+        if not czekajace: break
+        if komunikat is not None:   # każda aktualizacja to też punkt przerwania przebiegu (klik w nawigację)
+            komunikat.info("⏳ Wczytywanie: " + ", ".join(ETYKIETY_WCZYTAN[n] for n in czekajace))
+        wait([wczytania[n][0] for n in czekajace], timeout=0.25, return_when=FIRST_COMPLETED)
+    if komunikat is not None: komunikat.empty()
+
+@st.fragment(run_every=0.5)
+def status_w_tle(wczytania):
+    """Status wczytań po wysłaniu strony – bez czekania w skrypcie; po ostatnim pełny rerun (koniec odpytywania)."""
+    if all(f.done() for f, _, _ in wczytania.values()):
+        st.rerun()
+    st.caption(_tekst_statusu(wczytania))
 
-@st.cache_data(show_spinner=False)
-def wczytaj_bezrobocie(folder):
+def wyniki_wczytan(wczytania, nazwy):
     """
-    Wczytuje pliki MRPiPS-01.
-    Województwo ogółem: arkusz 'WOJEWÓDZTWO OGÓŁEM', row 15, col 12=stan_koniec, col 13=kobiety
-    Powiaty: arkusz 'dbf', TABELA=1, NRW=001, ostatni blok per WGM: R1=stan_koniec, R2=kobiety
-    Kategorie: NRW=005(wsi), 008(cudzoziemcy), 009(bez_kwalif), 013(do30), 016(pow50), 017(dlugotrwale)
+    Gotowe wczytania → {nazwa: wynik}. Błąd zbioru czyści jego cache (kolejny przebieg
+    spróbuje ponownie) i zgłasza wyjątek – jak przy wczytaniu w skrypcie.
     """
-    WGM_MAP = {
-        1402:("Białobrzeski","powiat"),   1403:("Ciechanowski","powiat"),
-        1404:("Garwoliński","powiat"),    1405:("Gostyniński","powiat"),
-        1406:("Grodziski","powiat"),      1407:("Grójecki","powiat"),
-        1408:("Kozienicki","powiat"),     1409:("Legionowski","powiat"),
-        1410:("Lipski","powiat"),         1411:("Łosicki","powiat"),
-        1412:("Makowski","powiat"),       1413:("Miński","powiat"),
-        1414:("Mławski","powiat"),        1415:("Nowodworski","powiat"),
-        1416:("Ostrołęcki","powiat"),     1417:("Ostrowski","powiat"),
-        1418:("Otwocki","powiat"),        1419:("Piaseczyński","powiat"),
-        1420:("Płocki","powiat"),         1421:("Płoński","powiat"),
-        1422:("Pruszkowski","powiat"),    1423:("Przasnyski","powiat"),
-        1424:("Przysuski","powiat"),      1425:("Pułtuski","powiat"),
-        1426:("Radomski","powiat"),       1427:("Siedlecki","powiat"),
-        1428:("Sierpecki","powiat"),      1429:("Sochaczewski","powiat"),
-        1430:("Sokołowski","powiat"),     1432:("Szydłowiecki","powiat"),
-        1433:("Warszawski Zachodni","powiat"), 1434:("Węgrowski","powiat"),
-        1435:("Wołomiński","powiat"),     1436:("Wyszkowski","powiat"),
-        1437:("Zwoleński","powiat"),      1438:("Żuromiński","powiat"),
-        1461:("m. Ostrołęka","powiat"),   1462:("m. Płock","powiat"),
-        1463:("m. Radom","powiat"),       1464:("m. Siedlce","powiat"),
-        1465:("m. Warszawa","powiat"),
-    }
-    NRW_KAT = {
-        "005":"Na_wsi", "008":"Cudzoziemcy", "009":"Bez_kwalif",
-        "013":"Do_30_lat", "014":"Do_25_lat",
-        "016":"Pow_50_lat", "017":"Dlugoterwale", "018":"Niepelnosprawni",
-    }
-
-    pliki = znajdz_pliki(folder)
-    records = []
-
-    for p in pliki:
-        try:
-            xl = pd.ExcelFile(p["sciezka"])
-            if "dbf" not in xl.sheet_names:
-                continue
-            df = xl.parse("dbf", header=0)
-            df["NRW"] = df["NRW"].astype(str).str.strip().str.zfill(3)
-            df["WGM"] = df["WGM"].astype(int)
-
-            # ── 1. Województwo ogółem z arkusza WOJEWÓDZTWO OGÓŁEM ──
-            if "WOJEWÓDZTWO OGÓŁEM" in xl.sheet_names:
-                try:
-                    df_w = xl.parse("WOJEWÓDZTWO OGÓŁEM", header=None)
-                    r = list(df_w.iloc[15])  # Ogółem wiersz
-                    def gc(idx):
-                        v = r[idx] if idx < len(r) else None
-                        return pd.to_numeric(v, errors="coerce")
-                    # Zarejestrowani=col8, Wyrej=col10, Stan_koniec=col12, Stan_K=col13
-                    zarej_w       = gc(8)
-                    wyr_w         = gc(10)
-                    stan_koniec_w = gc(12)
-                    stan_K_w      = gc(13)
-                    z_zasilkiem_w = gc(14)
-
-                    # Kategorie z kolejnych wierszy (col 12 = stan_koniec)
-                    def kat_woj(row_idx):
-                        try:
-                            return pd.to_numeric(list(df_w.iloc[row_idx])[12], errors="coerce")
-                        except: return None
-
-                    rec_w = {
-                        "Okres":p["nazwa_pl"],"Rok":p["rok"],
-                        "Miesiąc_num":p["miesiac"],"Sort_key":p["sort_key"],
-                        "Region":"Mazowieckie","Typ":"województwo",
-                        "Zarejestrowani":zarej_w,"Wyrejestrowani":wyr_w,
-                        "Stan_koniec":stan_koniec_w,"Stan_koniec_K":stan_K_w,
-                        "Z_zasilkiem":z_zasilkiem_w,
-                        "Na_wsi":     kat_woj(20),
-                        "Cudzoziemcy":kat_woj(23),
-                        "Bez_kwalif": kat_woj(24),
-                        "Do_30_lat":  kat_woj(28),
-                        "Do_25_lat":  kat_woj(29),
-                        "Pow_50_lat": kat_woj(31),
-                        "Dlugoterwale":kat_woj(32),
-                        "Niepelnosprawni":kat_woj(33),
-                    }
-                    records.append(rec_w)
-                except Exception:
-                    pass
-
-            # ── 2. Powiaty z arkusza dbf ──
-            for wgm, (nazwa, typ) in WGM_MAP.items():
-                sub = df[(df["WGM"]==wgm) & (df["TABELA"]==1) & (df["NRW"]=="001")]
-                if sub.empty:
-                    continue
-                # Ostatni blok NRW=001: R1=stan_koniec_ogół, R2=stan_K
-                r_last = sub.iloc[-1]
-                stan_koniec = pd.to_numeric(r_last.get("R1"), errors="coerce")
-                stan_K      = pd.to_numeric(r_last.get("R2"), errors="coerce")
-                # Pierwszy blok: R1=zarej, R5=wyrej (z zasiłkiem)
-                r_first = sub.iloc[0]
-                zarej       = pd.to_numeric(r_first.get("R1"), errors="coerce")
-                z_zasilkiem = pd.to_numeric(r_first.get("R5"), errors="coerce")
-
-                # Kategorie (NRW=005 itp.) - kolumna R5 = stan_koniec w kategorii
-                sub_all = df[(df["WGM"]==wgm) & (df["TABELA"]==1)]
-                rec = {
-                    "Okres":p["nazwa_pl"],"Rok":p["rok"],
-                    "Miesiąc_num":p["miesiac"],"Sort_key":p["sort_key"],
-                    "Region":nazwa,"Typ":typ,
-                    "Zarejestrowani":zarej,"Stan_koniec":stan_koniec,
-                    "Stan_koniec_K":stan_K,"Z_zasilkiem":z_zasilkiem,
-                }
-                for nrw, col in NRW_KAT.items():
-                    rows_nrw = sub_all[sub_all["NRW"]==nrw]
-                    if not rows_nrw.empty:
-                        rec[col] = pd.to_numeric(rows_nrw.iloc[0].get("R5"), errors="coerce")
-
-                records.append(rec)
-
-        except Exception:
-            continue
-
-    df_out = pd.DataFrame(records)
-    if not df_out.empty:
-        kolejnosc = list(dict.fromkeys([p["nazwa_pl"] for p in pliki]))
-        df_out["Okres"] = pd.Categorical(df_out["Okres"], categories=kolejnosc, ordered=True)
-        df_out = df_out.sort_values(["Sort_key","Typ"], ascending=[True,False])
-    return df_out
-
-@st.cache_data(show_spinner=False)
-def wczytaj_stopa_bezrobocia(folder):
-    pliki = znajdz_pliki(folder)
-    records = []
-    for p in pliki:
-        try:
-            xl = pd.ExcelFile(p["sciezka"])
-            if "Tabl.1" in xl.sheet_names:
-                df = xl.parse("Tabl.1", header=None)
-                for i in range(len(df)):
-                    kod = str(df.iloc[i,0]).strip()
-                    if not kod.startswith("PL"): continue
-                    nazwa = str(df.iloc[i,4]).strip()
-                    bezrob = pd.to_numeric(df.iloc[i,5],errors="coerce")
-                    stopa  = pd.to_numeric(df.iloc[i,6],errors="coerce")
-                    if np.isnan(stopa): continue
-                    if len(kod)==4: typ="województwo"; geo=NUTS2_DO_GEO.get(kod)
-                    elif kod in ("PL9","PL91","PL92"): typ="województwo"; geo="mazowieckie"
-                    else: continue
-                    records.append({
-                        "Okres":p["nazwa_pl"],"Rok":p["rok"],"Miesiąc_num":p["miesiac"],
-                        "Sort_key":p["sort_key"],"Kod":kod,
-                        "Nazwa":nazwa.replace("REGION: ","").replace("PODREGION: ","").strip().title(),
-                        "Typ":typ,"Bezrobotni_tys":bezrob,"Stopa":stopa,"Geo_nazwa":geo,
-                    })
-            if "Tabl.1a" in xl.sheet_names:
-                df = xl.parse("Tabl.1a", header=None)
-                for i in range(len(df)):
-                    woj = str(df.iloc[i,0]).strip()
-                    if woj!="14": continue
-                    pow_kod = str(df.iloc[i,1]).strip()
-                    nazwa   = str(df.iloc[i,2]).strip().lower().strip()
-                    bezrob  = pd.to_numeric(df.iloc[i,3],errors="coerce")
-                    stopa   = pd.to_numeric(df.iloc[i,4],errors="coerce")
-                    if np.isnan(stopa): continue
-                    typ = "województwo" if pow_kod=="00" else "powiat"
-                    geo = GUS_DO_GEO.get(nazwa)
-                    records.append({
-                        "Okres":p["nazwa_pl"],"Rok":p["rok"],"Miesiąc_num":p["miesiac"],
-                        "Sort_key":p["sort_key"],"Kod":f"14{pow_kod}",
-                        "Nazwa":nazwa.title(),"Typ":typ,
-                        "Bezrobotni_tys":bezrob,"Stopa":stopa,"Geo_nazwa":geo,
-                    })
-        except Exception: continue
-    df = pd.DataFrame(records)
-    if not df.empty:
-        kolejnosc = list(dict.fromkeys([p["nazwa_pl"] for p in pliki]))
-        df["Okres"] = pd.Categorical(df["Okres"],categories=kolejnosc,ordered=True)
-        df = df.sort_values("Sort_key")
-    return df
+    wyniki = {}
+    for n in nazwy:
+        if n not in wczytania: continue
+        fut, _, funkcja = wczytania[n]
+        if fut.exception() is not None:
+            funkcja.clear()
+            raise fut.exception()
+        wyniki[n] = fut.result()
+    return wyniki
 
 # ══════════════════════════════════════════════════════════
 # UI HELPERS
@@ -507,37 +302,102 @@ def kpi_html(label, location, value, unit, delta=None, delta_type="eq", color="b
       {delta_html}
     </div>"""
 
-def rysuj_mape(df_mapa, geojson_data, tytul, zoom, center, height=520,
-               color_scale="RdYlGn_r", col="Stopa"):
-    if not geojson_data:
+# Figury Plotly wspólne dla sesji (LRU): klucz = (nazwa wykresu, odcisk zbioru, parametry).
+# Budowa figury (px / make_subplots / pętle go.Scatter) tylko przy braku w cache.
+WYKRESY_LIMIT = 64
+
+@st.cache_resource(show_spinner=False, max_entries=WYKRESY_LIMIT)
+def _figura(klucz, _budowa):
+    return _budowa()
+
+def wykres(klucz, budowa):
+    """st.plotly_chart figury z cache; budowa() → go.Figure. Figura jest TYLKO DO ODCZYTU."""
+    with wup_dane.pomiar("wykres", wykres=str(klucz[0])):
+        st.plotly_chart(_figura(klucz, budowa), use_container_width=True)
+
+def rysuj_mape(df_mapa, mapa, tytul, zoom, center, height=520,
+               color_scale="RdYlGn_r", col="Stopa", klucz=()):
+    """klucz – odcisk danych mapy (zbiór, okres, plik GeoJSON i jego wersja) do cache figury."""
+    if not mapa:
         st.warning("⚠️ Brak pliku GeoJSON")
         return
-    geo_map = {f["properties"]["nazwa"]: f["properties"]["id"]
-               for f in geojson_data["features"]}
-    df_mapa = df_mapa.copy()
-    df_mapa["geo_id"] = df_mapa["Geo_nazwa"].map(geo_map)
+    df_mapa = df_mapa.assign(geo_id=df_mapa["Geo_nazwa"].map(mapa["indeks"]))
     df_plot = df_mapa.dropna(subset=["geo_id"])
     if df_plot.empty:
         st.warning("Brak dopasowanych danych")
         return
-    fig = px.choropleth_mapbox(
-        df_plot, geojson=geojson_data, locations="geo_id",
-        featureidkey="properties.id", color=col,
-        hover_name="Nazwa",
-        hover_data={col:":.1f","Bezrobotni_tys":":.1f","geo_id":False},
-        color_continuous_scale=color_scale,
-        range_color=[df_plot[col].min(), df_plot[col].max()],
-        mapbox_style="carto-positron",
-        zoom=zoom, center=center, opacity=0.82, height=height,
-        labels={col:"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"},
-    )
-    fig.update_layout(
-        margin={"r":0,"t":36,"l":0,"b":0},
-        title=dict(text=tytul, font=dict(size=13,color="#0f172a"), x=0),
-        coloraxis_colorbar=dict(title="Stopa %",thickness=10,len=0.7,tickfont=dict(size=10)),
-        paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    def budowa():
+        fig = px.choropleth_mapbox(
+            df_plot, geojson=wup_dane.geojson_dla_zoomu(mapa, zoom), locations="geo_id",
+            featureidkey="properties.id", color=col,
+            hover_name="Nazwa",
+            hover_data={col:":.1f","Bezrobotni_tys":":.1f","geo_id":False},
+            color_continuous_scale=color_scale,
+            range_color=[df_plot[col].min(), df_plot[col].max()],
+            mapbox_style="carto-positron",
+            zoom=zoom, center=center, opacity=0.82, height=height,
+            labels={col:"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"},
+        )
+        fig.update_layout(
+            margin={"r":0,"t":36,"l":0,"b":0},
+            title=dict(text=tytul, font=dict(size=13,color="#0f172a"), x=0),
+            coloraxis_colorbar=dict(title="Stopa %",thickness=10,len=0.7,tickfont=dict(size=10)),
+            paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
+        )
+        return fig
+    wykres(("mapa", klucz, tytul, zoom, tuple(center.items()), height, color_scale, col), budowa)
+
+def przycisk_eksportu(etykieta, ramki, nazwa, wersja, key, formaty=tuple(wup_dane.FORMATY_EKSPORTU)):
+    """Pobieranie {arkusz: ramka} – plik powstaje dopiero po kliknięciu (wup_dane.eksportuj)."""
+    fmt = formaty[0] if len(formaty) == 1 else st.radio(
+        "Format", formaty, horizontal=True, key=f"{key}_fmt", label_visibility="collapsed")
+    roz, mime = wup_dane.FORMATY_EKSPORTU[fmt]
+    def dane():
+        with open(wup_dane.eksportuj(ramki, fmt, wersja), "rb") as f:
+            return f.read()
+    st.download_button(etykieta, dane, f"{nazwa}.{roz}", mime, key=key, on_click="ignore")
+
+def siatka(df, key, rozmiary=(50, 100, 250, 500), height=500):
+    """
+    Tabela stronicowana: filtr, sortowanie i wybór strony liczone na serwerze
+    (wup_dane.porzadek_wierszy) – do przeglądarki trafia tylko bieżąca strona.
+    """
+    kolumny = list(df.columns)
+    c1, c2, c3, c4, c5 = st.columns([3,2,3,2,2])
+    kol = c1.selectbox("Sortuj wg", [None]+kolumny, key=f"{key}_sort",
+                       format_func=lambda c: "—" if c is None else str(c))
+    rosnaco = c2.radio("Kierunek", ["↑ rosnąco","↓ malejąco"], horizontal=True, key=f"{key}_kier").startswith("↑")
+    fraza = c3.text_input("Filtr", key=f"{key}_fraza", placeholder="szukaj w kolumnach tekstowych")
+    rozmiar = c4.selectbox("Wierszy na stronę", rozmiary, key=f"{key}_rozmiar")
+    poz = wup_dane.porzadek_wierszy(df, kol, rosnaco, fraza.strip())
+    stron = max(1, -(-len(poz) // rozmiar))
+    if st.session_state.get(f"{key}_strona", 1) > stron:
+        st.session_state[f"{key}_strona"] = stron
+    strona = c5.number_input(f"Strona (z {stron})", 1, stron, key=f"{key}_strona")
+    od = (strona-1) * rozmiar
+    st.caption(f"{len(df):,} rekordów" + (f" · po filtrze {len(poz):,}" if fraza.strip() else "")
+               + (f" · wiersze {od+1:,}–{min(od+rozmiar, len(poz)):,}" if len(poz) else ""))
+    st.dataframe(df.iloc[poz[od:od+rozmiar]], use_container_width=True, hide_index=True, height=height)
+
+def panel_diagnostyki(przebieg):
+    """Sidebar: spany zakończonego przebiegu skryptu i ostatnie wczytania zbiorów (WUP_POMIARY)."""
+    def tabela(spany):
+        wciecie, wiersze = {}, []
+        for s in spany:
+            wciecie[s["id"]] = wciecie.get(s["rodzic"], -1) + 1
+            wiersze.append({"Span": "· "*wciecie[s["id"]] + s["span"],
+                            "Etykiety": ", ".join(f"{k}={v}" for k, v in s["etykiety"].items()),
+                            "ms": s["ms"], "Wiersze": s["wiersze"],
+                            "Szczyt MB": s["szczyt_B"] and round(s["szczyt_B"]/2**20, 2), "Błąd": s["blad"] or ""})
+        return pd.DataFrame(wiersze)
+    biezace = sorted(wup_dane.spany(przebieg.id), key=lambda s: s["id"])
+    wczytania = [s for s in wup_dane.spany() if s["span"] in ("loader", "geojson")][-10:]
+    with st.sidebar.expander("🩺 Diagnostyka", expanded=False):
+        st.caption(f"Przebieg: {biezace[0]['ms']:.0f} ms" if biezace else "Przebieg bez pomiarów")
+        st.dataframe(tabela(biezace), hide_index=True, use_container_width=True)
+        st.markdown("**Ostatnie wczytania**")
+        st.dataframe(tabela(wczytania), hide_index=True, use_container_width=True)
+        st.caption(f"Logi: {wup_dane.katalog_pomiarow()} · pomiary.jsonl, pomiary.prom")
 
 PLOTLY_LAYOUT = dict(
     paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
@@ -550,6 +410,7 @@ LEGEND_H = dict(orientation="h", y=-0.25, font=dict(size=10))  # domyślna legen
 # ══════════════════════════════════════════════════════════
 # SIDEBAR – dane + nawigacja
 # ══════════════════════════════════════════════════════════
+pomiar_bloku = wup_dane.pomiar("blok", blok="sidebar").otworz()
 with st.sidebar:
     st.markdown("""
     <div style="padding:16px 4px 12px;border-bottom:1px solid rgba(255,255,255,0.1);margin-bottom:12px;">
@@ -569,13 +430,13 @@ with st.sidebar:
     folder_stopa = os.path.join(BASE_DIR,"dane","stopa_bezrobocia")
 
     if st.button("🔄 Odśwież dane", use_container_width=True):
-        st.cache_data.clear()
+        # Tylko odciski plików – niezmienione GeoJSON i zbiory zostają w cache
+        stan_folderu.clear()
+        stan_pliku.clear()
         st.rerun()
 
-    # Wczytaj dane
-    df_zwol = pd.DataFrame(); pliki_zwol = []
-    df_bezr = pd.DataFrame(); df_stopa = pd.DataFrame()
-    geojson = {}; geojson_woj = {}
+    # Wczytania w tle – nazwa → (Future, folder, funkcja z cache); wyniki po wyborze strony
+    wczytania = {}
 
     # Preferuj powiaty_maz.geojson (tylko mazowieckie, poprawne grodziski/ostrowski)
     geojson_sciezka = os.path.join(BASE_DIR,"powiaty_maz.geojson")
@@ -583,16 +444,14 @@ with st.sidebar:
         geojson_sciezka = os.path.join(BASE_DIR,"powiaty.geojson")
     geojson_woj_sciezka = os.path.join(BASE_DIR,"wojewodztwa.geojson")
 
-    if os.path.exists(folder_zwol):
-        df_zwol, pliki_zwol = wczytaj_zwolnienia(folder_zwol)
-    if os.path.exists(folder_bezr):
-        df_bezr = wczytaj_bezrobocie(folder_bezr)
-    if os.path.exists(folder_stopa):
-        df_stopa = wczytaj_stopa_bezrobocia(folder_stopa)
-    if os.path.exists(geojson_sciezka):
-        geojson = wczytaj_geojson(geojson_sciezka)
-    if os.path.exists(geojson_woj_sciezka):
-        geojson_woj = wczytaj_geojson(geojson_woj_sciezka)
+    for nazwa, folder, funkcja in (("zwolnienia", folder_zwol, wczytaj_zwolnienia),
+                                   ("bezrobocie", folder_bezr, wczytaj_bezrobocie),
+                                   ("stopa_bezrobocia", folder_stopa, wczytaj_stopa_bezrobocia)):
+        if os.path.exists(folder):
+            wczytania[nazwa] = (funkcja(folder, stan_folderu(folder)), folder, funkcja)
+    for nazwa, sciezka in (("geojson", geojson_sciezka), ("geojson_woj", geojson_woj_sciezka)):
+        if os.path.exists(sciezka):
+            wczytania[nazwa] = (wczytaj_geojson(sciezka, stan_pliku(sciezka)), None, wczytaj_geojson)
 
     st.divider()
     st.markdown("**📊 Nawigacja**")
@@ -603,6 +462,7 @@ with st.sidebar:
         "📉 Stopa bezrob.": "stopa",
         "🏭 Zwolnienia":    "zwolnienia",
         "📋 Dane surowe":   "dane",
+        "🧮 SQL":           "sql",
     }
     if "nav" not in st.session_state:
         st.session_state["nav"] = "pulpit"
@@ -612,30 +472,29 @@ with st.sidebar:
             st.rerun()
 
     st.divider()
-    # Status
-    if pliki_zwol: st.caption(f"✅ Zwolnienia: {len(pliki_zwol)} mies.")
-    if not df_bezr.empty:
-        n = df_bezr[["Rok","Miesiąc_num"]].drop_duplicates().shape[0]
-        st.caption(f"✅ Bezrobocie: {n} mies.")
-    if not df_stopa.empty:
-        n = df_stopa[["Rok","Miesiąc_num"]].drop_duplicates().shape[0]
-        st.caption(f"✅ Stopa bezr.: {n} mies.")
+    # Status – postęp wczytań per zbiór (czekaj_na_wczytania, po wysłaniu strony status_w_tle)
+    status_wczytan = st.empty()
 
 current_page = st.session_state.get("nav","pulpit")
-
-# Filtrowanie zwolnień (globalne)
-dff = df_zwol.copy() if not df_zwol.empty else pd.DataFrame()
+pomiar_bloku.zamknij()
+pomiar_przebiegu.ustaw(strona=current_page)
+pomiar_bloku = wup_dane.pomiar("blok", blok=current_page).otworz()
+
+potrzebne = ZBIORY_STRON.get(current_page, ())
+czekaj_na_wczytania(wczytania, potrzebne, status_wczytan, st.empty())
+gotowe = wyniki_wczytan(wczytania, potrzebne)
+df_zwol, pliki_zwol = gotowe.get("zwolnienia", (pd.DataFrame(), []))
+df_bezr  = gotowe.get("bezrobocie", pd.DataFrame())
+df_stopa = gotowe.get("stopa_bezrobocia", pd.DataFrame())
+geojson, geojson_woj = gotowe.get("geojson", {}), gotowe.get("geojson_woj", {})
 
 # ══════════════════════════════════════════════════════════
 # PULPIT
 # ══════════════════════════════════════════════════════════
 if current_page == "pulpit":
-    # Header
-    last_date = ""
-    if not df_stopa.empty:
-        last_date = str(df_stopa.sort_values("Sort_key")["Okres"].iloc[-1])
-    elif not df_bezr.empty:
-        last_date = str(df_bezr.sort_values("Sort_key")["Okres"].iloc[-1])
+    # Header i KPI z migawki (wup_dane.migawka) – bez skanowania historii
+    mig = migawka((stan_folderu(folder_stopa),), {"stopa_bezrobocia": df_stopa})
+    last_date = mig["okres"]
 
     st.markdown(f"""
     <div class="wup-header">
@@ -647,82 +506,25 @@ if current_page == "pulpit":
     </div>
     """, unsafe_allow_html=True)
 
-    # KPI cards
-    kpis = []
-    ostatnia_stopa_maz = ostatni_bezr_maz = None
-    ostatnia_stopa_wawa = ostatni_bezr_wawa = None
-
-    if not df_stopa.empty:
-        woj_s = df_stopa[df_stopa["Typ"]=="województwo"].sort_values("Sort_key")
-        pow_s = df_stopa[df_stopa["Typ"]=="powiat"].sort_values("Sort_key")
-        if not woj_s.empty:
-            ost = woj_s.iloc[-1]
-            ostatnia_stopa_maz = ost["Stopa"]
-            ostatni_bezr_maz   = ost["Bezrobotni_tys"]
-        if not pow_s.empty:
-            wawa = pow_s[pow_s["Nazwa"].str.lower().str.contains("warszawa")]
-            if not wawa.empty:
-                ow = wawa.iloc[-1]
-                ostatnia_stopa_wawa = ow["Stopa"]
-                ostatni_bezr_wawa   = ow["Bezrobotni_tys"]
-
-    # KPI – natywne st.metric (działa zawsze niezależnie od wersji Streamlit)
-    val_bezr      = f"{ostatni_bezr_maz:.1f} tys."   if ostatni_bezr_maz      else "—"
-    val_stopa_maz = f"{ostatnia_stopa_maz:.1f} %"    if ostatnia_stopa_maz    else "—"
-    val_bezr_wawa = f"{ostatni_bezr_wawa:.1f} tys."  if ostatni_bezr_wawa     else "—"
-    val_stopa_wawa= f"{ostatnia_stopa_wawa:.1f} %"   if ostatnia_stopa_wawa   else "—"
-
-    # Oblicz delty jeśli są dane z poprzedniego miesiąca
-    def delta_stopa(df, typ, nazwa_contains=None):
-        """Liczy zmianę stopy m/m dla konkretnej jednostki (nie średniej!)."""
-        WYKLUCZ = ["PL9","PL91","PL92"]
-        d = df[
-            (df["Typ"]==typ) &
-            (~df["Kod"].astype(str).isin(WYKLUCZ))
-        ].sort_values("Sort_key")
-        if nazwa_contains:
-            d = d[d["Nazwa"].str.lower().str.contains(nazwa_contains, na=False)]
-        if d.empty:
-            return None
-        # Bierzemy tylko jeden rekord na miesiąc (unikamy duplikatów)
-        d = d.drop_duplicates(subset=["Sort_key"], keep="last")
-        if len(d) < 2:
-            return None
-        v_now  = float(d.iloc[-1]["Stopa"])
-        v_prev = float(d.iloc[-2]["Stopa"])
-        diff = round(v_now - v_prev, 2)
-        return f"{diff:+.2f} pp"
-
-    # Delta bezrobotni m/m
-    def delta_bezr(df_b, typ, nazwa=None):
-        if df_b is None or df_b.empty: return None
-        d = df_b[df_b["Typ"]==typ].sort_values("Sort_key")
-        if nazwa: d = d[d["Region"].str.lower().str.contains(nazwa, na=False)]
-        d = d.drop_duplicates(subset=["Sort_key"], keep="last")
-        if len(d) < 2: return None
-        v_now  = float(d.iloc[-1]["Stan_koniec"])
-        v_prev = float(d.iloc[-2]["Stan_koniec"])
-        diff = int(round(v_now - v_prev))
-        return f"{diff:+,}"
-
-    delta_stopa_maz = delta_stopa(df_stopa, "województwo") if not df_stopa.empty else None
-    delta_bezr_maz  = delta_bezr(df_bezr, "województwo") if not df_bezr.empty else None
-    delta_stopa_waw = delta_stopa(df_stopa, "powiat", "warszawa") if not df_stopa.empty else None
-    delta_bezr_waw  = delta_bezr(df_bezr, "powiat", "warszawa") if not df_bezr.empty else None
+    # KPI – natywne st.metric; delta m/m, r/r w podpowiedzi
+    def karta(etykieta, jednostka, miara, fmt, fmt_delta):
+        w = mig["kpi"].get((jednostka, miara))
+        if w is None:
+            return st.metric(etykieta, "—")
+        st.metric(etykieta, fmt.format(w["Wartość"]),
+                  delta=None if pd.isna(w["Delta_mm"]) else fmt_delta.format(w["Delta_mm"]),
+                  delta_color="inverse",
+                  help=f"{w['Okres']} · r/r: " + ("—" if pd.isna(w["Delta_rr"]) else fmt_delta.format(w["Delta_rr"])))
 
     kc1, kc2, kc3, kc4 = st.columns(4)
     with kc1:
-        st.metric("👥 Bezrobotni – Mazowieckie", val_bezr,
-                  delta=delta_bezr_maz, delta_color="inverse")
+        karta("👥 Bezrobotni – Mazowieckie", "Mazowieckie", "Bezrobotni_tys", "{:.1f} tys.", "{:+.1f} tys.")
     with kc2:
-        st.metric("📉 Stopa bezrobocia – Mazowieckie", val_stopa_maz,
-                  delta=delta_stopa_maz, delta_color="inverse")
+        karta("📉 Stopa bezrobocia – Mazowieckie", "Mazowieckie", "Stopa", "{:.1f} %", "{:+.2f} pp")
     with kc3:
-        st.metric("👥 Bezrobotni – m. Warszawa", val_bezr_wawa,
-                  delta=delta_bezr_waw, delta_color="inverse")
+        karta("👥 Bezrobotni – m. Warszawa", "m. Warszawa", "Bezrobotni_tys", "{:.1f} tys.", "{:+.1f} tys.")
     with kc4:
-        st.metric("📉 Stopa bezrobocia – m. Warszawa", val_stopa_wawa,
-                  delta=delta_stopa_waw, delta_color="inverse")
+        karta("📉 Stopa bezrobocia – m. Warszawa", "m. Warszawa", "Stopa", "{:.1f} %", "{:+.2f} pp")
 
     # Mapy
     if not df_stopa.empty:
@@ -734,13 +536,15 @@ if current_page == "pulpit":
             st.markdown('<div class="sec-label">Mapa Polski – stopa bezrobocia wg województw</div>', unsafe_allow_html=True)
             woj_m = df_stopa[(df_stopa["Typ"]=="województwo") & (df_stopa["Sort_key"]==ostatni_key) & df_stopa["Geo_nazwa"].notna()].drop_duplicates("Geo_nazwa")
             rysuj_mape(woj_m, geojson_woj, f"Polska · {okres_str}",
-                       zoom=4.6, center={"lat":52.1,"lon":19.4}, height=540)
+                       zoom=4.6, center={"lat":52.1,"lon":19.4}, height=540,
+                       klucz=(stan_folderu(folder_stopa), ostatni_key, geojson_woj_sciezka, stan_pliku(geojson_woj_sciezka)))
 
         with col2:
             st.markdown('<div class="sec-label">Mapa Mazowiecka – stopa bezrobocia wg powiatów</div>', unsafe_allow_html=True)
             pow_m = df_stopa[(df_stopa["Typ"]=="powiat") & (df_stopa["Sort_key"]==ostatni_key)]
             rysuj_mape(pow_m, geojson, f"Mazowieckie · {okres_str}",
-                       zoom=6.4, center={"lat":52.1,"lon":21.0}, height=540)
+                       zoom=6.4, center={"lat":52.1,"lon":21.0}, height=540,
+                       klucz=(stan_folderu(folder_stopa), ostatni_key, geojson_sciezka, stan_pliku(geojson_sciezka)))
     else:
         st.info("ℹ️ Dodaj pliki GUS do folderu `stopa_bezrobocia/` aby zobaczyć mapy")
 
@@ -770,26 +574,28 @@ if current_page == "pulpit":
         PALETA_P = ["#c0392b","#2980b9","#27ae60","#8e44ad","#e67e22",
                     "#16a085","#d35400","#2c3e50","#f39c12","#1abc9c",
                     "#e74c3c","#3498db","#2ecc71","#9b59b6","#1a3a5c","#795548"]
-        fig_pt = go.Figure()
-        for i, wn in enumerate(wybrane_woj_p):
-            d = woj_trend_all[woj_trend_all["Nazwa"]==wn]
-            is_maz = "mazow" in wn.lower()
-            fig_pt.add_trace(go.Scatter(
-                x=d["Okres"], y=d[col_field_p],
-                mode="lines+markers", name=wn,
-                line=dict(color=PALETA_P[i%len(PALETA_P)], width=4 if is_maz else 2),
-                marker=dict(size=9 if is_maz else 6,
-                            line=dict(color="white",width=1.5)),
-            ))
-        fig_pt.update_layout(
-            height=340,
-            yaxis=dict(title=col_label_p, gridcolor="#f1f5f9",
-                       tickfont=dict(size=10,color="#94a3b8")),
-            legend=dict(orientation="h", y=-0.28, font=dict(size=10)),
-            margin=dict(t=10,b=10),
-            paper_bgcolor="#ffffff", plot_bgcolor="#ffffff", font=dict(family="Inter, system-ui", size=11, color="#475569"), hovermode="x unified", xaxis=dict(showgrid=False, tickangle=-30, tickfont=dict(size=10,color="#94a3b8"))
-        )
-        st.plotly_chart(fig_pt, use_container_width=True)
+        def budowa_trendu():
+            fig_pt = go.Figure()
+            for i, wn in enumerate(wybrane_woj_p):
+                d = woj_trend_all[woj_trend_all["Nazwa"]==wn]
+                is_maz = "mazow" in wn.lower()
+                fig_pt.add_trace(go.Scatter(
+                    x=d["Okres"], y=d[col_field_p],
+                    mode="lines+markers", name=wn,
+                    line=dict(color=PALETA_P[i%len(PALETA_P)], width=4 if is_maz else 2),
+                    marker=dict(size=9 if is_maz else 6,
+                                line=dict(color="white",width=1.5)),
+                ))
+            fig_pt.update_layout(
+                height=340,
+                yaxis=dict(title=col_label_p, gridcolor="#f1f5f9",
+                           tickfont=dict(size=10,color="#94a3b8")),
+                legend=dict(orientation="h", y=-0.28, font=dict(size=10)),
+                margin=dict(t=10,b=10),
+                paper_bgcolor="#ffffff", plot_bgcolor="#ffffff", font=dict(family="Inter, system-ui", size=11, color="#475569"), hovermode="x unified", xaxis=dict(showgrid=False, tickangle=-30, tickfont=dict(size=10,color="#94a3b8"))
+            )
+            return fig_pt
+        wykres(("pulpit_trend", stan_folderu(folder_stopa), tuple(wybrane_woj_p), col_field_p), budowa_trendu)
 
 # ══════════════════════════════════════════════════════════
 # BEZROBOTNI
@@ -813,91 +619,103 @@ elif current_page == "bezrobotni":
             c3.metric("Wyrejestrowani w mies.",f"{int(ost['Wyrejestrowani']):,}" if pd.notna(ost['Wyrejestrowani']) else "—")
             c4.metric("Ostatnie dane",str(ost["Okres"]))
 
-        bz1,bz2,bz3,bz4 = st.tabs(["📈 Województwo","🗺️ Powiaty – miesiąc","📊 Trend powiatu","📋 Tabela"])
+        bz1,bz2,bz3,bz4 = st.tabs(["📈 Województwo","🗺️ Powiaty – miesiąc","📊 Trend powiatu","📋 Tabela"], key="bz_zakladka", on_change="rerun")
 
         with bz1:
-            if not woj.empty:
-                col_l, col_r = st.columns(2)
-                with col_l:
-                    fig = make_subplots(specs=[[{"secondary_y":True}]])
-                    fig.add_trace(go.Scatter(x=woj["Okres"],y=woj["Stan_koniec"],
-                        name="Stan końcowy",mode="lines+markers",
-                        line=dict(color=C_RED,width=3),marker=dict(size=8)),secondary_y=False)
-                    if "Zarejestrowani" in woj.columns:
-                        fig.add_trace(go.Bar(x=woj["Okres"],y=woj["Zarejestrowani"],
-                            name="Zarejestrowani",marker_color="#93c5fd",opacity=0.7),secondary_y=True)
-                    fig.update_layout(title="Bezrobocie – województwo mazowieckie",height=380,**PLOTLY_LAYOUT)
-                    st.plotly_chart(fig,use_container_width=True)
-                with col_r:
-                    # Kategorie
-                    kat_map = {"Bez kwalif.":"Bez_kwalif","Do 30 lat":"Do_30_lat",
-                               "Pow. 50 lat":"Pow_50_lat","Na wsi":"Na_wsi",
-                               "Długotrwale":"Dlugoterwale","Cudzoziemcy":"Cudzoziemcy"}
-                    wybrane = st.multiselect("Kategorie do wykresu",list(kat_map.keys()),
-                                             default=["Bez kwalif.","Do 30 lat","Na wsi"])
-                    if wybrane:
-                        fig2 = go.Figure()
-                        for k in wybrane:
-                            col = kat_map[k]
-                            if col in woj.columns:
-                                fig2.add_trace(go.Scatter(x=woj["Okres"],y=woj[col],
-                                    name=k,mode="lines+markers",marker=dict(size=7)))
-                        fig2.update_layout(title="Kategorie bezrobotnych",height=380,**PLOTLY_LAYOUT)
-                        st.plotly_chart(fig2,use_container_width=True)
+            if bz1.open:
+                if not woj.empty:
+                    col_l, col_r = st.columns(2)
+                    with col_l:
+                        def budowa_woj():
+                            fig = make_subplots(specs=[[{"secondary_y":True}]])
+                            fig.add_trace(go.Scatter(x=woj["Okres"],y=woj["Stan_koniec"],
+                                name="Stan końcowy",mode="lines+markers",
+                                line=dict(color=C_RED,width=3),marker=dict(size=8)),secondary_y=False)
+                            if "Zarejestrowani" in woj.columns:
+                                fig.add_trace(go.Bar(x=woj["Okres"],y=woj["Zarejestrowani"],
+                                    name="Zarejestrowani",marker_color="#93c5fd",opacity=0.7),secondary_y=True)
+                            fig.update_layout(title="Bezrobocie – województwo mazowieckie",height=380,**PLOTLY_LAYOUT)
+                            return fig
+                        wykres(("bz_woj", stan_folderu(folder_bezr)), budowa_woj)
+                    with col_r:
+                        # Kategorie
+                        kat_map = {"Bez kwalif.":"Bez_kwalif","Do 30 lat":"Do_30_lat",
+                                   "Pow. 50 lat":"Pow_50_lat","Na wsi":"Na_wsi",
+                                   "Długotrwale":"Dlugoterwale","Cudzoziemcy":"Cudzoziemcy"}
+                        wybrane = st.multiselect("Kategorie do wykresu",list(kat_map.keys()),
+                                                 default=["Bez kwalif.","Do 30 lat","Na wsi"])
+                        if wybrane:
+                            def budowa_kategorii():
+                                fig2 = go.Figure()
+                                for k in wybrane:
+                                    col = kat_map[k]
+                                    if col in woj.columns:
+                                        fig2.add_trace(go.Scatter(x=woj["Okres"],y=woj[col],
+                                            name=k,mode="lines+markers",marker=dict(size=7)))
+                                fig2.update_layout(title="Kategorie bezrobotnych",height=380,**PLOTLY_LAYOUT)
+                                return fig2
+                            wykres(("bz_kategorie", stan_folderu(folder_bezr), tuple(wybrane)), budowa_kategorii)
 
         with bz2:
-            if not powiaty.empty:
-                dostepne = list(dict.fromkeys(powiaty.sort_values("Sort_key")["Okres"].astype(str).tolist()))
-                wybrany = st.selectbox("Miesiąc",dostepne,index=len(dostepne)-1,key="bz2_okres")
-                pow_m = powiaty[powiaty["Okres"].astype(str)==wybrany].copy()
-                col_l,col_r = st.columns([3,2])
-                with col_l:
-                    fig = px.bar(pow_m.sort_values("Stan_koniec"),
-                        x="Stan_koniec",y="Region",orientation="h",
-                        color="Stan_koniec",color_continuous_scale=["#dbeafe",C_NAVY],
-                        height=700,title=f"Bezrobotni wg powiatów – {wybrany}",
-                        labels={"Stan_koniec":"Bezrobotni","Region":""})
-                    fig.update_layout(coloraxis_showscale=False,**PLOTLY_LAYOUT)
-                    st.plotly_chart(fig,use_container_width=True)
-                with col_r:
-                    st.dataframe(
-                        pow_m[["Region","Stan_koniec","Zarejestrowani","Z_zasilkiem","Bez_kwalif","Do_30_lat"]]
-                        .sort_values("Stan_koniec",ascending=False)
-                        .rename(columns={"Region":"Powiat","Stan_koniec":"Bezrobotni","Z_zasilkiem":"Z zasiłkiem","Bez_kwalif":"Bez kwalif.","Do_30_lat":"Do 30 lat"}),
-                        use_container_width=True,hide_index=True,height=680)
+            if bz2.open:
+                if not powiaty.empty:
+                    dostepne = list(dict.fromkeys(powiaty.sort_values("Sort_key")["Okres"].astype(str).tolist()))
+                    wybrany = st.selectbox("Miesiąc",dostepne,index=len(dostepne)-1,key="bz2_okres")
+                    pow_m = powiaty[powiaty["Okres"].astype(str)==wybrany]
+                    col_l,col_r = st.columns([3,2])
+                    with col_l:
+                        def budowa_powiatow():
+                            fig = px.bar(pow_m.sort_values("Stan_koniec"),
+                                x="Stan_koniec",y="Region",orientation="h",
+                                color="Stan_koniec",color_continuous_scale=["#dbeafe",C_NAVY],
+                                height=700,title=f"Bezrobotni wg powiatów – {wybrany}",
+                                labels={"Stan_koniec":"Bezrobotni","Region":""})
+                            fig.update_layout(coloraxis_showscale=False,**PLOTLY_LAYOUT)
+                            return fig
+                        wykres(("bz_powiaty", stan_folderu(folder_bezr), wybrany), budowa_powiatow)
+                    with col_r:
+                        st.dataframe(
+                            pow_m[["Region","Stan_koniec","Zarejestrowani","Z_zasilkiem","Bez_kwalif","Do_30_lat"]]
+                            .sort_values("Stan_koniec",ascending=False)
+                            .rename(columns={"Region":"Powiat","Stan_koniec":"Bezrobotni","Z_zasilkiem":"Z zasiłkiem","Bez_kwalif":"Bez kwalif.","Do_30_lat":"Do 30 lat"}),
+                            use_container_width=True,hide_index=True,height=680)
 
 
         with bz3:
-            if not powiaty.empty and powiaty["Okres"].nunique()>1:
-                lista_pow = sorted(powiaty["Region"].unique())
-                wyb_pow = st.selectbox("Powiat",lista_pow,key="bz3_pow")
-                pow_t = powiaty[powiaty["Region"]==wyb_pow].sort_values("Sort_key")
-                fig = make_subplots(specs=[[{"secondary_y":True}]])
-                fig.add_trace(go.Scatter(x=pow_t["Okres"],y=pow_t["Stan_koniec"],
-                    name="Stan końcowy",mode="lines+markers",
-                    line=dict(color=C_RED,width=3),marker=dict(size=9)),secondary_y=False)
-                fig.add_trace(go.Bar(x=pow_t["Okres"],y=pow_t["Zarejestrowani"],
-                    name="Zarejestrowani",marker_color="#93c5fd",opacity=0.7),secondary_y=True)
-                fig.update_layout(title=f"Bezrobocie – {wyb_pow}",height=400,**PLOTLY_LAYOUT)
-                st.plotly_chart(fig,use_container_width=True)
-                st.dataframe(
-                    pow_t[["Okres","Stan_koniec","Zarejestrowani","Bez_kwalif","Do_30_lat","Na_wsi","Dlugoterwale"]]
-                    .rename(columns={"Stan_koniec":"Stan końcowy","Bez_kwalif":"Bez kwalif.","Do_30_lat":"Do 30 lat","Na_wsi":"Na wsi","Dlugoterwale":"Długotrwale"}),
-                    use_container_width=True,hide_index=True)
-            else:
-                st.info("Potrzeba ≥2 miesięcy danych")
+            if bz3.open:
+                if not powiaty.empty and powiaty["Okres"].nunique()>1:
+                    lista_pow = sorted(powiaty["Region"].unique())
+                    wyb_pow = st.selectbox("Powiat",lista_pow,key="bz3_pow")
+                    pow_t = powiaty[powiaty["Region"]==wyb_pow].sort_values("Sort_key")
+                    def budowa_powiatu():
+                        fig = make_subplots(specs=[[{"secondary_y":True}]])
+                        fig.add_trace(go.Scatter(x=pow_t["Okres"],y=pow_t["Stan_koniec"],
+                            name="Stan końcowy",mode="lines+markers",
+                            line=dict(color=C_RED,width=3),marker=dict(size=9)),secondary_y=False)
+                        fig.add_trace(go.Bar(x=pow_t["Okres"],y=pow_t["Zarejestrowani"],
+                            name="Zarejestrowani",marker_color="#93c5fd",opacity=0.7),secondary_y=True)
+                        fig.update_layout(title=f"Bezrobocie – {wyb_pow}",height=400,**PLOTLY_LAYOUT)
+                        return fig
+                    wykres(("bz_powiat", stan_folderu(folder_bezr), wyb_pow), budowa_powiatu)
+                    st.dataframe(
+                        pow_t[["Okres","Stan_koniec","Zarejestrowani","Bez_kwalif","Do_30_lat","Na_wsi","Dlugoterwale"]]
+                        .rename(columns={"Stan_koniec":"Stan końcowy","Bez_kwalif":"Bez kwalif.","Do_30_lat":"Do 30 lat","Na_wsi":"Na wsi","Dlugoterwale":"Długotrwale"}),
+                        use_container_width=True,hide_index=True)
+                else:
+                    st.info("Potrzeba ≥2 miesięcy danych")
 
         with bz4:
-            typ_f = st.radio("Pokaż",["województwo","powiat"],horizontal=True)
-            dt = df_bezr[df_bezr["Typ"]==typ_f].copy()
-            cols = ["Okres","Region","Stan_koniec","Stan_koniec_K","Zarejestrowani","Z_zasilkiem","Bez_kwalif","Do_30_lat","Na_wsi","Cudzoziemcy"]
-            cols = [c for c in cols if c in dt.columns]
-            st.dataframe(dt.sort_values(["Sort_key","Stan_koniec"],ascending=[True,False])[cols].rename(
-                columns={"Stan_koniec":"Stan końcowy","Stan_koniec_K":"w tym kobiety","Z_zasilkiem":"Z zasiłkiem","Bez_kwalif":"Bez kwalif.","Do_30_lat":"Do 30 lat","Na_wsi":"Na wsi"}),
-                use_container_width=True,hide_index=True,height=500)
-            if not dt.empty:
-                csv = dt[cols].to_csv(index=False).encode("utf-8")
-                st.download_button("⬇️ Pobierz CSV",csv,f"bezrobocie_{typ_f}.csv","text/csv")
+            if bz4.open:
+                typ_f = st.radio("Pokaż",["województwo","powiat"],horizontal=True)
+                dt = df_bezr[df_bezr["Typ"]==typ_f]
+                cols = ["Okres","Region","Stan_koniec","Stan_koniec_K","Zarejestrowani","Z_zasilkiem","Bez_kwalif","Do_30_lat","Na_wsi","Cudzoziemcy"]
+                cols = [c for c in cols if c in dt.columns]
+                siatka(dt.sort_values(["Sort_key","Stan_koniec"],ascending=[True,False])[cols].rename(
+                    columns={"Stan_koniec":"Stan końcowy","Stan_koniec_K":"w tym kobiety","Z_zasilkiem":"Z zasiłkiem","Bez_kwalif":"Bez kwalif.","Do_30_lat":"Do 30 lat","Na_wsi":"Na wsi"}),
+                    key="siatka_bezr_tab")
+                if not dt.empty:
+                    przycisk_eksportu("⬇️ Pobierz", {f"bezrobocie_{typ_f}": dt[cols]}, f"bezrobocie_{typ_f}",
+                                      (stan_folderu(folder_bezr), typ_f), key="eksp_bezr_tab")
 
 # ══════════════════════════════════════════════════════════
 # STOPA BEZROBOCIA
@@ -918,286 +736,301 @@ elif current_page == "stopa":
         ]
         regiony_s = df_stopa[df_stopa["Typ"].isin(["region","podregion"])]
 
-        if not woj_s.empty:
-            ost = woj_s.sort_values("Sort_key").iloc[-1]
+        # KPI stopy pochodzą tylko z GUS – strona nie czeka na MRPiPS-01
+        kpi_maz = migawka((stan_folderu(folder_stopa),), {"stopa_bezrobocia": df_stopa})["kpi"]
+        if ("Mazowieckie","Stopa") in kpi_maz:
             c1,c2,c3 = st.columns(3)
-            c1.metric("Stopa bezrobocia – Mazowieckie", f"{ost['Stopa']} %")
-            c2.metric("Bezrobotni", f"{ost['Bezrobotni_tys']} tys.")
+            c1.metric("Stopa bezrobocia – Mazowieckie", f"{kpi_maz['Mazowieckie','Stopa']['Wartość']} %")
+            c2.metric("Bezrobotni", f"{kpi_maz['Mazowieckie','Bezrobotni_tys']['Wartość']} tys.")
             c3.metric("Liczba miesięcy danych", df_stopa["Okres"].nunique())
 
-        st_tab1, st_tab2, st_tab3 = st.tabs(["📈 Trend", "🗺️ Mapy + Powiaty", "📋 Tabela"])
+        # Paleta wspólna dla wykresów trendu (zakładki Trend i Mapy + Powiaty)
+        PALETA = [
+            "#c0392b","#2980b9","#27ae60","#8e44ad","#e67e22",
+            "#16a085","#d35400","#2c3e50","#f39c12","#1abc9c",
+            "#e74c3c","#3498db","#2ecc71","#9b59b6","#e74c3c",
+            "#1a3a5c",
+        ]
+
+        st_tab1, st_tab2, st_tab3 = st.tabs(["📈 Trend", "🗺️ Mapy + Powiaty", "📋 Tabela"], key="stopa_zakladka", on_change="rerun")
 
         # ── TAB 1: TREND ──────────────────────────────────────────────────
         with st_tab1:
-            if df_stopa["Okres"].nunique() < 2:
-                st.info("Potrzeba ≥2 miesięcy danych do wykresu trendu")
-            else:
-                # ── Wykres województw ──
-                st.markdown('<div class="sec-label">Stopa bezrobocia – województwa</div>',
-                            unsafe_allow_html=True)
-                woj_all = woj_s.sort_values("Sort_key")
-                lista_woj = sorted(woj_all["Nazwa"].dropna().unique())
-
-                # Multiselect NA GÓRZE – pełna szerokość
-                wybrane_woj = st.multiselect(
-                    "Wybierz województwa",
-                    lista_woj,
-                    default=["Mazowieckie"] if "Mazowieckie" in lista_woj else lista_woj[:5],
-                    key="trend_woj"
-                )
-
-                PALETA = [
-                    "#c0392b","#2980b9","#27ae60","#8e44ad","#e67e22",
-                    "#16a085","#d35400","#2c3e50","#f39c12","#1abc9c",
-                    "#e74c3c","#3498db","#2ecc71","#9b59b6","#e74c3c",
-                    "#1a3a5c",
-                ]
-
-                fig_woj = go.Figure()
-                for i, wn in enumerate(wybrane_woj):
-                    d = woj_all[woj_all["Nazwa"] == wn]
-                    kolor = PALETA[i % len(PALETA)]
-                    is_maz = "mazow" in wn.lower()
-                    fig_woj.add_trace(go.Scatter(
-                        x=d["Okres"], y=d["Stopa"],
-                        mode="lines+markers", name=wn,
-                        line=dict(color=kolor, width=4 if is_maz else 2),
-                        marker=dict(size=9 if is_maz else 6,
-                                    symbol="circle",
-                                    line=dict(color="white", width=1.5)),
-                    ))
-                fig_woj.update_layout(
-                    height=420,
-                    yaxis_title="Stopa bezrobocia (%)",
-                    yaxis=dict(gridcolor="#f1f5f9", ticksuffix=" %",
-                               tickfont=dict(size=11, color="#94a3b8")),
-                    xaxis=dict(showgrid=False, tickfont=dict(size=11, color="#94a3b8")),
-                    legend=dict(orientation="h", y=-0.25, font=dict(size=11)),
-                    hovermode="x unified",
-                    paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
-                    font=dict(family="Inter, system-ui", size=12, color="#475569"),
-                    margin=dict(t=20, b=10),
-                )
-                st.plotly_chart(fig_woj, use_container_width=True)
-
-                # ── Wykres regionów i podregionów ──
-                if not regiony_s.empty and regiony_s["Okres"].nunique() >= 2:
-                    st.markdown("---")
-                    st.markdown('<div class="sec-label">Stopa bezrobocia – regiony i podregiony mazowieckie</div>',
+            if st_tab1.open:
+                if df_stopa["Okres"].nunique() < 2:
+                    st.info("Potrzeba ≥2 miesięcy danych do wykresu trendu")
+                else:
+                    # ── Wykres województw ──
+                    st.markdown('<div class="sec-label">Stopa bezrobocia – województwa</div>',
                                 unsafe_allow_html=True)
-                    reg_all = regiony_s.sort_values("Sort_key")
-                    lista_reg = sorted(reg_all["Nazwa"].dropna().unique())
-
-                    wybrane_reg = st.multiselect(
-                        "Wybierz regiony / podregiony",
-                        lista_reg,
-                        default=lista_reg,
-                        key="trend_reg"
+                    woj_all = woj_s.sort_values("Sort_key")
+                    lista_woj = sorted(woj_all["Nazwa"].dropna().unique())
+
+                    # Multiselect NA GÓRZE – pełna szerokość
+                    wybrane_woj = st.multiselect(
+                        "Wybierz województwa",
+                        lista_woj,
+                        default=["Mazowieckie"] if "Mazowieckie" in lista_woj else lista_woj[:5],
+                        key="trend_woj"
                     )
-                    fig_reg = go.Figure()
-                    for i, rn in enumerate(wybrane_reg):
-                        d = reg_all[reg_all["Nazwa"] == rn]
-                        fig_reg.add_trace(go.Scatter(
-                            x=d["Okres"], y=d["Stopa"],
-                            mode="lines+markers", name=rn,
-                            line=dict(color=PALETA[i % len(PALETA)], width=2),
-                            marker=dict(size=7, line=dict(color="white", width=1.5)),
-                            fill="tozeroy",
-                            fillcolor=f"rgba({','.join(str(int(PALETA[i%len(PALETA)].lstrip('#')[j:j+2],16)) for j in (0,2,4))},0.06)",
-                        ))
-                    fig_reg.update_layout(
-                        height=380,
-                        yaxis_title="Stopa bezrobocia (%)",
-                        yaxis=dict(gridcolor="#f1f5f9", ticksuffix=" %",
-                                   tickfont=dict(size=11, color="#94a3b8")),
-                        xaxis=dict(showgrid=False, tickfont=dict(size=11, color="#94a3b8")),
-                        legend=dict(orientation="h", y=-0.28, font=dict(size=11)),
-                        hovermode="x unified",
-                        paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
-                        font=dict(family="Inter, system-ui", size=12, color="#475569"),
-                        margin=dict(t=20, b=10),
-                    )
-                    st.plotly_chart(fig_reg, use_container_width=True)
+
+
+                    def budowa_woj():
+                        fig_woj = go.Figure()
+                        for i, wn in enumerate(wybrane_woj):
+                            d = woj_all[woj_all["Nazwa"] == wn]
+                            kolor = PALETA[i % len(PALETA)]
+                            is_maz = "mazow" in wn.lower()
+                            fig_woj.add_trace(go.Scatter(
+                                x=d["Okres"], y=d["Stopa"],
+                                mode="lines+markers", name=wn,
+                                line=dict(color=kolor, width=4 if is_maz else 2),
+                                marker=dict(size=9 if is_maz else 6,
+                                            symbol="circle",
+                                            line=dict(color="white", width=1.5)),
+                            ))
+                        fig_woj.update_layout(
+                            height=420,
+                            yaxis_title="Stopa bezrobocia (%)",
+                            yaxis=dict(gridcolor="#f1f5f9", ticksuffix=" %",
+                                       tickfont=dict(size=11, color="#94a3b8")),
+                            xaxis=dict(showgrid=False, tickfont=dict(size=11, color="#94a3b8")),
+                            legend=dict(orientation="h", y=-0.25, font=dict(size=11)),
+                            hovermode="x unified",
+                            paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
+                            font=dict(family="Inter, system-ui", size=12, color="#475569"),
+                            margin=dict(t=20, b=10),
+                        )
+                        return fig_woj
+                    wykres(("stopa_woj", stan_folderu(folder_stopa), tuple(wybrane_woj)), budowa_woj)
+
+                    # ── Wykres regionów i podregionów ──
+                    if not regiony_s.empty and regiony_s["Okres"].nunique() >= 2:
+                        st.markdown("---")
+                        st.markdown('<div class="sec-label">Stopa bezrobocia – regiony i podregiony mazowieckie</div>',
+                                    unsafe_allow_html=True)
+                        reg_all = regiony_s.sort_values("Sort_key")
+                        lista_reg = sorted(reg_all["Nazwa"].dropna().unique())
+
+                        wybrane_reg = st.multiselect(
+                            "Wybierz regiony / podregiony",
+                            lista_reg,
+                            default=lista_reg,
+                            key="trend_reg"
+                        )
+                        def budowa_reg():
+                            fig_reg = go.Figure()
+                            for i, rn in enumerate(wybrane_reg):
+                                d = reg_all[reg_all["Nazwa"] == rn]
+                                fig_reg.add_trace(go.Scatter(
+                                    x=d["Okres"], y=d["Stopa"],
+                                    mode="lines+markers", name=rn,
+                                    line=dict(color=PALETA[i % len(PALETA)], width=2),
+                                    marker=dict(size=7, line=dict(color="white", width=1.5)),
+                                    fill="tozeroy",
+                                    fillcolor=f"rgba({','.join(str(int(PALETA[i%len(PALETA)].lstrip('#')[j:j+2],16)) for j in (0,2,4))},0.06)",
+                                ))
+                            fig_reg.update_layout(
+                                height=380,
+                                yaxis_title="Stopa bezrobocia (%)",
+                                yaxis=dict(gridcolor="#f1f5f9", ticksuffix=" %",
+                                           tickfont=dict(size=11, color="#94a3b8")),
+                                xaxis=dict(showgrid=False, tickfont=dict(size=11, color="#94a3b8")),
+                                legend=dict(orientation="h", y=-0.28, font=dict(size=11)),
+                                hovermode="x unified",
+                                paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
+                                font=dict(family="Inter, system-ui", size=12, color="#475569"),
+                                margin=dict(t=20, b=10),
+                            )
+                            return fig_reg
+                        wykres(("stopa_reg", stan_folderu(folder_stopa), tuple(wybrane_reg)), budowa_reg)
 
         # ── TAB 2: MAPY + POWIATY ─────────────────────────────────────────
         with st_tab2:
-            dostepne = list(dict.fromkeys(
-                df_stopa.sort_values("Sort_key")["Okres"].astype(str).unique().tolist()
-            ))
-            wybrany = st.selectbox("Miesiąc", dostepne, index=len(dostepne)-1, key="stopa_okres")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**🇵🇱 Polska – stopa wg województw**")
-                woj_m = woj_s[woj_s["Okres"].astype(str)==wybrany].drop_duplicates("Geo_nazwa")
-                rysuj_mape(woj_m, geojson_woj, f"Polska · {wybrany}",
-                           zoom=4.6, center={"lat":52.1,"lon":19.4}, height=560)
-            with col2:
-                st.markdown("**📍 Mazowieckie – stopa wg powiatów**")
-                pow_m = powiaty_s[powiaty_s["Okres"].astype(str)==wybrany].copy()
-                rysuj_mape(pow_m, geojson, f"Mazowieckie · {wybrany}",
-                           zoom=6.4, center={"lat":52.1,"lon":21.0}, height=560)
-
-            # Powiaty – ranking + tabela pełna szerokość
-            if not pow_m.empty:
-                st.markdown("---")
-                st.markdown('<div class="sec-label">Ranking powiatów mazowieckich</div>',
-                            unsafe_allow_html=True)
-
-                col_bar, col_tbl = st.columns([3, 2])
-                with col_bar:
-                    fig_bar = px.bar(
-                        pow_m.sort_values("Stopa", ascending=False),
-                        x="Stopa", y="Nazwa", orientation="h",
-                        color="Stopa",
-                        color_continuous_scale=["#dbeafe", "#1a3a5c", C_RED],
-                        height=max(500, len(pow_m)*22),
-                        labels={"Stopa":"Stopa %","Nazwa":""}
-                    )
-                    fig_bar.update_layout(
-                        coloraxis_showscale=False,
-                        yaxis=dict(tickfont=dict(size=10), gridcolor="#f1f5f9"),
-                    )
-                    st.plotly_chart(fig_bar, use_container_width=True)
+            if st_tab2.open:
+                dostepne = list(dict.fromkeys(
+                    df_stopa.sort_values("Sort_key")["Okres"].astype(str).unique().tolist()
+                ))
+                wybrany = st.selectbox("Miesiąc", dostepne, index=len(dostepne)-1, key="stopa_okres")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown("**🇵🇱 Polska – stopa wg województw**")
+                    woj_m = woj_s[woj_s["Okres"].astype(str)==wybrany].drop_duplicates("Geo_nazwa")
+                    rysuj_mape(woj_m, geojson_woj, f"Polska · {wybrany}",
+                               zoom=4.6, center={"lat":52.1,"lon":19.4}, height=560,
+                               klucz=(stan_folderu(folder_stopa), wybrany, geojson_woj_sciezka, stan_pliku(geojson_woj_sciezka)))
+                with col2:
+                    st.markdown("**📍 Mazowieckie – stopa wg powiatów**")
+                    pow_m = powiaty_s[powiaty_s["Okres"].astype(str)==wybrany]
+                    rysuj_mape(pow_m, geojson, f"Mazowieckie · {wybrany}",
+                               zoom=6.4, center={"lat":52.1,"lon":21.0}, height=560,
+                               klucz=(stan_folderu(folder_stopa), wybrany, geojson_sciezka, stan_pliku(geojson_sciezka)))
+
+                # Powiaty – ranking + tabela pełna szerokość
+                if not pow_m.empty:
+                    st.markdown("---")
+                    st.markdown('<div class="sec-label">Ranking powiatów mazowieckich</div>',
+                                unsafe_allow_html=True)
+
+                    col_bar, col_tbl = st.columns([3, 2])
+                    with col_bar:
+                        def budowa_rankingu():
+                            fig_bar = px.bar(
+                                pow_m.sort_values("Stopa", ascending=False),
+                                x="Stopa", y="Nazwa", orientation="h",
+                                color="Stopa",
+                                color_continuous_scale=["#dbeafe", "#1a3a5c", C_RED],
+                                height=max(500, len(pow_m)*22),
+                                labels={"Stopa":"Stopa %","Nazwa":""}
+                            )
+                            fig_bar.update_layout(
+                                coloraxis_showscale=False,
+                                yaxis=dict(tickfont=dict(size=10), gridcolor="#f1f5f9"),
+                            )
+                            return fig_bar
+                        wykres(("stopa_ranking", stan_folderu(folder_stopa), wybrany), budowa_rankingu)
+
+                    with col_tbl:
+                        # Tabela w stylu Excel – kolorowanie wierszy wg stopy
+                        tbl = (pow_m[["Nazwa","Stopa","Bezrobotni_tys"]]
+                               .sort_values("Stopa", ascending=False)
+                               .rename(columns={"Stopa":"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"})
+                               .reset_index(drop=True))
+                        tbl.index = tbl.index + 1  # numeracja od 1
+
+                        def stopa_color(val):
+                            if pd.isna(val): return ""
+                            if val >= 15:    return "background-color:#fecaca;color:#991b1b;font-weight:700"
+                            if val >= 10:    return "background-color:#fed7aa;color:#92400e;font-weight:600"
+                            if val >= 6:     return "background-color:#fef9c3;color:#854d0e"
+                            if val <= 3:     return "background-color:#dcfce7;color:#166534;font-weight:600"
+                            return ""
+
+                        styled = (tbl.style
+                            .applymap(stopa_color, subset=["Stopa %"])
+                            .format({"Stopa %": "{:.1f}%", "Bezrobotni (tys.)": "{:.1f}"})
+                            .set_properties(**{
+                                "font-size":"13px",
+                                "font-family":"Inter, sans-serif",
+                                "border":"1px solid #e2e8f0",
+                                "padding":"6px 10px",
+                            })
+                            .set_table_styles([
+                                {"selector":"thead th","props":[
+                                    ("background-color","#1a3a5c"),
+                                    ("color","white"),
+                                    ("font-weight","700"),
+                                    ("font-size","12px"),
+                                    ("padding","8px 10px"),
+                                    ("text-align","left"),
+                                ]},
+                                {"selector":"tbody tr:hover td","props":[
+                                    ("background-color","#f0f9ff !important"),
+                                ]},
+                                {"selector":"tbody tr:nth-child(even) td","props":[
+                                    ("background-color","#f8fafc"),
+                                ]},
+                            ])
+                        )
+                        st.dataframe(styled, use_container_width=True,
+                                     height=max(500, len(tbl)*32+40))
+
+                # Trend powiatów
+                if not powiaty_s.empty and powiaty_s["Okres"].nunique() > 1:
+                    st.markdown("---")
+                    st.markdown('<div class="sec-label">Trend stopy bezrobocia – powiaty mazowieckie</div>',
+                                unsafe_allow_html=True)
+                    col_l2, col_r2 = st.columns([4, 1])
+                    lista_pow = sorted(powiaty_s["Nazwa"].dropna().unique())
+                    with col_r2:
+                        wybrane_pow = st.multiselect(
+                            "Wybierz powiaty", lista_pow,
+                            default=lista_pow[:5] if len(lista_pow) >= 5 else lista_pow,
+                            key="trend_pow"
+                        )
+                    with col_l2:
+                        def budowa_trendu():
+                            fig_pt = go.Figure()
+                            for i, pn in enumerate(wybrane_pow):
+                                d = powiaty_s[powiaty_s["Nazwa"] == pn].sort_values("Sort_key")
+                                fig_pt.add_trace(go.Scatter(
+                                    x=d["Okres"], y=d["Stopa"],
+                                    mode="lines+markers", name=pn,
+                                    line=dict(color=PALETA[i % len(PALETA)], width=2),
+                                    marker=dict(size=7, line=dict(color="white", width=1.5)),
+                                ))
+                            fig_pt.update_layout(
+                                height=380, yaxis_title="Stopa %",
+                                yaxis=dict(gridcolor="#f1f5f9", ticksuffix=" %"),
+                                hovermode="x unified",
+                                paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
+                                font=dict(family="Inter, system-ui", size=12),
+                                legend=dict(orientation="h", y=-0.28, font=dict(size=10)),
+                            )
+                            return fig_pt
+                        wykres(("stopa_trend_pow", stan_folderu(folder_stopa), tuple(wybrane_pow)), budowa_trendu)
+
+        # ── TAB 3: TABELE ────────────────────────────────────────────────
+        with st_tab3:
+            if st_tab3.open:
+                dostepne_t = list(dict.fromkeys(
+                    df_stopa.sort_values("Sort_key")["Okres"].astype(str).unique().tolist()
+                ))
+                wybrany_t = st.selectbox("Miesiąc", dostepne_t,
+                                         index=len(dostepne_t)-1, key="stopa_tbl_okres")
 
-                with col_tbl:
-                    # Tabela w stylu Excel – kolorowanie wierszy wg stopy
-                    tbl = (pow_m[["Nazwa","Stopa","Bezrobotni_tys"]]
-                           .sort_values("Stopa", ascending=False)
-                           .rename(columns={"Stopa":"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"})
-                           .reset_index(drop=True))
-                    tbl.index = tbl.index + 1  # numeracja od 1
+                col_t1, col_t2 = st.columns(2)
 
-                    def stopa_color(val):
+                def styl_tabeli(df_in, col_stopa="Stopa %"):
+                    def color_row(val):
                         if pd.isna(val): return ""
                         if val >= 15:    return "background-color:#fecaca;color:#991b1b;font-weight:700"
                         if val >= 10:    return "background-color:#fed7aa;color:#92400e;font-weight:600"
                         if val >= 6:     return "background-color:#fef9c3;color:#854d0e"
                         if val <= 3:     return "background-color:#dcfce7;color:#166534;font-weight:600"
                         return ""
-
-                    styled = (tbl.style
-                        .applymap(stopa_color, subset=["Stopa %"])
-                        .format({"Stopa %": "{:.1f}%", "Bezrobotni (tys.)": "{:.1f}"})
-                        .set_properties(**{
-                            "font-size":"13px",
-                            "font-family":"Inter, sans-serif",
-                            "border":"1px solid #e2e8f0",
-                            "padding":"6px 10px",
-                        })
+                    return (df_in.style
+                        .applymap(color_row, subset=[col_stopa])
+                        .format({col_stopa: "{:.1f}%", "Bezrobotni (tys.)": "{:.1f}"})
+                        .set_properties(**{"font-size":"12px","border":"1px solid #e2e8f0","padding":"5px 9px"})
                         .set_table_styles([
                             {"selector":"thead th","props":[
-                                ("background-color","#1a3a5c"),
-                                ("color","white"),
-                                ("font-weight","700"),
-                                ("font-size","12px"),
-                                ("padding","8px 10px"),
-                                ("text-align","left"),
-                            ]},
-                            {"selector":"tbody tr:hover td","props":[
-                                ("background-color","#f0f9ff !important"),
+                                ("background-color","#1a3a5c"),("color","white"),
+                                ("font-weight","700"),("padding","7px 9px"),
                             ]},
                             {"selector":"tbody tr:nth-child(even) td","props":[
                                 ("background-color","#f8fafc"),
                             ]},
                         ])
                     )
-                    st.dataframe(styled, use_container_width=True,
-                                 height=max(500, len(tbl)*32+40))
 
-            # Trend powiatów
-            if not powiaty_s.empty and powiaty_s["Okres"].nunique() > 1:
-                st.markdown("---")
-                st.markdown('<div class="sec-label">Trend stopy bezrobocia – powiaty mazowieckie</div>',
-                            unsafe_allow_html=True)
-                col_l2, col_r2 = st.columns([4, 1])
-                lista_pow = sorted(powiaty_s["Nazwa"].dropna().unique())
-                with col_r2:
-                    wybrane_pow = st.multiselect(
-                        "Wybierz powiaty", lista_pow,
-                        default=lista_pow[:5] if len(lista_pow) >= 5 else lista_pow,
-                        key="trend_pow"
-                    )
-                with col_l2:
-                    fig_pt = go.Figure()
-                    for i, pn in enumerate(wybrane_pow):
-                        d = powiaty_s[powiaty_s["Nazwa"] == pn].sort_values("Sort_key")
-                        fig_pt.add_trace(go.Scatter(
-                            x=d["Okres"], y=d["Stopa"],
-                            mode="lines+markers", name=pn,
-                            line=dict(color=PALETA[i % len(PALETA)], width=2),
-                            marker=dict(size=7, line=dict(color="white", width=1.5)),
-                        ))
-                    fig_pt.update_layout(
-                        height=380, yaxis_title="Stopa %",
-                        yaxis=dict(gridcolor="#f1f5f9", ticksuffix=" %"),
-                        hovermode="x unified",
-                        paper_bgcolor="#ffffff", plot_bgcolor="#ffffff",
-                        font=dict(family="Inter, system-ui", size=12),
-                        legend=dict(orientation="h", y=-0.28, font=dict(size=10)),
-                    )
-                    st.plotly_chart(fig_pt, use_container_width=True)
+                with col_t1:
+                    st.markdown("**🇵🇱 Województwa**")
+                    woj_t = woj_s[woj_s["Okres"].astype(str)==wybrany_t]
+                    if not woj_t.empty:
+                        tbl_w = (woj_t[["Nazwa","Stopa","Bezrobotni_tys"]]
+                                 .sort_values("Stopa", ascending=False)
+                                 .rename(columns={"Stopa":"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"})
+                                 .reset_index(drop=True))
+                        tbl_w.index += 1
+                        st.dataframe(styl_tabeli(tbl_w), use_container_width=True, height="content")
+
+                with col_t2:
+                    st.markdown("**📍 Powiaty mazowieckie**")
+                    pow_t = powiaty_s[powiaty_s["Okres"].astype(str)==wybrany_t]
+                    if not pow_t.empty:
+                        tbl_p = (pow_t[["Nazwa","Stopa","Bezrobotni_tys"]]
+                                 .sort_values("Stopa", ascending=False)
+                                 .rename(columns={"Stopa":"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"})
+                                 .reset_index(drop=True))
+                        tbl_p.index += 1
+                        st.dataframe(styl_tabeli(tbl_p), use_container_width=True, height="content")
 
-        # ── TAB 3: TABELE ────────────────────────────────────────────────
-        with st_tab3:
-            dostepne_t = list(dict.fromkeys(
-                df_stopa.sort_values("Sort_key")["Okres"].astype(str).unique().tolist()
-            ))
-            wybrany_t = st.selectbox("Miesiąc", dostepne_t,
-                                     index=len(dostepne_t)-1, key="stopa_tbl_okres")
-
-            col_t1, col_t2 = st.columns(2)
-
-            def styl_tabeli(df_in, col_stopa="Stopa %"):
-                def color_row(val):
-                    if pd.isna(val): return ""
-                    if val >= 15:    return "background-color:#fecaca;color:#991b1b;font-weight:700"
-                    if val >= 10:    return "background-color:#fed7aa;color:#92400e;font-weight:600"
-                    if val >= 6:     return "background-color:#fef9c3;color:#854d0e"
-                    if val <= 3:     return "background-color:#dcfce7;color:#166534;font-weight:600"
-                    return ""
-                return (df_in.style
-                    .applymap(color_row, subset=[col_stopa])
-                    .format({col_stopa: "{:.1f}%", "Bezrobotni (tys.)": "{:.1f}"})
-                    .set_properties(**{"font-size":"12px","border":"1px solid #e2e8f0","padding":"5px 9px"})
-                    .set_table_styles([
-                        {"selector":"thead th","props":[
-                            ("background-color","#1a3a5c"),("color","white"),
-                            ("font-weight","700"),("padding","7px 9px"),
-                        ]},
-                        {"selector":"tbody tr:nth-child(even) td","props":[
-                            ("background-color","#f8fafc"),
-                        ]},
-                    ])
-                )
-
-            with col_t1:
-                st.markdown("**🇵🇱 Województwa**")
-                woj_t = woj_s[woj_s["Okres"].astype(str)==wybrany_t].copy()
-                if not woj_t.empty:
-                    tbl_w = (woj_t[["Nazwa","Stopa","Bezrobotni_tys"]]
-                             .sort_values("Stopa", ascending=False)
-                             .rename(columns={"Stopa":"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"})
-                             .reset_index(drop=True))
-                    tbl_w.index += 1
-                    st.dataframe(styl_tabeli(tbl_w), use_container_width=True, height="content")
-
-            with col_t2:
-                st.markdown("**📍 Powiaty mazowieckie**")
-                pow_t = powiaty_s[powiaty_s["Okres"].astype(str)==wybrany_t].copy()
-                if not pow_t.empty:
-                    tbl_p = (pow_t[["Nazwa","Stopa","Bezrobotni_tys"]]
-                             .sort_values("Stopa", ascending=False)
-                             .rename(columns={"Stopa":"Stopa %","Bezrobotni_tys":"Bezrobotni (tys.)"})
-                             .reset_index(drop=True))
-                    tbl_p.index += 1
-                    st.dataframe(styl_tabeli(tbl_p), use_container_width=True, height="content")
-
-            st.markdown("---")
-            if not df_stopa.empty:
-                csv = df_stopa.to_csv(index=False).encode("utf-8")
-                st.download_button("⬇️ Pobierz wszystkie dane CSV", csv,
-                                   "stopa_bezrobocia.csv","text/csv")
+                st.markdown("---")
+                if not df_stopa.empty:
+                    przycisk_eksportu("⬇️ Pobierz wszystkie dane", {"stopa_bezrobocia": df_stopa},
+                                      "stopa_bezrobocia", stan_folderu(folder_stopa), key="eksp_stopa_tab")
 
 # ══════════════════════════════════════════════════════════
 # ZWOLNIENIA
@@ -1208,13 +1041,13 @@ elif current_page == "zwolnienia":
         st.info("Brak danych zwolnień. Dodaj pliki do folderu `zwolnienia/`")
     else:
         # ── Przygotowanie list do filtrów ──
-        dostepne_okresy = (list(df_zwol["Okres"].cat.categories)
-                           if hasattr(df_zwol["Okres"],"cat")
-                           else sorted(df_zwol["Okres"].unique()))
-        dostepne_lata   = sorted(df_zwol["Rok"].unique())
-        dostepne_pkd    = sorted(df_zwol["PKD"].dropna().unique())
-        dostepne_firmy  = sorted(df_zwol["Nazwa"].dropna().unique())
-        dostepne_pow    = sorted(df_zwol["Powiat"].dropna().unique())
+        # Listy policzone raz razem z kostką (cache_resource)
+        kostka = kostka_zwolnien(folder_zwol, stan_folderu(folder_zwol))
+        dostepne_okresy = kostka["opcje"]["okresy"]
+        dostepne_lata   = kostka["opcje"]["lata"]
+        dostepne_pkd    = kostka["opcje"]["pkd"]
+        dostepne_firmy  = kostka["opcje"]["firmy"]
+        dostepne_pow    = kostka["opcje"]["powiaty"]
 
         # ── FILTRY ──
         with st.expander("🔧 Filtry", expanded=True):
@@ -1244,178 +1077,244 @@ elif current_page == "zwolnienia":
                     placeholder="Wszystkie powiaty")
 
             with fc3:
-                szukaj_firma = st.text_input("🔍 Szukaj firmy", key="zwol_firma")
-                filtr_firmy = st.multiselect("Firmy (lista)", dostepne_firmy,
+                szukaj_firma = st.text_input("🔍 Szukaj firmy", key="zwol_firma",
+                    placeholder="np. lodz, carrefour – bez polskich znaków i formy prawnej")
+                # Indeks trigramów: trafienia od najlepszego; zawężają też listę firm
+                szukane = wup_dane.szukaj_nazw(kostka["nazwy"], szukaj_firma) if szukaj_firma.strip() else None
+                opcje_firm = (dostepne_firmy if szukane is None else
+                              list(dict.fromkeys(st.session_state.get("zwol_firmy_lista", []) + szukane)))
+                filtr_firmy = st.multiselect("Firmy (lista)", opcje_firm,
                     default=[], key="zwol_firmy_lista",
                     placeholder="Wszystkie firmy")
 
         # ── Zastosuj filtry ──
-        mask = df_zwol["Okres"].isin(filtr_okresy)
-        if filtr_pkd:   mask &= df_zwol["PKD"].isin(filtr_pkd)
-        if filtr_pow:   mask &= df_zwol["Powiat"].isin(filtr_pow)
-        if filtr_firmy: mask &= df_zwol["Nazwa"].isin(filtr_firmy)
-        if szukaj_firma: mask &= df_zwol["Nazwa"].str.contains(szukaj_firma, case=False, na=False)
-        dff = df_zwol[mask].copy()
+        # Agregaty z kostki (wup_dane.kostka_zwolnien), nie z wierszy
+        wybor = wup_dane.wybierz_z_kostki(kostka, filtr_okresy, filtr_pkd, filtr_pow, filtr_firmy, szukane)
+        # Odcisk zbioru + filtrów – część klucza figur strony
+        klucz_wyboru = (stan_folderu(folder_zwol), tuple(filtr_okresy), tuple(filtr_pkd), tuple(filtr_pow),
+                        tuple(filtr_firmy), szukane if szukane is None else tuple(szukane))
 
         # ── KPI ──
-        if dff.empty:
+        if wybor["firmy"].empty:
             st.warning("Brak danych dla wybranych filtrów")
         else:
+            kpi = wup_dane.agreguj_zwolnienia(wybor, [], firmy=True).iloc[0]
             c1,c2,c3,c4,c5 = st.columns(5)
-            c1.metric("Miesięcy",  len(dff["Okres"].unique()))
-            c2.metric("Zgłoszeni", f"{int(dff['Zgłoszeni'].sum()):,}")
-            c3.metric("Wypow. zmien.", f"{int(dff['Wypow_zmieniające'].sum()):,}")
-            c4.metric("Zwolnieni", f"{int(dff['Zwolnieni'].sum()):,}")
-            c5.metric("Firm",      dff["Nazwa"].nunique())
+            c1.metric("Miesięcy",  wybor["firmy"]["Okres"].nunique())
+            c2.metric("Zgłoszeni", f"{int(kpi['Zgłoszeni']):,}")
+            c3.metric("Wypow. zmien.", f"{int(kpi['Wypow_zmieniające']):,}")
+            c4.metric("Zwolnieni", f"{int(kpi['Zwolnieni']):,}")
+            c5.metric("Firm",      int(kpi["Firmy"]))
 
-            tab1, tab2, tab3, tab4 = st.tabs(["📈 Trend miesięczny","🏭 Firmy w czasie","📊 PKD w czasie","🗺️ Powiaty"])
+            tab1, tab2, tab3, tab4 = st.tabs(["📈 Trend miesięczny","🏭 Firmy w czasie","📊 PKD w czasie","🗺️ Powiaty"], key="zwol_zakladka", on_change="rerun")
 
             # ── TAB 1: Trend miesięczny ──────────────────────────
             with tab1:
-                monthly = (dff.groupby("Okres", observed=True)
-                           .agg(Zwolnieni=("Zwolnieni","sum"),
-                                Zgłoszeni=("Zgłoszeni","sum"),
-                                Firmy=("Nazwa","nunique"))
-                           .reset_index())
-                fig = make_subplots(specs=[[{"secondary_y":True}]])
-                fig.add_trace(go.Bar(x=monthly["Okres"], y=monthly["Zgłoszeni"],
-                    name="Zgłoszeni", marker_color="#93c5fd", opacity=0.6),
-                    secondary_y=False)
-                fig.add_trace(go.Scatter(x=monthly["Okres"], y=monthly["Zwolnieni"],
-                    name="Zwolnieni", mode="lines+markers",
-                    line=dict(color=C_RED, width=3), marker=dict(size=8)),
-                    secondary_y=True)
-                fig.add_trace(go.Scatter(x=monthly["Okres"], y=monthly["Firmy"],
-                    name="Liczba firm", mode="lines+markers",
-                    line=dict(color=C_GREEN, width=2, dash="dot"), marker=dict(size=6)),
-                    secondary_y=True)
-                fig.update_layout(height=420,
-                    yaxis=dict(title="Zgłoszeni", gridcolor="#f1f5f9"),
-                    yaxis2=dict(title="Zwolnieni / Firmy"),
-                    **PLOTLY_LAYOUT)
-                st.plotly_chart(fig, use_container_width=True)
-                st.dataframe(
-                    monthly.rename(columns={"Firmy":"Liczba firm"}),
-                    use_container_width=True, hide_index=True)
+                if tab1.open:
+                    monthly = wup_dane.agreguj_zwolnienia(wybor, ["Okres"], ["Zwolnieni","Zgłoszeni"], firmy=True)
+                    def budowa_trendu():
+                        fig = make_subplots(specs=[[{"secondary_y":True}]])
+                        fig.add_trace(go.Bar(x=monthly["Okres"], y=monthly["Zgłoszeni"],
+                            name="Zgłoszeni", marker_color="#93c5fd", opacity=0.6),
+                            secondary_y=False)
+                        fig.add_trace(go.Scatter(x=monthly["Okres"], y=monthly["Zwolnieni"],
+                            name="Zwolnieni", mode="lines+markers",
+                            line=dict(color=C_RED, width=3), marker=dict(size=8)),
+                            secondary_y=True)
+                        fig.add_trace(go.Scatter(x=monthly["Okres"], y=monthly["Firmy"],
+                            name="Liczba firm", mode="lines+markers",
+                            line=dict(color=C_GREEN, width=2, dash="dot"), marker=dict(size=6)),
+                            secondary_y=True)
+                        fig.update_layout(height=420,
+                            yaxis=dict(title="Zgłoszeni", gridcolor="#f1f5f9"),
+                            yaxis2=dict(title="Zwolnieni / Firmy"),
+                            **PLOTLY_LAYOUT)
+                        return fig
+                    wykres(("zwol_trend", klucz_wyboru), budowa_trendu)
+                    st.dataframe(
+                        monthly.rename(columns={"Firmy":"Liczba firm"}),
+                        use_container_width=True, hide_index=True)
 
             # ── TAB 2: Firmy w czasie ────────────────────────────
             with tab2:
-                st.markdown('<div class="sec-label">Firmy – zwolnienia w podziale na miesiące</div>',
-                            unsafe_allow_html=True)
-                col_ustawienia, _ = st.columns([2,3])
-                with col_ustawienia:
-                    n_firm = st.slider("Top N firm", 5, 30, 10, key="zwol_n_firm")
-                    miara_firm = st.radio("Miara", ["Zwolnieni","Zgłoszeni","Wypow_zmieniające"],
-                        horizontal=True, key="zwol_miara_firm")
-
-                # Top N firm wg sumy
-                top_n = (dff.groupby("Nazwa")[miara_firm].sum()
-                         .sort_values(ascending=False).head(n_firm).index.tolist())
-                df_top = dff[dff["Nazwa"].isin(top_n)].copy()
-
-                # Wykres: grouped bar – firmy per miesiąc
-                firm_mies = (df_top.groupby(["Okres","Nazwa"], observed=True)[miara_firm]
-                             .sum().reset_index())
-                fig_fm = px.bar(firm_mies,
-                    x="Okres", y=miara_firm, color="Nazwa",
-                    barmode="group", height=480,
-                    labels={"Nazwa":"Firma", miara_firm:miara_firm.replace("_"," ")},
-                    color_discrete_sequence=px.colors.qualitative.Set2)
-                fig_fm.update_layout(
-                    yaxis=dict(gridcolor="#f1f5f9"),
-                    legend=dict(orientation="h", y=-0.3, font=dict(size=9)),
-                    paper_bgcolor="#ffffff", plot_bgcolor="#ffffff", font=dict(family="Inter, system-ui", size=11, color="#475569"), hovermode="x unified", xaxis=dict(showgrid=False, tickangle=-30, tickfont=dict(size=10,color="#94a3b8")))
-                st.plotly_chart(fig_fm, use_container_width=True)
-
-                # Tabela pivot: firmy × miesiące
-                pivot_f = (firm_mies.pivot(index="Nazwa", columns="Okres", values=miara_firm)
-                           .fillna(0).astype(int))
-                pivot_f["SUMA"] = pivot_f.sum(axis=1)
-                pivot_f = pivot_f.sort_values("SUMA", ascending=False)
-                st.dataframe(pivot_f, use_container_width=True, height=350)
+                if tab2.open:
+                    st.markdown('<div class="sec-label">Firmy – zwolnienia w podziale na miesiące</div>',
+                                unsafe_allow_html=True)
+                    col_ustawienia, _ = st.columns([2,3])
+                    with col_ustawienia:
+                        n_firm = st.slider("Top N firm", 5, 30, 10, key="zwol_n_firm")
+                        miara_firm = st.radio("Miara", ["Zwolnieni","Zgłoszeni","Wypow_zmieniające"],
+                            horizontal=True, key="zwol_miara_firm")
+
+                    # Top N firm wg sumy
+                    top_n = (wup_dane.agreguj_zwolnienia(wybor, ["Nazwa"], [miara_firm])
+                             .set_index("Nazwa")[miara_firm]
+                             .sort_values(ascending=False).head(n_firm).index.tolist())
+                    wybor_top = {"firmy": wybor["firmy"][wybor["firmy"]["Nazwa"].isin(top_n)], "komorki": None}
+
+                    # Wykres: grouped bar – firmy per miesiąc
+                    firm_mies = wup_dane.agreguj_zwolnienia(wybor_top, ["Okres","Nazwa"], [miara_firm])
+                    def budowa_firm():
+                        fig_fm = px.bar(firm_mies,
+                            x="Okres", y=miara_firm, color="Nazwa",
+                            barmode="group", height=480,
+                            labels={"Nazwa":"Firma", miara_firm:miara_firm.replace("_"," ")},
+                            color_discrete_sequence=px.colors.qualitative.Set2)
+                        fig_fm.update_layout(
+                            yaxis=dict(gridcolor="#f1f5f9"),
+                            legend=dict(orientation="h", y=-0.3, font=dict(size=9)),
+                            paper_bgcolor="#ffffff", plot_bgcolor="#ffffff", font=dict(family="Inter, system-ui", size=11, color="#475569"), hovermode="x unified", xaxis=dict(showgrid=False, tickangle=-30, tickfont=dict(size=10,color="#94a3b8")))
+                        return fig_fm
+                    wykres(("zwol_firmy", klucz_wyboru, n_firm, miara_firm), budowa_firm)
+
+                    # Tabela pivot: firmy × miesiące
+                    pivot_f = (firm_mies.pivot(index="Nazwa", columns="Okres", values=miara_firm)
+                               .fillna(0).astype(int))
+                    pivot_f["SUMA"] = pivot_f.sum(axis=1)
+                    pivot_f = pivot_f.sort_values("SUMA", ascending=False)
+                    siatka(pivot_f.reset_index(), key="siatka_firmy", rozmiary=(10, 25, 50), height=350)
 
             # ── TAB 3: PKD w czasie ─────────────────────────────
             with tab3:
-                st.markdown('<div class="sec-label">PKD – zwolnienia w podziale na miesiące</div>',
-                            unsafe_allow_html=True)
-                miara_pkd = st.radio("Miara", ["Zwolnieni","Zgłoszeni","Wypow_zmieniające"],
-                    horizontal=True, key="zwol_miara_pkd")
-
-                # Top 10 PKD wg sumy
-                top_pkd = (dff.groupby("PKD")[miara_pkd].sum()
-                           .sort_values(ascending=False).head(10).index.tolist())
-                df_pkd = dff[dff["PKD"].isin(top_pkd)].copy()
-                df_pkd["PKD_label"] = df_pkd["PKD"] + " – " + df_pkd["PKD_opis"].str[:25]
-
-                pkd_mies = (df_pkd.groupby(["Okres","PKD_label"], observed=True)[miara_pkd]
-                            .sum().reset_index())
-
-                col_l, col_r = st.columns([3,2])
-                with col_l:
-                    fig_pkd = px.bar(pkd_mies,
-                        x="Okres", y=miara_pkd, color="PKD_label",
-                        barmode="stack", height=440,
-                        labels={"PKD_label":"PKD", miara_pkd:miara_pkd.replace("_"," ")},
-                        color_discrete_sequence=px.colors.qualitative.Pastel)
-                    fig_pkd.update_layout(
-                        yaxis=dict(gridcolor="#f1f5f9"),
-                        legend=dict(orientation="h", y=-0.35, font=dict(size=9)),
-                        paper_bgcolor="#ffffff", plot_bgcolor="#ffffff", font=dict(family="Inter, system-ui", size=11, color="#475569"), hovermode="x unified", xaxis=dict(showgrid=False, tickangle=-30, tickfont=dict(size=10,color="#94a3b8")))
-                    st.plotly_chart(fig_pkd, use_container_width=True)
-                with col_r:
-                    # Tabela pivot PKD × miesiące
-                    pivot_pkd = (pkd_mies.pivot(index="PKD_label", columns="Okres", values=miara_pkd)
-                                 .fillna(0).astype(int))
-                    pivot_pkd["SUMA"] = pivot_pkd.sum(axis=1)
-                    pivot_pkd = pivot_pkd.sort_values("SUMA", ascending=False)
-                    st.dataframe(pivot_pkd, use_container_width=True, height=420)
+                if tab3.open:
+                    st.markdown('<div class="sec-label">PKD – zwolnienia w podziale na miesiące</div>',
+                                unsafe_allow_html=True)
+                    miara_pkd = st.radio("Miara", ["Zwolnieni","Zgłoszeni","Wypow_zmieniające"],
+                        horizontal=True, key="zwol_miara_pkd")
+
+                    # Top 10 PKD wg sumy
+                    pkd_sum = wup_dane.agreguj_zwolnienia(wybor, ["PKD"], [miara_pkd]).set_index("PKD")[miara_pkd]
+                    top_pkd = pkd_sum.sort_values(ascending=False).head(10).index.tolist()
+                    df_pkd = wup_dane.agreguj_zwolnienia(wybor, ["Okres","PKD","PKD_opis"], [miara_pkd])
+                    df_pkd = df_pkd[df_pkd["PKD"].isin(top_pkd)]
+                    df_pkd["PKD_label"] = df_pkd["PKD"].astype(str) + " – " + df_pkd["PKD_opis"].astype(str).str[:25]
+
+                    pkd_mies = (df_pkd.groupby(["Okres","PKD_label"], observed=True)[miara_pkd]
+                                .sum().reset_index())
+
+                    col_l, col_r = st.columns([3,2])
+                    with col_l:
+                        def budowa_pkd():
+                            fig_pkd = px.bar(pkd_mies,
+                                x="Okres", y=miara_pkd, color="PKD_label",
+                                barmode="stack", height=440,
+                                labels={"PKD_label":"PKD", miara_pkd:miara_pkd.replace("_"," ")},
+                                color_discrete_sequence=px.colors.qualitative.Pastel)
+                            fig_pkd.update_layout(
+                                yaxis=dict(gridcolor="#f1f5f9"),
+                                legend=dict(orientation="h", y=-0.35, font=dict(size=9)),
+                                paper_bgcolor="#ffffff", plot_bgcolor="#ffffff", font=dict(family="Inter, system-ui", size=11, color="#475569"), hovermode="x unified", xaxis=dict(showgrid=False, tickangle=-30, tickfont=dict(size=10,color="#94a3b8")))
+                            return fig_pkd
+                        wykres(("zwol_pkd", klucz_wyboru, miara_pkd), budowa_pkd)
+                    with col_r:
+                        # Tabela pivot PKD × miesiące
+                        pivot_pkd = (pkd_mies.pivot(index="PKD_label", columns="Okres", values=miara_pkd)
+                                     .fillna(0).astype(int))
+                        pivot_pkd["SUMA"] = pivot_pkd.sum(axis=1)
+                        pivot_pkd = pivot_pkd.sort_values("SUMA", ascending=False)
+                        siatka(pivot_pkd.reset_index(), key="siatka_pkd", rozmiary=(10, 25, 50), height=420)
 
             # ── TAB 4: Powiaty ──────────────────────────────────
             with tab4:
-                pow_agg = (dff.groupby("Powiat")
-                           .agg(Zwolnieni=("Zwolnieni","sum"), Zgłoszeni=("Zgłoszeni","sum"))
-                           .sort_values("Zwolnieni", ascending=False).reset_index())
-                col_l, col_r = st.columns([3,2])
-                with col_l:
-                    fig_pow = px.bar(pow_agg, x="Zwolnieni", y="Powiat", orientation="h",
-                        color="Zwolnieni",
-                        color_continuous_scale=["#dbeafe", C_NAVY],
-                        height=max(400, len(pow_agg)*28), labels={"Powiat":""})
-                    fig_pow.update_layout(
-                        coloraxis_showscale=False,
-                        yaxis=dict(gridcolor="#f1f5f9"),
-                        **PLOTLY_LAYOUT)
-                    st.plotly_chart(fig_pow, use_container_width=True)
-                with col_r:
-                    st.dataframe(pow_agg, use_container_width=True, hide_index=True)
+                if tab4.open:
+                    pow_agg = (wup_dane.agreguj_zwolnienia(wybor, ["Powiat"], ["Zwolnieni","Zgłoszeni"])
+                               .sort_values("Zwolnieni", ascending=False).reset_index(drop=True))
+                    col_l, col_r = st.columns([3,2])
+                    with col_l:
+                        def budowa_powiatow():
+                            fig_pow = px.bar(pow_agg, x="Zwolnieni", y="Powiat", orientation="h",
+                                color="Zwolnieni",
+                                color_continuous_scale=["#dbeafe", C_NAVY],
+                                height=max(400, len(pow_agg)*28), labels={"Powiat":""})
+                            fig_pow.update_layout(
+                                coloraxis_showscale=False,
+                                yaxis=dict(gridcolor="#f1f5f9"),
+                                **PLOTLY_LAYOUT)
+                            return fig_pow
+                        wykres(("zwol_powiaty", klucz_wyboru), budowa_powiatow)
+                    with col_r:
+                        st.dataframe(pow_agg, use_container_width=True, hide_index=True)
 
 # ══════════════════════════════════════════════════════════
 # DANE SUROWE
 # ══════════════════════════════════════════════════════════
 elif current_page == "dane":
     st.markdown("## 📋 Dane surowe")
-    tab_z,tab_b,tab_s = st.tabs(["Zwolnienia","Bezrobocie","Stopa bezrobocia"])
+    wszystkie = {n: df for n, df in [("zwolnienia",df_zwol),("bezrobocie",df_bezr),("stopa_bezrobocia",df_stopa)] if not df.empty}
+    if wszystkie:
+        przycisk_eksportu("⬇️ Pobierz wszystkie zbiory (XLSX, arkusz na zbiór)", wszystkie, "wup_dane",
+                          tuple(stan_folderu(f) for f in (folder_zwol,folder_bezr,folder_stopa)),
+                          key="eksp_wszystkie", formaty=("XLSX",))
+    tab_z,tab_b,tab_s = st.tabs(["Zwolnienia","Bezrobocie","Stopa bezrobocia"], key="dane_zakladka", on_change="rerun")
 
     with tab_z:
-        if not df_zwol.empty:
-            st.caption(f"{len(df_zwol):,} rekordów")
-            st.dataframe(df_zwol,use_container_width=True,hide_index=True,height=500)
-            csv = df_zwol.to_csv(index=False).encode("utf-8")
-            st.download_button("⬇️ Pobierz CSV – zwolnienia",csv,"zwolnienia.csv","text/csv")
-        else: st.info("Brak danych")
+        if tab_z.open:
+            if not df_zwol.empty:
+                siatka(df_zwol, key="siatka_zwol")
+                przycisk_eksportu("⬇️ Pobierz – zwolnienia", {"zwolnienia": df_zwol}, "zwolnienia",
+                                  stan_folderu(folder_zwol), key="eksp_zwol")
+            else: st.info("Brak danych")
 
     with tab_b:
-        if not df_bezr.empty:
-            st.caption(f"{len(df_bezr):,} rekordów")
-            st.dataframe(df_bezr,use_container_width=True,hide_index=True,height=500)
-            csv = df_bezr.to_csv(index=False).encode("utf-8")
-            st.download_button("⬇️ Pobierz CSV – bezrobocie",csv,"bezrobocie.csv","text/csv")
-        else: st.info("Brak danych")
+        if tab_b.open:
+            if not df_bezr.empty:
+                siatka(df_bezr, key="siatka_bezr")
+                przycisk_eksportu("⬇️ Pobierz – bezrobocie", {"bezrobocie": df_bezr}, "bezrobocie",
+                                  stan_folderu(folder_bezr), key="eksp_bezr")
+            else: st.info("Brak danych")
 
     with tab_s:
-        if not df_stopa.empty:
-            st.caption(f"{len(df_stopa):,} rekordów")
-            st.dataframe(df_stopa,use_container_width=True,hide_index=True,height=500)
-            csv = df_stopa.to_csv(index=False).encode("utf-8")
-            st.download_button("⬇️ Pobierz CSV – stopa",csv,"stopa_bezrobocia.csv","text/csv")
-        else: st.info("Brak danych")
+        if tab_s.open:
+            if not df_stopa.empty:
+                siatka(df_stopa, key="siatka_stopa")
+                przycisk_eksportu("⬇️ Pobierz – stopa", {"stopa_bezrobocia": df_stopa}, "stopa_bezrobocia",
+                                  stan_folderu(folder_stopa), key="eksp_stopa")
+            else: st.info("Brak danych")
+
+# ══════════════════════════════════════════════════════════
+# SQL – zapytania ad hoc (DuckDB nad tabelami Parquet)
+# ══════════════════════════════════════════════════════════
+elif current_page == "sql":
+    st.markdown("## 🧮 Zapytania SQL")
+    st.caption("DuckDB w procesie aplikacji · widoki: zwolnienia, bezrobocie, stopa_bezrobocia · "
+               f"tylko SELECT · wynik do {wup_dane.SQL_LIMIT:,} wierszy")
+    try:
+        with st.expander("📚 Tabele i kolumny", expanded=False):
+            for t, kol in wup_dane.schemat_sql().items():
+                st.markdown(f"**{t}** – " + ", ".join(f"`{c}` {typ.lower()}" for c, typ in kol.itertuples(index=False)))
+    except ImportError:
+        st.error("Brak pakietu duckdb – zainstaluj: pip install duckdb")
+        st.stop()
+
+    zapytanie = st.text_area("Zapytanie", height=160, key="sql_zapytanie",
+        value="SELECT Powiat, Rok, sum(Zwolnieni) AS Zwolnieni\nFROM zwolnienia\n"
+              "GROUP BY ALL\nORDER BY Zwolnieni DESC")
+    # Wynik trzymany w session_state – stronicowanie siatki nie wykonuje zapytania ponownie
+    if st.button("▶ Wykonaj", key="sql_wykonaj"):
+        try:
+            t0 = time.perf_counter()
+            wynik = wup_dane.sql(zapytanie, limit=wup_dane.SQL_LIMIT+1)
+            st.session_state["sql_wynik"] = (wynik, time.perf_counter()-t0, None)
+        except Exception as e:
+            st.session_state["sql_wynik"] = (None, 0.0, str(e))
+    if "sql_wynik" in st.session_state:
+        wynik, czas, blad = st.session_state["sql_wynik"]
+        if blad:
+            st.error(blad)
+        else:
+            if len(wynik) > wup_dane.SQL_LIMIT:
+                st.warning(f"Wynik przycięty do {wup_dane.SQL_LIMIT:,} wierszy")
+                wynik = wynik.head(wup_dane.SQL_LIMIT)
+            st.caption(f"{len(wynik):,} wierszy · {czas*1000:.0f} ms")
+            siatka(wynik, key="siatka_sql")
+
+pomiar_bloku.zamknij()
+pomiar_przebiegu.zamknij()
+# Strona już wysłana – pozostałe wczytania trwają w tle, status odświeża fragment
+if all(f.done() for f, _, _ in wczytania.values()):
+    czekaj_na_wczytania(wczytania, (), status_wczytan)
+else:
+    with status_wczytan.container():
+        status_w_tle(wczytania)
+if wup_dane.pomiary_wlaczone():
+    panel_diagnostyki(pomiar_przebiegu)
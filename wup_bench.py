@@ -0,0 +1,908 @@
+"""
+WUP Mazowieckie – benchmarki
+============================
+Syntetyczne skoroszyty w układzie prawdziwych plików (MRPiPS-01 `dbf` + `WOJEWÓDZTWO OGÓŁEM`,
+GUS `Tabl.1`/`Tabl.1a`, zgłoszenia zwolnień grupowych) w zadanej skali i pomiar loaderów wup_dane.
+
+    python wup_bench.py generuj KATALOG [--lata 2] [--powiaty 41] [--firmy 60] [--ziarno 0]
+    python wup_bench.py loadery [--katalog KATALOG] [--lata 2] [--powiaty 41] [--firmy 60]
+                                [--powtorzenia 1] [--json WYNIK.json] [--wzorzec WZORZEC.json]
+    python wup_bench.py strony [--powtorzenia 3] [--json WYNIK.json] [--wzorzec WZORZEC.json] [--prog 0.25]
+    python wup_bench.py obciazenie [--sesje 1,2,4,8] [--powtorzenia 2] [--port 8599]
+                                   [--json WYNIK.json] [--wzorzec WZORZEC.json] [--prog 0.25]
+
+Tryby pomiaru loadera (każdy w świeżym procesie – szczyt RSS dotyczy jednego loadera):
+    zimny   – brak __cache__: parsowanie wszystkich XLSX
+    arkusze – tylko cache arkuszy (jak po zmianie kodu parserów)
+    tabela  – gotowa tabela.parquet (start aplikacji po konwersji)
+    pamięć  – drugie wywołanie w tym samym procesie (_STAN)
+Tryby z cache: tabela/pamięć nie mogą wywołać parsera (błąd), każdy powinien być szybszy
+niż zimny (ostrzeżenie).
+Zgodność: wynik loadera porównany z wartościami zapisanymi przez generator (KATALOG/oczekiwane)
+i odcisk ramki – ten sam we wszystkich trybach, a przy tych samych parametrach zgodny ze wzorcem.
+Strony: aplikacja bez przeglądarki (streamlit.testing AppTest) – nawigacja przyciskami nav_*
+po wszystkich stronach i główne widżety (filtry zwol_*, stopa_okres, bz2_okres, zakładki);
+czas i alokacje (tracemalloc) każdego przebiegu skryptu, regresja = wolniej niż wzorzec o --prog.
+Obciążenie: lokalny serwer Streamlit i N równoczesnych sesji po websockecie (jak przeglądarka):
+Pulpit → Zwolnienia (filtry) → Dane surowe (eksport); p50/p95/p99 przebiegów, przepustowość
+i RSS serwera dla kolejnych N. Wymaga pakietu websockets (zależność Streamlit na Starlette).
+"""
+
+import os, sys, json, time, asyncio, shutil, hashlib, argparse, platform, tempfile, statistics, tracemalloc, warnings
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import openpyxl
+import wup_dane
+from wup_dane import MIESIAC_PL, ROMAN, WGM_MAP, NRW_KAT, NUTS2_DO_GEO, GUS_DO_GEO, PKD_OPISY, ZWOL_LICZBY
+
+try: import resource   # brak na Windows – RSS nie jest wtedy mierzony
+except ImportError: resource = None
+
+TRYBY = ("zimny", "arkusze", "tabela", "pamięć")
+TRYBY_BEZ_PARSOWANIA = ("tabela", "pamięć")   # parser wywołany w tych trybach = cache nie działa
+
+# ══════════════════════════════════════════════════════════
+# GENERATOR – układ arkuszy jak w plikach źródłowych
+# ══════════════════════════════════════════════════════════
+# Arkusz powstaje jako siatka wierszy w pamięci; wartości oczekiwane są czytane z tej samej
+# siatki w miejscach, które opisują parsery (ZAKRES_*, ZWOL_LICZBY, wiersze kategorii).
+
+# dbf: (DZIAL, TABELA, liczba wierszy NRW) – kolejność bloków jak w MRPiPS-01
+BLOKI_DBF = [("1","1",25), ("1","2",47), ("1","3",28), ("2","1",22),
+             ("3","1",7), ("4","1",3), ("5","1",25), ("C","1",1)]
+DBF_R = 22
+# WOJEWÓDZTWO OGÓŁEM: wiersz 15 (ogółem) i wiersze kategorii czytane z kol. 12
+WOJ_OGOLEM = {8:"Zarejestrowani", 10:"Wyrejestrowani", 12:"Stan_koniec", 13:"Stan_koniec_K", 14:"Z_zasilkiem"}
+WOJ_KATEGORIE = {20:"Na_wsi", 23:"Cudzoziemcy", 24:"Bez_kwalif", 28:"Do_30_lat",
+                 29:"Do_25_lat", 31:"Pow_50_lat", 32:"Dlugoterwale", 33:"Niepelnosprawni"}
+WOJ_X = 24   # wiersz „kobiety…” – w prawdziwym arkuszu 'X' w kolumnach razem
+# Tabl.1: makroregion → regiony NUTS2 (PL9 – województwo mazowieckie)
+MAKROREGIONY = {"PL2": ("POŁUDNIOWY", ["PL21","PL22"]),
+                "PL4": ("PÓŁNOCNO-ZACHODNI", ["PL41","PL42","PL43"]),
+                "PL5": ("POŁUDNIOWO-ZACHODNI", ["PL51","PL52"]),
+                "PL6": ("PÓŁNOCNY", ["PL61","PL62","PL63"]),
+                "PL7": ("CENTRALNY", ["PL71","PL72"]),
+                "PL8": ("WSCHODNI", ["PL81","PL82","PL84"]),
+                "PL9": ("WOJEWÓDZTWO MAZOWIECKIE", ["PL91","PL92"])}
+REGIONY_MAZ = {"PL91": "Warszawski stołeczny", "PL92": "Mazowiecki regionalny"}
+WOJ_TERYT = ["02","04","06","08","10","12","16","18","20","22","24","26","28","30","32"]
+PKD_INNE = ["4120Z","2899Z","4511Z","4791Z","2120Z"]   # kody spoza PKD_OPISY
+FORMY = ["Sp. z o.o.", "S.A.", "SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ", "Sp. z o.o. Sp.k."]
+SLOWA = ["Mazowiecka", "Polska", "Centrum", "Usługi", "Logistyka", "Handel",
+         "Serwis", "Technologie", "Produkcja", "Media", "System", "Invest"]
+
+def _liczba(v):
+    """Komórka → liczba jak pd.to_numeric(errors="coerce"): puste i tekst nieliczbowy → NaN."""
+    return pd.to_numeric(pd.Series([v], dtype=object), errors="coerce").iloc[0]
+
+def _zapisz(sciezka, arkusze):
+    """{nazwa arkusza: wiersze} → XLSX (openpyxl write_only, atomowo)."""
+    wb = openpyxl.Workbook(write_only=True)
+    for nazwa, wiersze in arkusze.items():
+        ws = wb.create_sheet(nazwa)
+        for w in wiersze: ws.append(w)
+    tmp = sciezka + ".tmp"
+    wb.save(tmp)
+    os.replace(tmp, sciezka)
+
+def _okres(rok, m):
+    return {"Okres": f"{MIESIAC_PL[m]} {rok}", "Rok": rok, "Miesiąc_num": m, "Sort_key": rok*100 + m}
+
+def _powiat_gus(wgm):
+    """Nazwa powiatu jak w Tabl.1a / arkuszach zwolnień (małe litery)."""
+    return WGM_MAP[wgm][0].lower()
+
+def _siatka_woj(naglowek, rok, m, ogolem, kategorie, rng):
+    """Arkusz w układzie 'WOJEWÓDZTWO OGÓŁEM' (34 × 15) – liczby jako tekst, jak w oryginale."""
+    g = [[None]*15 for _ in range(34)]
+    g[0][0], g[0][7], g[0][13] = f" {naglowek}", "MRPiPS - 01\nSprawozdanie o rynku pracy", "1400"
+    g[3][7] = f"za miesiąc {MIESIAC_PL[m].lower()} {rok} r."
+    g[6][0], g[7][0], g[9][0] = "Dział 1.  STRUKTURA BEZROBOCIA", "1.1.  Struktura bezrobotnych", "Wyszczególnienie"
+    g[9][8], g[9][10], g[9][12] = "Bezrobotni zarejestrowani", "Bezrobotni, którzy podjęli pracę", "Bezrobotni"
+    g[13][8:15] = ["razem", "kobiety", "razem", "kobiety", "razem", "kobiety", "razem"]
+    g[14][0], g[14][8:15] = "0", [str(i) for i in range(1, 8)]
+    g[15][0], g[19][0] = "Ogółem (w. 02 + 04)", "Wybrane kategorie bezrobotnych"
+    for r in range(15, 34):
+        if r == 19: continue
+        g[r][7] = str(r - 14)
+        if r > 15:
+            g[r][0] = g[r][0] or f"kategoria {r - 14}"
+            g[r][8:15] = [str(int(v)) for v in rng.integers(0, max(ogolem["Stan_koniec"] // 4, 1), 7)]
+    g[15][8:15] = [str(ogolem[k]) for k in ("Zarejestrowani", "Zarejestrowani_K", "Wyrejestrowani",
+                                            "Wyrejestrowani_K", "Stan_koniec", "Stan_koniec_K", "Z_zasilkiem")]
+    for r, k in WOJ_KATEGORIE.items():
+        g[r][12] = str(kategorie[k])
+    for c in (8, 10, 12, 14): g[WOJ_X][c] = "X"
+    return g
+
+def _skoroszyt_bezrobocia(sciezka, rok, m, wgm_lista, ziarno):
+    rng = np.random.default_rng([ziarno, 1, rok, m])
+    powiaty = {}
+    for wgm in [1401] + wgm_lista:
+        baza = np.random.default_rng([ziarno, wgm]).integers(700, 6000) * (8 if wgm == 1465 else 1)
+        stan = int(baza * (1 + 0.08*np.cos(2*np.pi*m/12)) + rng.integers(-baza//20, baza//20 + 1))
+        powiaty[wgm] = {"Zarejestrowani": int(stan*rng.uniform(.08, .14)), "Stan_koniec": stan,
+                        "Stan_koniec_K": int(stan*rng.uniform(.42, .55)), "Wyrejestrowani": int(stan*rng.uniform(.07, .13)),
+                        **{k: int(stan*rng.uniform(.05, .6)) for k in NRW_KAT.values()}}
+        powiaty[wgm]["Zarejestrowani_K"] = powiaty[wgm]["Zarejestrowani"] // 2
+        powiaty[wgm]["Wyrejestrowani_K"] = powiaty[wgm]["Wyrejestrowani"] // 2
+        powiaty[wgm]["Z_zasilkiem"] = stan // 7
+
+    # dbf – bloki per WGM; pierwszy NRW=001 (dział 1) i ostatni (dział 5) niosą wartości powiatu
+    dbf = [["WGM","M_C","ROK","DZIAL","TABELA","NRW"] + [f"R{i}" for i in range(1, DBF_R+1)]]
+    for wgm, v in powiaty.items():
+        for dzial, tabela, n in BLOKI_DBF:
+            for i in range(1, n+1):
+                nrw = "CZ1" if dzial == "C" else f"{i:03d}"
+                r = [int(x) for x in rng.integers(0, max(v["Stan_koniec"] // 10, 2), DBF_R)]
+                if (dzial, tabela, nrw) == ("1", "1", "001"):
+                    r[0], r[1], r[4] = v["Zarejestrowani"], v["Zarejestrowani_K"], v["Stan_koniec"]
+                elif (dzial, tabela, nrw) == ("5", "1", "001"):
+                    r[0], r[1] = v["Stan_koniec"], v["Stan_koniec_K"]
+                elif (dzial, tabela) == ("1", "1") and nrw in NRW_KAT:
+                    r[4] = v[NRW_KAT[nrw]]
+                dbf.append([str(wgm), f"{m:02d}", str(rok), dzial, tabela, nrw] + r)
+
+    mazowsze = {k: sum(p[k] for w, p in powiaty.items() if w != 1401) for k in powiaty[1401]}
+    mazowsze["Z_zasilkiem"] = mazowsze["Stan_koniec"] // 7
+    woj = _siatka_woj("MAZOWIECKIE", rok, m, mazowsze, mazowsze, rng)
+    arkusze = {"dbf": dbf, "WOJEWÓDZTWO OGÓŁEM": woj}
+    for wgm in wgm_lista:
+        arkusze[WGM_MAP[wgm][0][:31]] = _siatka_woj(WGM_MAP[wgm][0].upper(), rok, m, powiaty[wgm], powiaty[wgm], rng)
+    _zapisz(sciezka, arkusze)
+
+    # Oczekiwane: województwo z siatki, powiaty z wartości wpisanych w dbf
+    okres = _okres(rok, m)
+    wiersze = [{**okres, "Region": "Mazowieckie", "Typ": "województwo",
+                **{k: _liczba(woj[15][c]) for c, k in WOJ_OGOLEM.items()},
+                **{k: _liczba(woj[r][12]) for r, k in WOJ_KATEGORIE.items()}}]
+    for wgm in (w for w in WGM_MAP if w in wgm_lista):
+        v = powiaty[wgm]
+        wiersze.append({**okres, "Region": WGM_MAP[wgm][0], "Typ": WGM_MAP[wgm][1],
+                        "Zarejestrowani": v["Zarejestrowani"], "Wyrejestrowani": np.nan,
+                        "Stan_koniec": v["Stan_koniec"], "Stan_koniec_K": v["Stan_koniec_K"],
+                        "Z_zasilkiem": v["Stan_koniec"], **{k: v[k] for k in NRW_KAT.values()}})
+    return pd.DataFrame(wiersze)
+
+def _skoroszyt_stopy(sciezka, rok, m, wgm_lista, ziarno):
+    rng = np.random.default_rng([ziarno, 2, rok, m])
+    okres, oczekiwane = _okres(rok, m), []
+    stan = f"Stan w końcu miesiąca {MIESIAC_PL[m].lower()} {rok} r."
+    def wartosci(lo, hi, tys):
+        return round(float(rng.uniform(*tys)), 1), round(float(rng.uniform(lo, hi)), 1)
+
+    t1 = [["Tablica 1 Liczba bezrobotnych zarejestrowanych oraz stopa bezrobocia według makroregionów, "
+           "regionów i podregionów"] + [None]*6, [stan] + [None]*6, [None]*7,
+          ["Statystyczny podział kraju (rewizja NUTS 2016)", None, None, None, "Wyszczególnienie",
+           "Bezrobotni w tys.", "Stopa bezrobocia w %"],
+          ["Kod", "Makroregiony", "Regiony", "Podregiony", None, None, None],
+          [None, "NUTS 1", "NUTS 2", "NUTS 3", 0, 1, 2],
+          [0, 0, 0, 0, "POLSKA" + " "*64, *wartosci(4.5, 6.5, (800, 1000))]]
+    for nr, (makro, (nazwa_m, regiony)) in enumerate(MAKROREGIONY.items(), 1):
+        t1.append([makro, f"{nr:02d}", 0, "00", f"MAKROREGION {nazwa_m}", *wartosci(3, 8, (60, 200))])
+        if makro == "PL9":
+            oczekiwane.append((makro, t1[-1]))
+        for i, kod in enumerate(regiony, 1):
+            nazwa = REGIONY_MAZ.get(kod) or NUTS2_DO_GEO[kod].capitalize()
+            t1.append([kod, f"{nr:02d}", i, "00", f"     REGION: {nazwa}", *wartosci(2, 10, (20, 90))])
+            oczekiwane.append((kod, t1[-1]))
+            for j in range(int(rng.integers(3, 7))):
+                t1.append([f"{kod}{j+1}", f"{nr:02d}", str(i), f"{j+20}", f"          PODREGION: {nazwa} {j+1}",
+                           *wartosci(2, 14, (5, 30))])
+    wiersze = [{**okres, "Kod": kod, "Nazwa": r[4].strip().replace("REGION: ", "").strip().title(),
+                "Typ": "województwo", "Bezrobotni_tys": r[5], "Stopa": r[6],
+                "Geo_nazwa": NUTS2_DO_GEO[kod] if len(kod) == 4 else "mazowieckie"} for kod, r in oczekiwane]
+
+    t1a = [["Tablica 1a Liczba bezrobotnych zarejestrowanych oraz stopa bezrobocia według województw i powiatów"]
+           + [None]*4, [stan] + [None]*4, [None]*5,
+           ["Administracyjny podział terytorialny kraju - TERYT", None, "Wyszczególnienie",
+            "Bezrobotni w tys.", "Stopa bezrobocia w %"],
+           ["WOJ.", "POW.", 0, 1, 2], [0, 0, "POLSKA" + " "*64, *wartosci(4.5, 6.5, (800, 1000))]]
+    for woj in sorted(WOJ_TERYT + ["14"]):
+        if woj != "14":
+            t1a.append([woj, "00", f"Woj. {woj}".ljust(70), *wartosci(3, 9, (20, 100))])
+            t1a += [[woj, f"{k:02d}", f"      powiat {woj}{k:02d}".ljust(70), *wartosci(2, 20, (0.5, 5))]
+                    for k in range(1, int(rng.integers(12, 30)))]
+            continue
+        maz = [("00", "Woj. MAZOWIECKIE", wartosci(3.5, 6, (90, 140)))]
+        maz += [(str(wgm)[2:] if wgm > 1460 else f"{wgm-1401:02d}", _powiat_gus(wgm),
+                 wartosci(1.2, 25, (0.4, 30 if wgm == 1465 else 6))) for wgm in WGM_MAP if wgm in wgm_lista]
+        for i, (pow_kod, nazwa, (tys, stopa)) in enumerate(maz):
+            # część kodów województwa jako liczba – jak w publikacji GUS
+            t1a.append(["14" if i < len(maz)//2 else 14, pow_kod,
+                        (nazwa if pow_kod == "00" else "      " + nazwa).ljust(70), tys, stopa])
+            wiersze.append({**okres, "Kod": "14" + pow_kod, "Nazwa": nazwa.lower().title(),
+                            "Typ": "województwo" if pow_kod == "00" else "powiat",
+                            "Bezrobotni_tys": tys, "Stopa": stopa, "Geo_nazwa": GUS_DO_GEO.get(nazwa.lower())})
+    _zapisz(sciezka, {"Tabl.1": t1, "Tabl.1a": t1a})
+    return pd.DataFrame(wiersze)
+
+def pula_firm(firmy, wgm_lista, ziarno):
+    """Pula zakładów (nazwa, PKD, powiat) – zgłoszenia kolejnych miesięcy losują z niej z powtórzeniami."""
+    rng = np.random.default_rng([ziarno, 3])
+    kody = list(PKD_OPISY) + PKD_INNE
+    pula = []
+    for i in range(max(3*firmy, 1)):
+        nazwa = f"{rng.choice(SLOWA)} {rng.choice(SLOWA)} {i+1} {rng.choice(FORMY)}"
+        if rng.random() < .3:   # adres w tej samej komórce, z wielokrotnymi spacjami
+            nazwa += f"      ul. Długa {int(rng.integers(1, 200))}          0{int(rng.integers(0, 9))}-{int(rng.integers(100, 999))} Warszawa"
+        pula.append((nazwa, str(rng.choice(kody)), int(rng.choice(wgm_lista))))
+    return pula
+
+def _skoroszyt_zwolnien(sciezka, rok, m, pula, firmy, ziarno):
+    rng = np.random.default_rng([ziarno, 4, rok, m])
+    naglowki = [[None]*12,
+                [None, "Województwo:", "MAZOWIECKIE", MIESIAC_PL[m], rok] + [None]*7, [None]*12,
+                [None, "Zwolnienia z przyczyn dotyczących zakładu pracy "] + [None]*10, [None]*12,
+                [None, "Informacje ogólne", None, None, None, None, "Zgłoszenia zwolnień", None, None, None,
+                 "Zwolnienia grupowe", "Zwolnienia monitorowane"],
+                [None, "Powiat", "Województwo", "Nazwa zakładu\n pracy", "REGON zakładu pracy \n(14-cyfrowy)",
+                 " PKD \n(4 znaki)", "Liczba osób\nzgłoszonych \ndo zwolnienia", "Planowany termin\ndokonania zwolnień ",
+                 "Liczba osób, którym wręczone zostaną wypowiedzenia zmieniające warunki pracy i płacy",
+                 "Czy likwidacja zakładu pracy (tak/nie)", "Liczba osób zwolnionych\nz przyczyn dotyczących\nzakładu pracy ",
+                 "Liczba osób\nobjętych programem \nzwolnień monitorowanych"]]
+    dane, okres, wiersze = list(naglowki), _okres(rok, m), []
+    def moze(v, p=.15):
+        return None if rng.random() < p else v
+    for i in rng.integers(0, len(pula), firmy):
+        nazwa, kod, wgm = pula[i]
+        powiat = rng.choice([_powiat_gus(wgm), WGM_MAP[wgm][0], _powiat_gus(wgm) + " "])
+        pkd = rng.choice([kod, f"{kod[:2]}.{kod[2:]}", f" {kod[:2]}.{kod[2:4]}.{kod[4:]}".lower()])
+        regon = int(rng.integers(10**8, 10**9)) if rng.random() < .5 else str(int(rng.integers(10**13, 10**14)))
+        w = [None, str(powiat), moze("MAZOWIECKIE", .3), nazwa, regon, str(pkd),
+             moze(int(rng.integers(1, 300))), f"do {int(rng.integers(1, 29)):02d}.{m:02d}.{rok} r.",
+             moze(int(rng.integers(0, 20)), .5), str(rng.choice(["tak", "nie", "TAK"])),
+             moze(int(rng.integers(0, 150)), .3), moze(0, .5)]
+        dane.append(w)
+        surowe = str(pkd).strip()
+        wiersze.append({**okres, "Powiat": str(powiat).strip(), "Nazwa": nazwa.strip(),
+                        "PKD": kod, "PKD_opis": PKD_OPISY.get(kod, surowe[:30]),
+                        **{k: _liczba(w[c]) for c, k in ZWOL_LICZBY.items()}})
+    dane.append([None, "Razem", None, None, None, None, sum(w[6] or 0 for w in dane[len(naglowki):])] + [None]*5)
+    podstawowe = [[None]*4, [None, None, "WOJEWÓDZTWO", "MAZOWIECKIE"],
+                  [None, None, "OKRES SPRAWOZDAWCZY - MIESIĄC", MIESIAC_PL[m]],
+                  [None, None, "OKRES SPRAWOZDAWCZY - ROK", rok]]
+    listy = [["powiaty", "miesiące"]] + [[n.lower(), MIESIAC_PL.get(i+1)] for i, (n, _) in enumerate(WGM_MAP.values())]
+    _zapisz(sciezka, {"Dane podstawowe": podstawowe, "dane": dane, "listy": listy})
+    df = pd.DataFrame(wiersze)
+    df["Nazwa"] = df["Nazwa"].str.replace(r"\s{2,}", " ", regex=True).str[:70]
+    return df
+
+def _zadanie_generatora(zadanie):
+    zbior, sciezka, rok, m, argumenty = zadanie
+    return zbior, {"bezrobocie": _skoroszyt_bezrobocia, "stopa_bezrobocia": _skoroszyt_stopy,
+                   "zwolnienia": _skoroszyt_zwolnien}[zbior](sciezka, rok, m, *argumenty)
+
+def generuj(katalog, lata=2, powiaty=41, firmy=60, ziarno=0, rok_do=2025, workers=None):
+    """
+    Zapisuje katalog/dane/<zbiór>/*.xlsx (lata × 12 miesięcy do rok_do) oraz
+    katalog/oczekiwane/<zbiór>.parquet → {zbiór: ramka oczekiwana}.
+    """
+    if not 1 <= powiaty <= len(WGM_MAP):
+        raise ValueError(f"powiaty: od 1 do {len(WGM_MAP)}")
+    wgm_lista = list(WGM_MAP)[:powiaty]
+    pula = pula_firm(firmy, wgm_lista, ziarno)
+    okresy = [(r, m) for r in range(rok_do - lata + 1, rok_do + 1) for m in range(1, 13)]
+    nazwy = {"bezrobocie": lambda r, m: f"{m:02d}.{r}.xlsx", "stopa_bezrobocia": lambda r, m: f"{r}-{m:02d}.xlsx",
+             "zwolnienia": lambda r, m: f"{next(k for k, v in ROMAN.items() if v == m)}_{r}.xlsx"}
+    argumenty = {"bezrobocie": (wgm_lista, ziarno), "stopa_bezrobocia": (wgm_lista, ziarno),
+                 "zwolnienia": (pula, firmy, ziarno)}
+    zadania = []
+    for zbior, (sub, _, _) in wup_dane.ZBIORY.items():
+        folder = os.path.join(katalog, "dane", sub)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        zadania += [(zbior, os.path.join(folder, nazwy[zbior](r, m)), r, m, argumenty[zbior]) for r, m in okresy]
+    czesci = {n: [] for n in wup_dane.ZBIORY}
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for zbior, df in ex.map(_zadanie_generatora, zadania, chunksize=1):
+            czesci[zbior].append(df)
+    os.makedirs(os.path.join(katalog, "oczekiwane"), exist_ok=True)
+    oczekiwane = {}
+    for zbior, lista in czesci.items():
+        oczekiwane[zbior] = pd.concat(lista, ignore_index=True)
+        oczekiwane[zbior].to_parquet(os.path.join(katalog, "oczekiwane", f"{zbior}.parquet"), index=False)
+    with open(os.path.join(katalog, "oczekiwane", "parametry.json"), "w", encoding="utf-8") as f:
+        json.dump({"lata": lata, "powiaty": powiaty, "firmy": firmy, "ziarno": ziarno, "rok_do": rok_do}, f)
+    return oczekiwane
+
+# ══════════════════════════════════════════════════════════
+# ZGODNOŚĆ WYNIKÓW
+# ══════════════════════════════════════════════════════════
+
+def _kanon(df):
+    """Ramka w postaci porównywalnej: liczby → float64, reszta → tekst, wiersze posortowane."""
+    kol = sorted(df.columns)
+    out = pd.DataFrame({k: df[k].astype("float64").round(6) if pd.api.types.is_numeric_dtype(df[k])
+                        else df[k].astype(object).where(df[k].notna(), "").astype(str) for k in kol})
+    return out.sort_values(kol, na_position="first").reset_index(drop=True) if kol else out
+
+def odcisk(df):
+    """Odcisk treści ramki niezależny od kolejności wierszy i typów (category/Int32 vs object/float)."""
+    k = _kanon(df)
+    h = hashlib.sha1(",".join(k.columns).encode())
+    h.update(pd.util.hash_pandas_object(k, index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+def porownaj(df, oczekiwane):
+    """Liczba niezgodności (wiersze różniące się treścią, brakujące i nadmiarowe) + opis."""
+    brak = sorted(set(oczekiwane.columns) ^ set(df.columns))
+    if brak:
+        return max(len(df), len(oczekiwane)), f"różne kolumny: {', '.join(brak)}"
+    a, b = _kanon(df), _kanon(oczekiwane)
+    if len(a) != len(b):
+        return abs(len(a) - len(b)), f"wierszy {len(a)} zamiast {len(b)}"
+    rozne = (a.ne(b) & ~(a.isna() & b.isna())).any(axis=1)
+    if rozne.any():
+        kolumny = a.columns[(a.ne(b) & ~(a.isna() & b.isna())).any()].tolist()
+        return int(rozne.sum()), f"różne wartości w: {', '.join(kolumny)}"
+    return 0, ""
+
+# ══════════════════════════════════════════════════════════
+# POMIAR LOADERÓW – jeden tryb w świeżym procesie
+# ══════════════════════════════════════════════════════════
+
+def _rss_mb():
+    """Szczyt RSS procesu w MB (ru_maxrss: KB na Linuksie, bajty na macOS)."""
+    if resource is None: return None
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1 << 20) if sys.platform == "darwin" else r / 1024
+
+def _pomiar(zbior, katalog, tryb):
+    folder = os.path.join(katalog, "dane", wup_dane.ZBIORY[zbior][0])
+    cache = os.path.join(folder, "__cache__")
+    if tryb == "zimny":
+        shutil.rmtree(cache, ignore_errors=True)
+    elif tryb == "arkusze":
+        for roz in (".parquet", ".json"):
+            try: os.remove(wup_dane._tabela_path(folder)[:-len(".parquet")] + roz)
+            except FileNotFoundError: pass
+    loader = wup_dane.LOADERY[zbior]
+    # Licznik wywołań parsera zbioru (WERSJA_KODU policzona przy imporcie – podmiana jej nie zmienia)
+    parsowania, (sub, parser, sortowanie) = [], wup_dane.ZBIORY[zbior]
+    wup_dane.ZBIORY[zbior] = (sub, lambda p: parsowania.append(p) or parser(p), sortowanie)
+    try:
+        if tryb == "pamięć":
+            loader(folder)
+            parsowania.clear()
+        rss0 = _rss_mb()
+        t0 = time.perf_counter()
+        df = loader(folder)
+        czas = time.perf_counter() - t0
+        rss = _rss_mb()
+    finally:
+        wup_dane.ZBIORY[zbior] = (sub, parser, sortowanie)
+    wynik = {"zbiór": zbior, "tryb": tryb, "pliki": len(wup_dane.znajdz_pliki(folder)),
+             "xlsx_MB": round(sum(os.path.getsize(p["sciezka"]) for p in wup_dane.znajdz_pliki(folder)) / 2**20, 2),
+             "wiersze": len(df), "parsowania": len(parsowania),
+             "czas_s": round(czas, 4), "wiersze_s": round(len(df) / czas) if czas else None,
+             "rss_MB": rss and round(rss, 1), "rss_przyrost_MB": rss and round(rss - rss0, 1), "odcisk": odcisk(df)}
+    sciezka = os.path.join(katalog, "oczekiwane", f"{zbior}.parquet")
+    if os.path.exists(sciezka):
+        wynik["niezgodne"], wynik["uwagi"] = porownaj(df, pd.read_parquet(sciezka))
+    return wynik
+
+def mierz_loadery(katalog, powtorzenia=1):
+    """Każdy zbiór w kolejnych trybach (TRYBY); z powtórzeń najkrótszy czas i najwyższy RSS."""
+    wyniki = []
+    kontekst = mp.get_context("spawn")   # czysty proces – bez stanu i pamięci rodzica
+    for zbior in wup_dane.ZBIORY:
+        for tryb in TRYBY:
+            proby = []
+            for _ in range(max(powtorzenia, 1)):
+                with ProcessPoolExecutor(max_workers=1, mp_context=kontekst) as ex:
+                    proby.append(ex.submit(_pomiar, zbior, katalog, tryb).result())
+            w = min(proby, key=lambda p: p["czas_s"])
+            if w["rss_MB"] is not None:
+                w["rss_MB"] = max(p["rss_MB"] for p in proby)
+                w["rss_przyrost_MB"] = max(p["rss_przyrost_MB"] for p in proby)
+            wyniki.append(w)
+    return wyniki
+
+def _srodowisko(**inne):
+    return {"python": platform.python_version(), "pandas": pd.__version__, "openpyxl": openpyxl.__version__,
+            "system": platform.platform(), "procesory": os.cpu_count(), "wersja_kodu": wup_dane.WERSJA_KODU, **inne}
+
+def _zapisz_wynik(sciezka, parametry, wyniki, dodatki=None, **srodowisko):
+    with open(sciezka, "w", encoding="utf-8") as f:
+        json.dump({"parametry": parametry, "srodowisko": _srodowisko(**srodowisko), "wyniki": wyniki,
+                   **(dodatki or {})},
+                  f, ensure_ascii=False, indent=1)
+
+def _wczytaj_wzorzec(sciezka):
+    with open(sciezka, encoding="utf-8") as f:
+        return json.load(f)
+
+def _porownaj_ze_wzorcem(wyniki, parametry, sciezka):
+    """Czas względem wzorca + zgodność odcisków (gdy parametry generatora są te same) → liczba różnic."""
+    wzorzec = _wczytaj_wzorzec(sciezka)
+    poprzednie = {(w["zbiór"], w["tryb"]): w for w in wzorzec["wyniki"]}
+    te_same = wzorzec.get("parametry") == parametry
+    if not te_same:
+        print(f"Uwaga: inne parametry generatora niż we wzorcu ({wzorzec.get('parametry')}) – bez porównania odcisków")
+    roznice = 0
+    for w in wyniki:
+        p = poprzednie.get((w["zbiór"], w["tryb"]))
+        if p is None: continue
+        w["x_wzorca"] = round(w["czas_s"] / p["czas_s"], 2) if p["czas_s"] else None
+        if te_same and p["odcisk"] != w["odcisk"]:
+            roznice += 1
+            w["uwagi"] = (w.get("uwagi") + "; " if w.get("uwagi") else "") + "odcisk inny niż we wzorcu"
+    return roznice
+
+def benchmark_loaderow(katalog=None, lata=2, powiaty=41, firmy=60, ziarno=0, powtorzenia=1,
+                       json_wynik=None, wzorzec=None):
+    tymczasowy = katalog is None
+    katalog = katalog or tempfile.mkdtemp(prefix="wup_bench_")
+    try:
+        plik_parametrow = os.path.join(katalog, "oczekiwane", "parametry.json")
+        if tymczasowy or not os.path.exists(plik_parametrow):
+            t0 = time.perf_counter()
+            generuj(katalog, lata, powiaty, firmy, ziarno)
+            print(f"Wygenerowano dane w {time.perf_counter()-t0:.1f} s ({katalog})")
+        with open(plik_parametrow, encoding="utf-8") as f:
+            parametry = json.load(f)
+        wyniki = mierz_loadery(katalog, powtorzenia)
+    finally:
+        if tymczasowy: shutil.rmtree(katalog, ignore_errors=True)
+
+    bledy = sum(1 for w in wyniki if w.get("niezgodne"))
+    # Odcisk musi być ten sam niezależnie od drogi wczytania (XLSX, cache arkuszy, Parquet, pamięć)
+    for zbior in wup_dane.ZBIORY:
+        if len({w["odcisk"] for w in wyniki if w["zbiór"] == zbior}) > 1:
+            bledy += 1
+            print(f"BŁĄD: {zbior} – różne odciski w trybach {', '.join(TRYBY)}")
+        # Cache musi działać: bez parsowania z gotowej tabeli, każdy tryb z cache szybszy niż zimny
+        tryby = {w["tryb"]: w for w in wyniki if w["zbiór"] == zbior}
+        for tryb, w in tryby.items():
+            if tryb in TRYBY_BEZ_PARSOWANIA and w["parsowania"]:
+                bledy += 1
+                print(f"BŁĄD: {zbior} – tryb {tryb} wywołał parser {w['parsowania']}×")
+            if tryb != "zimny" and w["czas_s"] >= tryby["zimny"]["czas_s"]:
+                print(f"UWAGA: {zbior} – tryb {tryb} ({w['czas_s']} s) nie szybszy niż zimny "
+                      f"({tryby['zimny']['czas_s']} s)")
+    if wzorzec:
+        bledy += _porownaj_ze_wzorcem(wyniki, parametry, wzorzec)
+    kolumny = ["zbiór", "tryb", "pliki", "xlsx_MB", "wiersze", "parsowania", "czas_s", "wiersze_s", "rss_MB",
+               "rss_przyrost_MB", "niezgodne", "x_wzorca", "uwagi"]
+    tabela = pd.DataFrame(wyniki)
+    print(tabela[[k for k in kolumny if k in tabela.columns]].fillna("").to_string(index=False))
+    if json_wynik:
+        _zapisz_wynik(json_wynik, parametry, wyniki)
+    print("Zgodność: OK" if not bledy else f"Zgodność: {bledy} BŁĘDÓW")
+    return bledy
+
+# ══════════════════════════════════════════════════════════
+# STRONY – przebiegi aplikacji w AppTest
+# ══════════════════════════════════════════════════════════
+# Każdy przebieg ścieżki to nowa sesja (nowy AppTest); cache Streamlit są wspólne dla procesu,
+# jak na serwerze. Przebieg 0 startuje po wyczyszczeniu cache (jak po restarcie serwera –
+# tabele Parquet na dysku zostają), kolejne są ciepłe. Alokacje mierzy osobny przebieg
+# z tracemalloc, żeby narzut śledzenia nie wchodził do czasów.
+
+APLIKACJA = os.path.join(wup_dane.BASE_DIR, "wup_auto_app.py")
+STRONY = ("pulpit", "bezrobotni", "stopa", "zwolnienia", "dane")
+PROG_REGRESJI = 0.25   # wolniej / więcej pamięci niż wzorzec o 25 % …
+PROG_MS, PROG_MB = 10, 1.0   # … i co najmniej o tyle (szum krótkich przebiegów)
+
+def _nawiguj(strona):
+    return lambda at: at.button(key=f"nav_{strona}").click().run()
+
+def _zakladka(klucz, etykieta):
+    def akcja(at):
+        at.session_state[klucz] = etykieta
+        at.run()
+    return akcja
+
+def _ustaw(rodzaj, klucz, wartosc):
+    """Widżet po kluczu; wartosc(widżet) → nowa wartość (np. inna opcja listy)."""
+    return lambda at: getattr(at, rodzaj)(key=klucz).set_value(wartosc(getattr(at, rodzaj)(key=klucz))).run()
+
+def _wyczysc_filtry(at):
+    for rodzaj, klucz, pusta in (("multiselect", "zwol_firmy_lista", []), ("text_input", "zwol_firma", ""),
+                                 ("multiselect", "zwol_pkd", []), ("multiselect", "zwol_pow", [])):
+        getattr(at, rodzaj)(key=klucz).set_value(pusta)
+    at.run()
+
+def scenariusz():
+    """[(strona, krok, akcja(at))] – ścieżka przez strony i ich główne widżety."""
+    pierwsza = lambda w: w.options[0]
+    kroki = [("pulpit", "ponownie", lambda at: at.run()),
+             ("pulpit", "pulpit_miara", _ustaw("radio", "pulpit_miara", lambda w: w.options[1])),
+             ("bezrobotni", "nav", _nawiguj("bezrobotni")),
+             ("bezrobotni", "zakładka powiaty", _zakladka("bz_zakladka", "🗺️ Powiaty – miesiąc")),
+             ("bezrobotni", "bz2_okres", _ustaw("selectbox", "bz2_okres", pierwsza)),
+             ("bezrobotni", "zakładka trend", _zakladka("bz_zakladka", "📊 Trend powiatu")),
+             ("bezrobotni", "zakładka tabela", _zakladka("bz_zakladka", "📋 Tabela")),
+             ("stopa", "nav", _nawiguj("stopa")),
+             ("stopa", "zakładka mapy", _zakladka("stopa_zakladka", "🗺️ Mapy + Powiaty")),
+             ("stopa", "stopa_okres", _ustaw("selectbox", "stopa_okres", pierwsza)),
+             ("stopa", "zakładka tabela", _zakladka("stopa_zakladka", "📋 Tabela")),
+             ("zwolnienia", "nav", _nawiguj("zwolnienia")),
+             ("zwolnienia", "zwol_tryb_okresu rok", _ustaw("radio", "zwol_tryb_okresu", lambda w: "Konkretny rok")),
+             ("zwolnienia", "zwol_rok", _ustaw("selectbox", "zwol_rok", pierwsza)),
+             ("zwolnienia", "zwol_tryb_okresu miesiące",
+              _ustaw("radio", "zwol_tryb_okresu", lambda w: "Konkretne miesiące")),
+             ("zwolnienia", "zwol_mies", _ustaw("multiselect", "zwol_mies", lambda w: w.options[:6])),
+             ("zwolnienia", "zwol_tryb_okresu wszystkie", _ustaw("radio", "zwol_tryb_okresu", lambda w: "Wszystkie")),
+             ("zwolnienia", "zwol_pow", _ustaw("multiselect", "zwol_pow", lambda w: w.options[:10])),
+             ("zwolnienia", "zwol_pkd", _ustaw("multiselect", "zwol_pkd", lambda w: w.options[:10])),
+             ("zwolnienia", "zwol_firma", lambda at: at.text_input(key="zwol_firma").input("polska").run()),
+             ("zwolnienia", "zwol_firmy_lista", _ustaw("multiselect", "zwol_firmy_lista", lambda w: w.options[:2])),
+             ("zwolnienia", "wyczyść filtry", _wyczysc_filtry)]
+    kroki += [("zwolnienia", f"zakładka {z}", _zakladka("zwol_zakladka", z))
+              for z in ("🏭 Firmy w czasie", "📊 PKD w czasie", "🗺️ Powiaty")]
+    kroki += [("dane", "nav", _nawiguj("dane"))]
+    kroki += [("dane", f"zakładka {z}", _zakladka("dane_zakladka", z)) for z in ("Bezrobocie", "Stopa bezrobocia")]
+    return kroki
+
+def _przebieg(aplikacja, kroki, sledz=False):
+    """Jedna sesja: start + kroki → [{strona, krok, ms, szczyt_MB, netto_MB, wykresy, błędy}]."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(aplikacja, default_timeout=600)
+    wyniki = []
+    for strona, krok, akcja in [("pulpit", "start", lambda at: at.run())] + kroki:
+        if sledz:
+            tracemalloc.reset_peak()
+            przed = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            akcja(at)
+            blad = "; ".join(e.message.splitlines()[0][:120] for e in at.exception)
+        except Exception as e:   # brak widżetu (np. pusty zbiór) – krok pominięty
+            blad = f"{type(e).__name__}: {e}"[:120]
+        w = {"strona": strona, "krok": krok, "ms": round(1000*(time.perf_counter() - t0), 1),
+             "wykresy": len(at.get("plotly_chart")), "błędy": blad}
+        if sledz:
+            teraz, szczyt = tracemalloc.get_traced_memory()
+            w["szczyt_MB"], w["netto_MB"] = round((szczyt - przed) / 2**20, 2), round((teraz - przed) / 2**20, 2)
+        wyniki.append(w)
+    return wyniki
+
+def mierz_strony(aplikacja=APLIKACJA, powtorzenia=3):
+    """Przebieg zimny + powtorzenia ciepłych (mediana czasu) + przebieg z tracemalloc (alokacje)."""
+    import streamlit as st, streamlit.logger
+    streamlit.logger.set_log_level("error")   # bez ostrzeżeń trybu „bare” przy każdym przebiegu
+    sys.path.insert(0, os.path.dirname(os.path.abspath(aplikacja)))
+    kroki = scenariusz()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # cache_resource.clear() zamyka też pulę wczytań aplikacji (on_release pula_wczytan)
+        st.cache_data.clear(); st.cache_resource.clear()
+        with wup_dane._STAN_LOCK:
+            wup_dane._STAN.clear()
+        zimny = _przebieg(aplikacja, kroki)
+        cieple = [_przebieg(aplikacja, kroki) for _ in range(max(powtorzenia, 1))]
+        tracemalloc.start()
+        try: sledzony = _przebieg(aplikacja, kroki, sledz=True)
+        finally: tracemalloc.stop()
+    wyniki = []
+    for i, w in enumerate(zimny):
+        czasy = [c[i]["ms"] for c in cieple]
+        wyniki.append({"strona": w["strona"], "krok": w["krok"], "zimny_ms": w["ms"],
+                       "ms": round(statistics.median(czasy), 1), "min_ms": min(czasy),
+                       "szczyt_MB": sledzony[i]["szczyt_MB"], "netto_MB": sledzony[i]["netto_MB"],
+                       "wykresy": w["wykresy"],
+                       "błędy": "; ".join(dict.fromkeys(b for b in [w["błędy"]] + [c[i]["błędy"] for c in cieple] if b))})
+    return wyniki
+
+def regresje(wyniki, wzorzec, prog=PROG_REGRESJI):
+    """Dopisuje x_wzorca i opis regresji (czas ciepły, szczyt alokacji) → liczba regresji."""
+    poprzednie = {(w["strona"], w["krok"]): w for w in wzorzec["wyniki"]}
+    n = 0
+    for w in wyniki:
+        p = poprzednie.get((w["strona"], w["krok"]))
+        if p is None: continue
+        w["x_wzorca"] = round(w["ms"] / p["ms"], 2) if p["ms"] else None
+        opis = [f"{k} {p[k]} → {w[k]}" for k, prog_abs in (("ms", PROG_MS), ("szczyt_MB", PROG_MB))
+                if w[k] > p[k]*(1 + prog) and w[k] - p[k] >= prog_abs]
+        if opis:
+            n += 1
+            w["regresja"] = ", ".join(opis)
+    return n
+
+def benchmark_stron(aplikacja=APLIKACJA, powtorzenia=3, json_wynik=None, wzorzec=None, prog=PROG_REGRESJI):
+    import streamlit as st
+    wyniki = mierz_strony(aplikacja, powtorzenia)
+    n_regresji = regresje(wyniki, _wczytaj_wzorzec(wzorzec), prog) if wzorzec else 0
+    tabela = pd.DataFrame(wyniki)
+    kolumny = ["strona", "krok", "zimny_ms", "ms", "min_ms", "szczyt_MB", "netto_MB", "wykresy",
+               "x_wzorca", "regresja", "błędy"]
+    print(tabela[[k for k in kolumny if k in tabela.columns]].fillna("").to_string(index=False))
+    print(tabela.groupby("strona", sort=False)[["zimny_ms", "ms"]].sum().round(0).to_string())
+    if json_wynik:
+        _zapisz_wynik(json_wynik, {"powtorzenia": powtorzenia, "aplikacja": os.path.basename(aplikacja)},
+                      wyniki, streamlit=st.__version__)
+    bledy = int(tabela["błędy"].astype(bool).sum())
+    if bledy: print(f"Błędy aplikacji w {bledy} krokach")
+    if wzorzec: print(f"Regresje (próg {prog:.0%}): {n_regresji}")
+    return bledy + n_regresji
+
+# ══════════════════════════════════════════════════════════
+# OBCIĄŻENIE – równoczesne sesje na serwerze Streamlit
+# ══════════════════════════════════════════════════════════
+# Klient mówi protokołem przeglądarki: BackMsg.rerun_script ze stanami widżetów po
+# /_stcore/stream, czeka na ForwardMsg.script_finished; eksport odroczony (download_button
+# z funkcją) to backend_operation_request → URL pliku → GET. Id widżetu kończy się „-<key>”.
+
+SCIEZKA_KROKI = ("start", "nav_zwolnienia", "zwol_tryb_okresu", "zwol_pkd", "zwol_pow", "nav_dane", "eksport")
+POZIOMY_SESJI = (1, 2, 4, 8)
+LIMIT_KROKU = 300   # s – dłużej oznacza zawieszony serwer
+
+def _rss_procesu_mb(pid):
+    """VmRSS procesu z /proc (Linux); gdzie indziej None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linia in f:
+                if linia.startswith("VmRSS:"): return int(linia.split()[1]) / 1024
+    except OSError:
+        return None
+
+def uruchom_serwer(aplikacja=APLIKACJA, port=8599, limit=120):
+    """streamlit run w osobnym procesie (bez przeglądarki, XSRF i obserwowania plików) → Popen po /_stcore/health."""
+    import subprocess, urllib.request
+    proc = subprocess.Popen([sys.executable, "-m", "streamlit", "run", os.path.abspath(aplikacja),
+                             "--server.headless", "true", "--server.port", str(port),
+                             "--server.enableXsrfProtection", "false", "--server.fileWatcherType", "none",
+                             "--browser.gatherUsageStats", "false"],
+                            cwd=os.path.dirname(os.path.abspath(aplikacja)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    koniec = time.monotonic() + limit
+    while time.monotonic() < koniec:
+        if proc.poll() is not None:
+            raise RuntimeError(f"serwer Streamlit zakończył się (kod {proc.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as r:
+                if r.read().strip() == b"ok": return proc
+        except OSError:
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError(f"serwer Streamlit nie odpowiada na porcie {port}")
+
+class _Sesja:
+    """Jedna karta przeglądarki: połączenie, widżety ostatniego przebiegu i stany ustawionych widżetów."""
+    def __init__(self, ws, url_http):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        self.ws, self.url_http, self.ForwardMsg = ws, url_http, ForwardMsg
+        self.widgety, self.stany, self.id_sesji, self.nr, self.bledy = {}, {}, "", 0, []
+
+    async def _odbierz(self):
+        f = self.ForwardMsg()
+        f.ParseFromString(await asyncio.wait_for(self.ws.recv(), LIMIT_KROKU))
+        typ = f.WhichOneof("type")
+        if typ == "new_session":
+            self.id_sesji = f.new_session.initialize.session_id
+        elif typ == "delta" and f.delta.WhichOneof("type") == "new_element":
+            el = f.delta.new_element
+            w = getattr(el, el.WhichOneof("type"))
+            if isinstance(getattr(w, "id", None), str) and w.id:
+                self.widgety[w.id] = w
+            if el.WhichOneof("type") == "exception":
+                self.bledy.append(el.exception.message.splitlines()[0][:120])
+        return f, typ
+
+    def widget(self, klucz):
+        for i, w in self.widgety.items():
+            if i.endswith("-" + klucz): return i, w
+        raise LookupError(f"brak widżetu {klucz}")
+
+    async def przebieg(self, klucz=None, **wartosc):
+        """Ustawia widżet (trigger_value – jednorazowo) i czeka na koniec przebiegu skryptu → błędy."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        stany = dict(self.stany)
+        if klucz:
+            i, _ = self.widget(klucz)
+            stan = WidgetState(id=i)
+            for pole, v in wartosc.items():
+                if pole == "string_array_value": stan.string_array_value.data.extend(v)
+                else: setattr(stan, pole, v)
+            stany[i] = stan
+            if "trigger_value" not in wartosc: self.stany[i] = stan
+        m = BackMsg()
+        m.rerun_script.query_string = ""
+        m.rerun_script.widget_states.widgets.extend(stany.values())
+        self.bledy = []
+        await self.ws.send(m.SerializeToString())
+        while True:
+            f, typ = await self._odbierz()
+            if typ == "script_finished" and f.script_finished != self.ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                if f.script_finished == self.ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.bledy.append("błąd kompilacji skryptu")
+                return self.bledy
+
+    async def eksport(self, klucz):
+        """Kliknięcie download_button z odroczonym plikiem: URL od serwera i pobranie → błędy."""
+        import urllib.request
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        _, w = self.widget(klucz)
+        self.nr += 1
+        m = BackMsg()
+        m.backend_operation_request.request_id = f"eksport-{self.nr}"
+        m.backend_operation_request.session_id = self.id_sesji
+        m.backend_operation_request.deferred_file.file_id = w.deferred_file_id
+        self.bledy = []
+        await self.ws.send(m.SerializeToString())
+        while True:
+            f, typ = await self._odbierz()
+            if typ == "backend_operation_response" and f.backend_operation_response.request_id == m.backend_operation_request.request_id:
+                break
+        odp = f.backend_operation_response
+        if odp.error_msg:
+            return [odp.error_msg[:120]]
+        def pobierz():
+            with urllib.request.urlopen(self.url_http + odp.deferred_file.url, timeout=LIMIT_KROKU) as r:
+                return len(r.read())
+        return [] if await asyncio.to_thread(pobierz) else ["pusty plik eksportu"]
+
+async def _sciezka(url, rng, pomiary):
+    """Pulpit → Zwolnienia (tryb okresu, PKD, powiaty) → Dane surowe → eksport; pomiary += (krok, ms, błąd)."""
+    from websockets.asyncio.client import connect
+    async def krok(nazwa, akcja):
+        t0 = time.perf_counter()
+        try: bledy = await akcja()
+        except Exception as e: bledy = [f"{type(e).__name__}: {e}"[:120]]
+        pomiary.append((nazwa, 1000*(time.perf_counter() - t0), "; ".join(bledy)))
+        return not bledy
+    def losowe(klucz, k):
+        opcje = list(s.widget(klucz)[1].options)
+        return rng.sample(opcje, min(k, len(opcje)))
+    t0 = time.perf_counter()
+    try:
+        ws = await connect(f"ws://{url}/_stcore/stream", subprotocols=["streamlit"], max_size=None,
+                           open_timeout=LIMIT_KROKU)
+    except Exception as e:
+        pomiary.append(("start", 1000*(time.perf_counter() - t0), f"{type(e).__name__}: {e}"[:120]))
+        return
+    async with ws:
+        s = _Sesja(ws, f"http://{url}")
+        kroki = [("start", lambda: s.przebieg()),
+                 ("nav_zwolnienia", lambda: s.przebieg("nav_zwolnienia", trigger_value=True)),
+                 ("zwol_tryb_okresu", lambda: s.przebieg("zwol_tryb_okresu", string_value="Konkretny rok")),
+                 ("zwol_pkd", lambda: s.przebieg("zwol_pkd", string_array_value=losowe("zwol_pkd", 3))),
+                 ("zwol_pow", lambda: s.przebieg("zwol_pow", string_array_value=losowe("zwol_pow", 3))),
+                 ("nav_dane", lambda: s.przebieg("nav_dane", trigger_value=True)),
+                 ("eksport", lambda: s.eksport("eksp_zwol"))]
+        for nazwa, akcja in kroki:
+            if not await krok(nazwa, akcja): break   # dalsze kroki zależą od poprzednich
+
+async def _poziom(url, sesje, powtorzenia, ziarno, pid):
+    """sesje równoczesnych użytkowników × powtorzenia ścieżki; RSS serwera próbkowany co 0,25 s."""
+    import random
+    pomiary, rss, trwa = [], [], True
+    async def probkuj():
+        while trwa:
+            r = _rss_procesu_mb(pid) if pid else None
+            if r is not None: rss.append(r)
+            await asyncio.sleep(0.25)
+    async def uzytkownik(i):
+        rng = random.Random(ziarno*1000 + i)
+        for _ in range(powtorzenia):
+            await _sciezka(url, rng, pomiary)
+    probnik = asyncio.create_task(probkuj())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(uzytkownik(i) for i in range(sesje)))
+    czas = time.perf_counter() - t0
+    trwa = False
+    await probnik
+    return pomiary, czas, rss
+
+def _percentyle(ms):
+    if not ms: return {"p50": None, "p95": None, "p99": None, "max": None}
+    p = np.percentile(ms, [50, 95, 99])
+    return {"p50": round(float(p[0]), 1), "p95": round(float(p[1]), 1), "p99": round(float(p[2]), 1),
+            "max": round(max(ms), 1)}
+
+def mierz_obciazenie(aplikacja=APLIKACJA, poziomy=POZIOMY_SESJI, powtorzenia=2, port=8599, ziarno=0, adres=None):
+    """Serwer (własny albo adres host:port) → (poziomy: [{sesje, p50…, przepustowość, RSS}], kroki, rozgrzewka)."""
+    proc = None if adres else uruchom_serwer(aplikacja, port)
+    url, pid = adres or f"127.0.0.1:{port}", proc and proc.pid
+    try:
+        # Rozgrzewka: pierwsza sesja po starcie serwera wczytuje zbiory do cache (zimny start)
+        rozgrzewka, _, _ = asyncio.run(_poziom(url, 1, 1, ziarno, None))
+        wyniki, kroki = [], []
+        for n in poziomy:
+            rss0 = _rss_procesu_mb(pid) if pid else None
+            pomiary, czas, rss = asyncio.run(_poziom(url, n, powtorzenia, ziarno, pid))
+            ms = [p[1] for p in pomiary if not p[2]]
+            wyniki.append({"sesje": n, "przebiegi": len(pomiary), "błędy": sum(1 for p in pomiary if p[2]),
+                           **_percentyle(ms), "czas_s": round(czas, 2),
+                           "przebiegi_s": round(len(ms) / czas, 2) if czas else None,
+                           "rss_start_MB": rss0 and round(rss0, 1), "rss_MB": round(max(rss), 1) if rss else None,
+                           "przykład_błędu": next((p[2] for p in pomiary if p[2]), "")})
+            for k in SCIEZKA_KROKI:
+                kroki.append({"sesje": n, "krok": k, **_percentyle([p[1] for p in pomiary if p[0] == k and not p[2]])})
+        return wyniki, kroki, [{"krok": k, "ms": round(m, 1), "błąd": b} for k, m, b in rozgrzewka]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try: proc.wait(10)
+            except Exception: proc.kill()
+
+def benchmark_obciazenia(aplikacja=APLIKACJA, poziomy=POZIOMY_SESJI, powtorzenia=2, port=8599, adres=None,
+                         json_wynik=None, wzorzec=None, prog=PROG_REGRESJI):
+    try: import websockets
+    except ImportError:
+        print("Brak pakietu websockets – zainstaluj: pip install websockets")
+        return 1
+    import streamlit as st
+    wyniki, kroki, rozgrzewka = mierz_obciazenie(aplikacja, poziomy, powtorzenia, port, adres=adres)
+    print("Rozgrzewka (zimny serwer): " + ", ".join(f"{r['krok']} {r['ms']:.0f} ms" for r in rozgrzewka))
+    n_regresji = 0
+    if wzorzec:
+        poprzednie = {w["sesje"]: w for w in _wczytaj_wzorzec(wzorzec)["wyniki"]}
+        for w in wyniki:
+            p = poprzednie.get(w["sesje"])
+            if not p or not p["p95"] or w["p95"] is None: continue
+            w["x_wzorca"] = round(w["p95"] / p["p95"], 2)
+            if w["p95"] > p["p95"]*(1 + prog) and w["p95"] - p["p95"] >= PROG_MS:
+                n_regresji += 1
+                w["regresja"] = f"p95 {p['p95']} → {w['p95']}"
+    print(pd.DataFrame(wyniki).fillna("").to_string(index=False))
+    print(pd.DataFrame(kroki).pivot(index="krok", columns="sesje", values="p95")
+            .reindex(SCIEZKA_KROKI).to_string(float_format=lambda v: f"{v:.0f}"))
+    if json_wynik:
+        _zapisz_wynik(json_wynik, {"poziomy": list(poziomy), "powtorzenia": powtorzenia,
+                                   "aplikacja": os.path.basename(aplikacja)},
+                      wyniki, {"kroki": kroki, "rozgrzewka": rozgrzewka}, streamlit=st.__version__)
+    bledy = sum(w["błędy"] for w in wyniki)
+    if bledy: print(f"Błędy sesji: {bledy}")
+    if wzorzec: print(f"Regresje p95 (próg {prog:.0%}): {n_regresji}")
+    return bledy + n_regresji
+
+# ══════════════════════════════════════════════════════════
+# CLI
+# ══════════════════════════════════════════════════════════
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WUP Mazowieckie – benchmarki")
+    sub = parser.add_subparsers(dest="polecenie", required=True)
+    def skala(p):
+        p.add_argument("--lata", type=int, default=2, help="liczba lat (po 12 plików na zbiór)")
+        p.add_argument("--powiaty", type=int, default=len(WGM_MAP), help=f"liczba powiatów (1–{len(WGM_MAP)})")
+        p.add_argument("--firmy", type=int, default=60, help="zgłoszeń zwolnień na miesiąc")
+        p.add_argument("--ziarno", type=int, default=0)
+    p = sub.add_parser("generuj", help="zapisz syntetyczne skoroszyty i wartości oczekiwane")
+    p.add_argument("katalog")
+    skala(p)
+    p = sub.add_parser("loadery", help="czas, szczyt RSS i wiersze/s loaderów + zgodność wyników")
+    p.add_argument("--katalog", help="gotowy katalog z 'generuj' (domyślnie: tymczasowy)")
+    skala(p)
+    p.add_argument("--powtorzenia", type=int, default=1, help="pomiarów na tryb (najlepszy czas)")
+    p.add_argument("--json", metavar="PLIK", help="zapisz wyniki do pliku JSON")
+    p.add_argument("--wzorzec", metavar="PLIK", help="porównaj z wcześniejszym wynikiem --json")
+    p = sub.add_parser("strony", help="czas i alokacje przebiegów stron aplikacji (AppTest)")
+    p.add_argument("--aplikacja", default=APLIKACJA, help="plik aplikacji Streamlit")
+    p.add_argument("--powtorzenia", type=int, default=3, help="ciepłych przebiegów ścieżki (mediana)")
+    p.add_argument("--json", metavar="PLIK", help="zapisz wyniki do pliku JSON")
+    p.add_argument("--wzorzec", metavar="PLIK", help="porównaj z wcześniejszym wynikiem --json")
+    p.add_argument("--prog", type=float, default=PROG_REGRESJI, help="próg regresji względem wzorca (0.25 = 25%%)")
+    p = sub.add_parser("obciazenie", help="N równoczesnych sesji na lokalnym serwerze: p50/p95/p99, przepustowość, RSS")
+    p.add_argument("--aplikacja", default=APLIKACJA, help="plik aplikacji Streamlit")
+    p.add_argument("--sesje", default=",".join(map(str, POZIOMY_SESJI)), help="kolejne liczby sesji, np. 1,2,4,8")
+    p.add_argument("--powtorzenia", type=int, default=2, help="przejść ścieżki na sesję")
+    p.add_argument("--port", type=int, default=8599, help="port uruchamianego serwera")
+    p.add_argument("--adres", metavar="HOST:PORT", help="istniejący serwer (bez uruchamiania i bez RSS)")
+    p.add_argument("--json", metavar="PLIK", help="zapisz wyniki do pliku JSON")
+    p.add_argument("--wzorzec", metavar="PLIK", help="porównaj z wcześniejszym wynikiem --json")
+    p.add_argument("--prog", type=float, default=PROG_REGRESJI, help="próg regresji p95 względem wzorca")
+    args = parser.parse_args(argv)
+    if args.polecenie == "obciazenie":
+        poziomy = tuple(int(n) for n in args.sesje.split(",") if n.strip())
+        return 1 if benchmark_obciazenia(args.aplikacja, poziomy, args.powtorzenia, args.port, args.adres,
+                                         args.json, args.wzorzec, args.prog) else 0
+    if args.polecenie == "strony":
+        return 1 if benchmark_stron(args.aplikacja, args.powtorzenia, args.json, args.wzorzec, args.prog) else 0
+    if args.polecenie == "generuj":
+        t0 = time.perf_counter()
+        for n, df in generuj(args.katalog, args.lata, args.powiaty, args.firmy, args.ziarno).items():
+            print(f"{n:<18} {df['Sort_key'].nunique():>3} plików  {len(df):>7,} wierszy")
+        print(f"Gotowe w {time.perf_counter()-t0:.1f} s")
+        return 0
+    return 1 if benchmark_loaderow(args.katalog, args.lata, args.powiaty, args.firmy, args.ziarno,
+                                   args.powtorzenia, args.json, args.wzorzec) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1450 @@
+"""
+WUP Mazowieckie – warstwa danych
+================================
+Parsowanie plików XLSX (zwolnienia grupowe, MRPiPS-01, GUS) niezależne od UI.
+Moduł nie importuje Streamlit – używa go aplikacja (wup_auto_app.py),
+tryb wsadowy --convert oraz procesy robocze puli.
+
+Konwersja XLSX → Parquet (wszystkie rdzenie, jeden plik na proces):
+    python wup_auto_app.py --convert [--workers N]
+Raport pamięci ramek (schemat SCHEMAT vs dawne object/float64):
+    python wup_dane.py --memory
+Zapytania SQL (DuckDB, opcjonalnie) nad tabelami zbiorów:
+    python wup_dane.py --sql "SELECT Typ, avg(Stopa) FROM stopa_bezrobocia GROUP BY 1"
+API HTTP/JSON tylko do odczytu (KPI, szeregi powiatów, sumy zwolnień):
+    python wup_api.py [--port 8502]
+Syntetyczne skoroszyty i benchmark loaderów (czas, szczyt RSS, wiersze/s, zgodność wyników),
+przebiegi stron aplikacji (AppTest) z porównaniem do wzorca, obciążenie serwera N sesjami:
+    python wup_bench.py loadery [--lata 2] [--powiaty 41] [--firmy 60]
+    python wup_bench.py strony [--json WYNIK.json] [--wzorzec WZORZEC.json]
+    python wup_bench.py obciazenie [--sesje 1,2,4,8] [--json WYNIK.json] [--wzorzec WZORZEC.json]
+Pomiary (spany loaderów, plików, arkuszy, bloków stron i wykresów; panel w sidebarze aplikacji):
+    WUP_POMIARY=1 streamlit run wup_auto_app.py   (albo WUP_POMIARY=KATALOG – zamiast __cache__/pomiary)
+Wynik: dane/<zbiór>/__cache__/tabela.parquet + tabela.json (manifest plików źródłowych).
+Loadery czytają gotową tabelę i parsują tylko pliki nowe lub zmienione (sha1);
+zmiana kodu parserów (WERSJA_KODU) wymusza pełne przeliczenie – z cache per arkusz, gdy skoroszyt jest ten sam.
+"""
+
+import os, re, glob, json, argparse, sys, time, datetime, hashlib, inspect, itertools, threading, tracemalloc, unicodedata
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import openpyxl
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MIESIAC_PL = {
+    1:"Styczeń",2:"Luty",3:"Marzec",4:"Kwiecień",5:"Maj",6:"Czerwiec",
+    7:"Lipiec",8:"Sierpień",9:"Wrzesień",10:"Październik",11:"Listopad",12:"Grudzień"
+}
+ROMAN = {"I":1,"II":2,"III":3,"IV":4,"V":5,"VI":6,
+         "VII":7,"VIII":8,"IX":9,"X":10,"XI":11,"XII":12}
+PL_NAMES = {
+    "styczen":1,"styczeń":1,"luty":2,"marzec":3,"kwiecien":4,"kwiecień":4,
+    "maj":5,"czerwiec":6,"lipiec":7,"sierpien":8,"sierpień":8,
+    "wrzesien":9,"wrzesień":9,"pazdziernik":10,"październik":10,
+    "listopad":11,"grudzien":12,"grudzień":12,
+}
+
+PKD_OPISY = {
+    "6419Z":"Usługi kredytowe","6499Z":"Inne usługi finansowe",
+    "6619Z":"Wspomaganie finansów","6622Z":"Agenci ubezpieczeniowi",
+    "6110Z":"Telekomunikacja przewodowa","6120Z":"Telekomunikacja bezprzewodowa",
+    "6190Z":"Pozostała telekomunikacja","6201Z":"Oprogramowanie",
+    "6202Z":"Doradztwo IT","6209Z":"Inne usługi IT",
+    "6311Z":"Przetwarzanie danych","6312Z":"Portale internetowe",
+    "4711Z":"Handel detaliczny","4719Z":"Handel detaliczny (inne)",
+    "4920Z":"Transport kolejowy towarów","5310Z":"Poczta",
+    "5320Z":"Usługi kurierskie","2042Z":"Chemia gospodarcza",
+    "2222Z":"Opakowania z tworzyw","2351Z":"Produkcja cementu",
+    "2910B":"Produkcja pojazdów","7311Z":"Agencje reklamowe",
+    "7021Z":"Public relations","8220Z":"Call center",
+    "9200Z":"Gry losowe i zakłady",
+}
+
+def normalizuj_pkd(pkd):
+    return re.sub(r'[.\s]', '', str(pkd).strip()).upper()
+
+def parsuj_nazwe(nazwa):
+    m = re.match(r'^(\d{4})[-_.](\d{1,2})$', nazwa)
+    if m: return int(m.group(1)), int(m.group(2))
+    m = re.match(r'^(\d{1,2})[-_.](\d{4})$', nazwa)
+    if m: return int(m.group(2)), int(m.group(1))
+    m = re.match(r'^(X{0,3}(?:IX|IV|V?I{0,3}))[-_.](\d{4})$', nazwa, re.IGNORECASE)
+    if m and m.group(1).upper() in ROMAN: return int(m.group(2)), ROMAN[m.group(1).upper()]
+    m = re.match(r'^([a-ząćęłńóśźż]+)[-_.](\d{4})$', nazwa, re.IGNORECASE)
+    if m and m.group(1).lower() in PL_NAMES: return int(m.group(2)), PL_NAMES[m.group(1).lower()]
+    return None
+
+def znajdz_pliki(folder):
+    wyniki = []
+    wszystkie = glob.glob(os.path.join(folder,"*.xlsx")) + glob.glob(os.path.join(folder,"*.xls"))
+    seen = set()
+    for s in wszystkie:
+        if s.lower() not in seen:
+            seen.add(s.lower())
+            nazwa = os.path.splitext(os.path.basename(s))[0]
+            parsed = parsuj_nazwe(nazwa)
+            if parsed:
+                r,m = parsed
+                if 1<=m<=12 and 2000<=r<=2100:
+                    wyniki.append({"sciezka":s,"rok":r,"miesiac":m,
+                                   "nazwa_pl":f"{MIESIAC_PL[m]} {r}",
+                                   "sort_key":r*100+m})
+    return sorted(wyniki, key=lambda x: x["sort_key"])
+
+# Podbij przy zmianie sposobu czytania arkuszy – unieważnia cache arkuszy i tabel
+WERSJA_SCHEMATU = 3
+
+def _kanon(o):
+    """Tekst stały między procesami: źródło funkcji, nazwa typu/wbudowanej, posortowane
+    dict/set – nigdy repr z adresem pamięci ani kolejnością zależną od PYTHONHASHSEED."""
+    if isinstance(o, type) or (callable(o) and not inspect.isfunction(o)):
+        return f"{getattr(o, '__module__', None) or ''}.{getattr(o, '__qualname__', type(o).__qualname__)}"
+    if inspect.isfunction(o): return inspect.getsource(o)
+    if isinstance(o, dict): return "{" + ",".join(sorted(f"{_kanon(k)}:{_kanon(v)}" for k, v in o.items())) + "}"
+    if isinstance(o, (set, frozenset)): return "{" + ",".join(sorted(map(_kanon, o))) + "}"
+    if isinstance(o, (list, tuple)): return "[" + ",".join(map(_kanon, o)) + "]"
+    return repr(o)
+
+def _odcisk_kodu(*obiekty):
+    """Odcisk źródeł funkcji i stałych (_kanon) – cache zależy tylko od kodu, który go wypełnia."""
+    h = hashlib.sha1()
+    for o in obiekty:
+        h.update(_kanon(o).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+class BrakArkusza(LookupError):
+    """Skoroszyt nie zawiera żądanego arkusza (wynik także trafia do cache)."""
+
+class _Skoroszyt:
+    """
+    Skoroszyt openpyxl (read_only, strumieniowo) otwierany leniwie – dopiero gdy
+    któryś arkusz nie jest w cache – i współdzielony przez arkusze jednego pliku.
+    """
+    def __init__(self, path):
+        self.path, self.wb = path, None
+    def otworz(self):
+        if self.wb is None:
+            self.wb = openpyxl.load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+        return self.wb
+    def zamknij(self):
+        if self.wb is not None:
+            self.wb.close(); self.wb = None
+
+def _komorka(cell):
+    """Wartość komórki jak w pandas (silnik openpyxl): puste → "", liczby całkowite → int."""
+    if cell.value is None: return ""
+    if cell.data_type == TYPE_ERROR: return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        v = int(cell.value)
+        return v if v == cell.value else float(cell.value)
+    return cell.value
+
+def _czytaj_zakres(ws, header=0, max_row=None, max_col=None):
+    """
+    Tylko wiersze 1..max_row i kolumny A..max_col arkusza (strumień read_only kończy się
+    po max_row). Wynik jak pd.read_excel na całym arkuszu przycięty do zakresu –
+    te same etykiety kolumn i ta sama konwersja wartości (TextParser).
+    """
+    ws.reset_dimensions()
+    data, ostatni = [], -1
+    for i, row in enumerate(ws.iter_rows(max_row=max_row, max_col=max_col)):
+        r = [_komorka(c) for c in row]
+        while r and r[-1] == "": r.pop()
+        if r: ostatni = i
+        data.append(r)
+    data = data[:ostatni+1]
+    if not data:
+        return pd.DataFrame()
+    szer = max(len(r) for r in data)
+    data = [r + [""]*(szer-len(r)) for r in data]
+    return TextParser(data, header=header, skip_blank_lines=False).read()
+
+def _parquet_path(xlsx_path, sheet_name=0, klucz=""):
+    d = os.path.join(os.path.dirname(xlsx_path), "__cache__")
+    os.makedirs(d, exist_ok=True)
+    base = os.path.splitext(os.path.basename(xlsx_path))[0]
+    arkusz = re.sub(r"\W+", "_", str(sheet_name)).strip("_") or "0"
+    return os.path.join(d, f"{base}.{arkusz}.{klucz}.parquet")
+
+def _klucz_arkusza(path, sheet_name, kwargs):
+    s = os.stat(path)
+    opis = [WERSJA_SCHEMATU, WERSJA_ARKUSZY, pd.__version__, os.path.abspath(path), s.st_size, s.st_mtime_ns,
+            sheet_name, sorted((k, repr(v)) for k, v in kwargs.items())]
+    return hashlib.sha1(json.dumps(opis, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def _zapisz_atomowo(sciezka, zapis):
+    tmp = f"{sciezka}.{os.getpid()}.{threading.get_ident()}.tmp"
+    zapis(tmp)
+    os.replace(tmp, sciezka)
+
+# Parquet wymaga etykiet str i jednego typu w kolumnie, a arkusze header=None mają etykiety
+# int i kolumny mieszane (tekst + liczby). Kolumna mieszana → tekst + kolumna "<k>|typ";
+# wartości innych typów (KeyError) → arkusz trafia do .pkl.
+_TYPY_KOMOREK = {str: "s", int: "i", float: "f", bool: "b", datetime.datetime: "d"}
+_Z_TEKSTU = {"s": str, "i": int, "f": float, "b": lambda v: v == "True", "d": datetime.datetime.fromisoformat}
+
+def _tekst_komorki(v):
+    if v is None: return None
+    if isinstance(v, datetime.datetime): return v.isoformat()
+    return repr(v) if isinstance(v, float) else str(v)
+
+def _do_parquet(df):
+    kolumny = {}
+    for k in df.columns:
+        s = df[k]
+        if s.dtype == object and not s.map(lambda v: isinstance(v, str)).all():
+            kolumny[f"{k}|typ"] = s.map(lambda v: "n" if v is None else _TYPY_KOMOREK[type(v)])
+            s = s.map(_tekst_komorki)
+        kolumny[str(k)] = s
+    return pd.DataFrame(kolumny, index=df.index)
+
+def _z_parquet(df, etykiety_int):
+    """Odwrotność _do_parquet; etykiety_int – arkusz czytany z header=None."""
+    kolumny = {}
+    for k in df.columns:
+        if k.endswith("|typ"): continue
+        s = df[k]
+        if f"{k}|typ" in df.columns:
+            s = pd.Series([None if t == "n" else _Z_TEKSTU[t](v) for t, v in zip(df[f"{k}|typ"], s)],
+                          index=df.index, dtype=object)
+        kolumny[int(k) if etykiety_int else k] = s
+    return pd.DataFrame(kolumny, index=df.index)
+
+# ══════════════════════════════════════════════════════════
+# POMIARY – spany czasu, wierszy i alokacji (domyślnie wyłączone)
+# ══════════════════════════════════════════════════════════
+# with pomiar("arkusz", plik=..., arkusz=...) as s: ...; s.wiersze = len(df)
+# Wyłączone: pomiar() zwraca wspólny pusty span – koszt to sprawdzenie flagi.
+# Włączone (WUP_POMIARY albo wlacz_pomiary): czas, wiersze, alokacje netto i szczyt
+# ponad stan z początku spanu (tracemalloc – spowalnia parsowanie; przy równoległych
+# wątkach alokacje się mieszają) i błąd – także połknięty przez parser (zglos_blad).
+# Zagnieżdżenie per wątek: rodzic i przebieg (id spanu głównego).
+# Zakończone spany: bufor w pamięci, wiersz JSON w KATALOG/pomiary.jsonl; po każdym
+# spanie głównym KATALOG/pomiary.prom – sumy per (span, etykiety) w formacie Prometheus.
+
+POMIARY_LIMIT = 2000                          # zakończone spany w buforze procesu
+ETYKIETY_POZA_METRYKAMI = {"plik", "arkusz"}  # za dużo wartości na serie Prometheus
+
+_POMIARY = {"wlaczone": False, "katalog": None}
+_POMIARY_LOCK = threading.Lock()
+_SPANY = deque(maxlen=POMIARY_LIMIT)
+_SUMY = {}   # (span, etykiety) → [liczba, sekundy, wiersze, błędy, szczyt_B]
+_WATEK = threading.local()
+_NUMERY = itertools.count(1)
+
+def _stos():
+    if not hasattr(_WATEK, "stos"): _WATEK.stos = []
+    return _WATEK.stos
+
+class _Span:
+    __slots__ = ("nazwa", "etykiety", "wiersze", "blad", "id", "rodzic", "przebieg", "t0", "m0", "szczyt")
+
+    def __init__(self, nazwa, etykiety):
+        self.nazwa, self.etykiety, self.wiersze, self.blad = nazwa, etykiety, None, None
+
+    def ustaw(self, **etykiety):
+        self.etykiety.update(etykiety)
+
+    def otworz(self):
+        stos = _stos()
+        rodzic = stos[-1] if stos else None
+        self.id, self.rodzic = next(_NUMERY), rodzic and rodzic.id
+        self.przebieg = rodzic.przebieg if rodzic else self.id
+        self.m0, self.szczyt = None, 0
+        if tracemalloc.is_tracing():
+            # reset_peak jest globalny – dotychczasowy szczyt przechodzi do rodzica
+            self.m0, szczyt = tracemalloc.get_traced_memory()
+            if rodzic: rodzic.szczyt = max(rodzic.szczyt, szczyt)
+            tracemalloc.reset_peak()
+        stos.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def zamknij(self, blad=None):
+        sekundy = time.perf_counter() - self.t0
+        stos = _stos()
+        if self in stos: del stos[stos.index(self):]   # razem z niezamkniętymi dziećmi
+        netto = szczyt = None
+        if self.m0 is not None and tracemalloc.is_tracing():
+            teraz, szczyt = tracemalloc.get_traced_memory()
+            szczyt = max(szczyt, self.szczyt)
+            if stos: stos[-1].szczyt = max(stos[-1].szczyt, szczyt)
+            netto, szczyt = teraz - self.m0, szczyt - self.m0
+        _zapisz_span({"czas": round(time.time(), 3), "span": self.nazwa, "etykiety": self.etykiety,
+                      "ms": round(1000*sekundy, 3), "wiersze": self.wiersze, "netto_B": netto,
+                      "szczyt_B": szczyt, "blad": blad or self.blad, "id": self.id, "rodzic": self.rodzic,
+                      "przebieg": self.przebieg, "watek": threading.current_thread().name,
+                      "pid": os.getpid()}, glowny=not stos)
+
+    def __enter__(self):
+        return self.otworz()
+
+    def __exit__(self, typ, e, tb):
+        self.zamknij(f"{typ.__name__}: {e}"[:200] if typ else None)
+        return False
+
+class _BezPomiaru:
+    """Span przy wyłączonych pomiarach – nic nie mierzy i nie zapisuje."""
+    wiersze = None
+    def ustaw(self, **etykiety): pass
+    def otworz(self): return self
+    def zamknij(self, blad=None): pass
+    def __enter__(self): return self
+    def __exit__(self, typ, e, tb): return False
+
+_BEZ_POMIARU = _BezPomiaru()
+
+def pomiar(nazwa, **etykiety):
+    """Span (context manager albo otworz()/zamknij()); wiersze ustawia wywołujący."""
+    return _Span(nazwa, etykiety) if _POMIARY["wlaczone"] else _BEZ_POMIARU
+
+def przebieg(**etykiety):
+    """Otwarty span główny przebiegu – porzuca niezamknięte spany wątku (przerwany przebieg, st.rerun)."""
+    if _POMIARY["wlaczone"]: _stos().clear()
+    return pomiar("przebieg", **etykiety).otworz()
+
+def zglos_blad(e):
+    """Wyjątek połknięty przez parser → błąd najbliższego otwartego spanu wątku."""
+    if _POMIARY["wlaczone"] and _stos():
+        _stos()[-1].blad = f"{type(e).__name__}: {e}"[:200]
+
+def pomiary_wlaczone():
+    return _POMIARY["wlaczone"]
+
+def katalog_pomiarow():
+    return _POMIARY["katalog"]
+
+def wlacz_pomiary(katalog=None, pamiec=True):
+    """Włącza spany; katalog – pomiary.jsonl i pomiary.prom, pamiec – alokacje (tracemalloc)."""
+    katalog = katalog or os.path.join(BASE_DIR, "__cache__", "pomiary")
+    os.makedirs(katalog, exist_ok=True)
+    if pamiec and not tracemalloc.is_tracing(): tracemalloc.start()
+    _POMIARY.update(wlaczone=True, katalog=katalog)
+
+def spany(przebieg=None):
+    """Zakończone spany z bufora (najstarsze pierwsze), opcjonalnie tylko jednego przebiegu."""
+    with _POMIARY_LOCK:
+        return [s for s in _SPANY if przebieg is None or s["przebieg"] == przebieg]
+
+def _zapisz_span(wpis, glowny):
+    etykiety = tuple(sorted((k, str(v)) for k, v in wpis["etykiety"].items() if k not in ETYKIETY_POZA_METRYKAMI))
+    linia = json.dumps(wpis, ensure_ascii=False, default=str) + "\n"
+    with _POMIARY_LOCK:
+        _SPANY.append(wpis)
+        suma = _SUMY.setdefault((wpis["span"], etykiety), [0, 0.0, 0, 0, 0])
+        suma[0] += 1; suma[1] += wpis["ms"] / 1000; suma[2] += wpis["wiersze"] or 0
+        suma[3] += bool(wpis["blad"]); suma[4] = max(suma[4], wpis["szczyt_B"] or 0)
+        katalog = _POMIARY["katalog"]
+        if not katalog: return
+        try:
+            with open(os.path.join(katalog, "pomiary.jsonl"), "a", encoding="utf-8") as f: f.write(linia)
+            # Procesy robocze puli dopisują tylko log – plik metryk należy do procesu głównego
+            if glowny and mp.parent_process() is None:
+                tekst = metryki_prometheus()
+                def zapisz(t):
+                    with open(t, "w", encoding="utf-8") as f: f.write(tekst)
+                _zapisz_atomowo(os.path.join(katalog, "pomiary.prom"), zapisz)
+        except OSError: pass
+
+def metryki_prometheus():
+    """Sumy spanów w formacie tekstowym Prometheus (np. dla textfile collector node_exportera)."""
+    def etykieta(v):
+        return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    metryki = [("wup_span_seconds", "summary", "Czas spanów wup_dane.pomiar (s)", None),
+               ("wup_span_rows_total", "counter", "Wiersze zwrócone w spanach", 2),
+               ("wup_span_errors_total", "counter", "Spany zakończone błędem", 3),
+               ("wup_span_peak_bytes", "gauge", "Największy szczyt alokacji spanu (B, tracemalloc)", 4)]
+    wiersze = []
+    for nazwa, typ, opis, i in metryki:
+        wiersze += [f"# HELP {nazwa} {opis}", f"# TYPE {nazwa} {typ}"]
+        for (span, etykiety), suma in sorted(_SUMY.items()):
+            e = ",".join(f'{k}="{etykieta(v)}"' for k, v in (("span", span),) + etykiety)
+            if i is None:
+                wiersze += [f"{nazwa}_count{{{e}}} {suma[0]}", f"{nazwa}_sum{{{e}}} {suma[1]:.6f}"]
+            else:
+                wiersze.append(f"{nazwa}{{{e}}} {suma[i]}")
+    return "\n".join(wiersze) + "\n"
+
+if os.environ.get("WUP_POMIARY", "0") not in ("", "0"):
+    wlacz_pomiary(None if os.environ["WUP_POMIARY"] == "1" else os.environ["WUP_POMIARY"])
+
+def _load_excel_or_parquet(path, sheet_name=0, skoroszyt=None, **zakres):
+    """
+    Wczytuje zakres jednego arkusza z cache (__cache__/<plik>.<arkusz>.<klucz>.parquet),
+    a przy braku – z xlsx (_czytaj_zakres) i zapisuje cache. Klucz: ścieżka, rozmiar,
+    mtime, arkusz, zakres (header/max_row/max_col) i WERSJA_SCHEMATU.
+    Etykiety int i kolumny mieszanych typów (header=None) koduje _do_parquet; wartości
+    spoza _TYPY_KOMOREK – .pkl obok. Brak arkusza zapisywany jako .brak → BrakArkusza.
+    """
+    with pomiar("arkusz", plik=os.path.basename(path), arkusz=str(sheet_name), zrodlo="xlsx") as s:
+        pq = _parquet_path(path, sheet_name, _klucz_arkusza(path, sheet_name, zakres))
+        stem = pq[:-len(".parquet")]
+        if os.path.exists(stem+".brak"):
+            s.ustaw(zrodlo="cache")
+            raise BrakArkusza(sheet_name)
+        z_parquet = lambda f: _z_parquet(pd.read_parquet(f), zakres.get("header", 0) is None)
+        for plik, czytaj in ((pq, z_parquet), (stem+".pkl", pd.read_pickle)):
+            if os.path.exists(plik):
+                try: df = czytaj(plik)
+                except Exception: continue
+                s.ustaw(zrodlo="cache"); s.wiersze = len(df)
+                return df
+
+        # Nieaktualne wpisy tego arkusza (inny klucz) do usunięcia
+        prefiks = stem.rsplit(".", 1)[0] + "."
+        for stary in glob.glob(glob.escape(prefiks) + "*"):
+            try: os.remove(stary)
+            except OSError: pass
+
+        wlasny = skoroszyt is None
+        if wlasny: skoroszyt = _Skoroszyt(path)
+        try:
+            wb = skoroszyt.otworz()
+            if isinstance(sheet_name, str) and sheet_name not in wb.sheetnames:
+                try: open(stem+".brak", "w").close()
+                except OSError: pass
+                raise BrakArkusza(sheet_name)
+            ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+            df = _czytaj_zakres(ws, **zakres)
+            s.wiersze = len(df)
+        finally:
+            if wlasny: skoroszyt.zamknij()
+        try:
+            _zapisz_atomowo(pq, lambda t: _do_parquet(df).to_parquet(t, index=False, engine="pyarrow"))
+        except Exception:
+            try: _zapisz_atomowo(stem+".pkl", lambda t: pd.to_pickle(df, t, compression=None))
+            except Exception: pass
+        return df
+
+# Odcisk czytania arkuszy – klucz cache arkuszy (obok WERSJA_SCHEMATU)
+WERSJA_ARKUSZY = _odcisk_kodu(_komorka, _czytaj_zakres, _tekst_komorki, _do_parquet, _z_parquet,
+                              _TYPY_KOMOREK, _Z_TEKSTU)
+
+GUS_DO_GEO = {
+    "białobrzeski":"powiat białobrzeski","ciechanowski":"powiat ciechanowski",
+    "garwoliński":"powiat garwoliński","gostyniński":"powiat gostyniński",
+    "grodziski":"powiat grodziski","grójecki":"powiat grójecki",
+    "kozienicki":"powiat kozienicki","legionowski":"powiat legionowski",
+    "lipski":"powiat lipski","łosicki":"powiat łosicki",
+    "makowski":"powiat makowski","miński":"powiat miński",
+    "mławski":"powiat mławski","nowodworski":"powiat nowodworski",
+    "ostrołęcki":"powiat ostrołęcki","ostrowski":"powiat ostrowski",
+    "otwocki":"powiat otwocki","piaseczyński":"powiat piaseczyński",
+    "płocki":"powiat płocki","płoński":"powiat płoński",
+    "pruszkowski":"powiat pruszkowski","przasnyski":"powiat przasnyski",
+    "przysuski":"powiat przysuski","pułtuski":"powiat pułtuski",
+    "radomski":"powiat radomski","siedlecki":"powiat siedlecki",
+    "sierpecki":"powiat sierpecki","sochaczewski":"powiat sochaczewski",
+    "sokołowski":"powiat sokołowski","szydłowiecki":"powiat szydłowiecki",
+    "warszawski zachodni":"powiat warszawski zachodni",
+    "węgrowski":"powiat węgrowski","wołomiński":"powiat wołomiński",
+    "wyszkowski":"powiat wyszkowski","zwoleński":"powiat zwoleński",
+    "żuromiński":"powiat żuromiński","żyrardowski":"powiat żyrardowski",
+    "m. ostrołęka":"powiat Ostrołęka","m. płock":"powiat Płock",
+    "m. radom":"powiat Radom","m. siedlce":"powiat Siedlce",
+    "m. warszawa":"powiat Warszawa","warszawa":"powiat Warszawa",
+}
+
+NUTS2_DO_GEO = {
+    "PL21":"małopolskie","PL22":"śląskie","PL41":"wielkopolskie",
+    "PL42":"zachodniopomorskie","PL43":"lubuskie","PL51":"dolnośląskie",
+    "PL52":"opolskie","PL61":"kujawsko-pomorskie","PL62":"warmińsko-mazurskie",
+    "PL63":"pomorskie","PL71":"łódzkie","PL72":"świętokrzyskie",
+    "PL81":"lubelskie","PL82":"podkarpackie","PL84":"podlaskie",
+    "PL9":"mazowieckie","PL91":"mazowieckie","PL92":"mazowieckie",
+}
+
+WGM_MAP = {
+    1402:("Białobrzeski","powiat"),   1403:("Ciechanowski","powiat"),
+    1404:("Garwoliński","powiat"),    1405:("Gostyniński","powiat"),
+    1406:("Grodziski","powiat"),      1407:("Grójecki","powiat"),
+    1408:("Kozienicki","powiat"),     1409:("Legionowski","powiat"),
+    1410:("Lipski","powiat"),         1411:("Łosicki","powiat"),
+    1412:("Makowski","powiat"),       1413:("Miński","powiat"),
+    1414:("Mławski","powiat"),        1415:("Nowodworski","powiat"),
+    1416:("Ostrołęcki","powiat"),     1417:("Ostrowski","powiat"),
+    1418:("Otwocki","powiat"),        1419:("Piaseczyński","powiat"),
+    1420:("Płocki","powiat"),         1421:("Płoński","powiat"),
+    1422:("Pruszkowski","powiat"),    1423:("Przasnyski","powiat"),
+    1424:("Przysuski","powiat"),      1425:("Pułtuski","powiat"),
+    1426:("Radomski","powiat"),       1427:("Siedlecki","powiat"),
+    1428:("Sierpecki","powiat"),      1429:("Sochaczewski","powiat"),
+    1430:("Sokołowski","powiat"),     1432:("Szydłowiecki","powiat"),
+    1433:("Warszawski Zachodni","powiat"), 1434:("Węgrowski","powiat"),
+    1435:("Wołomiński","powiat"),     1436:("Wyszkowski","powiat"),
+    1437:("Zwoleński","powiat"),      1438:("Żuromiński","powiat"),
+    1461:("m. Ostrołęka","powiat"),   1462:("m. Płock","powiat"),
+    1463:("m. Radom","powiat"),       1464:("m. Siedlce","powiat"),
+    1465:("m. Warszawa","powiat"),
+}
+NRW_KAT = {
+    "005":"Na_wsi", "008":"Cudzoziemcy", "009":"Bez_kwalif",
+    "013":"Do_30_lat", "014":"Do_25_lat",
+    "016":"Pow_50_lat", "017":"Dlugoterwale", "018":"Niepelnosprawni",
+}
+
+# ══════════════════════════════════════════════════════════
+# PARSERY – jeden plik → DataFrame
+# ══════════════════════════════════════════════════════════
+
+# Czytane zakresy arkuszy (max_row/max_col liczone od 1, jak w openpyxl)
+ZAKRES_ZWOL   = dict(header=None, max_col=10)               # B=powiat … J=monitorowani
+ZAKRES_DBF    = dict(header=0, max_col=11)                  # WGM … R5 (A–K)
+ZAKRES_WOJ    = dict(header=None, max_row=34, max_col=15)   # wiersz 15 + kategorie 20–33, kol. I–O
+ZAKRES_TABL1  = dict(header=None, max_col=7)                # kod, nazwa, bezrobotni, stopa (A–G)
+ZAKRES_TABL1A = dict(header=None, max_col=5)                # woj, pow, nazwa, bezrobotni, stopa (A–E)
+
+ZWOL_POMIN = r"powiat|suma|ogółem|razem"   # wiersze nagłówków i podsumowań
+ZWOL_LICZBY = {6:"Zgłoszeni", 7:"Wypow_zmieniające", 8:"Zwolnieni", 9:"Monitorowani"}
+
+def _kolumna(xl, idx):
+    """Kolumna arkusza albo pusta (None), gdy arkusz jest węższy."""
+    return xl[idx] if idx in xl.columns else pd.Series(None, index=xl.index, dtype=object)
+
+def _tekst(kol):
+    """Kolumnowe str(v or "").strip() – puste i zerowe komórki → ""."""
+    kol = kol.astype(object)
+    kol = kol.where(kol.notna() & ~kol.eq(0), "")
+    return kol.astype(str).str.strip()
+
+def parsuj_zwolnienia(p):
+    wb = _Skoroszyt(p["sciezka"])
+    try:
+        try: xl = _load_excel_or_parquet(p["sciezka"], "dane", wb, **ZAKRES_ZWOL)
+        except Exception: xl = _load_excel_or_parquet(p["sciezka"], 0, wb, **ZAKRES_ZWOL)
+        xl = xl.iloc[7:]
+        # Powiat musi być tekstem (≥2 znaki) i nie być wierszem podsumowania
+        powiat = _kolumna(xl, 1).astype(object).str.strip()
+        ok = powiat.str.len().ge(2) & ~powiat.str.lower().str.contains(ZWOL_POMIN, regex=True, na=True)
+        xl, powiat = xl[ok.fillna(False).astype(bool)], powiat[ok.fillna(False).astype(bool)]
+
+        pkd_raw = _tekst(_kolumna(xl, 5))
+        pkd = pkd_raw.str.replace(r"[.\s]", "", regex=True).str.upper()   # = normalizuj_pkd
+        df = pd.DataFrame({
+            "Okres":p["nazwa_pl"],"Rok":p["rok"],"Miesiąc_num":p["miesiac"],
+            "Sort_key":p["sort_key"],"Powiat":powiat,
+            "Nazwa":_tekst(_kolumna(xl, 3)).str.replace(r"\s{2,}", " ", regex=True).str[:70],
+            "PKD":pkd,"PKD_opis":pkd.map(PKD_OPISY).fillna(pkd_raw.str[:30]),
+        }, index=xl.index)
+        for idx, col in ZWOL_LICZBY.items():
+            # jak dotąd pd.to_numeric(v) or 0 – puste i tekst nieliczbowy dają NaN
+            df[col] = pd.to_numeric(_kolumna(xl, idx), errors="coerce")
+        return df.reset_index(drop=True)
+    finally:
+        wb.zamknij()
+
+def parsuj_bezrobocie(p):
+    """
+    Plik MRPiPS-01.
+    Województwo ogółem: arkusz 'WOJEWÓDZTWO OGÓŁEM', row 15, col 12=stan_koniec, col 13=kobiety
+    Powiaty: arkusz 'dbf', TABELA=1, NRW=001, ostatni blok per WGM: R1=stan_koniec, R2=kobiety
+    Kategorie: NRW=005(wsi), 008(cudzoziemcy), 009(bez_kwalif), 013(do30), 016(pow50), 017(dlugotrwale)
+    """
+    czesci = []
+    wb = _Skoroszyt(p["sciezka"])
+    try:
+        try: df = _load_excel_or_parquet(p["sciezka"], "dbf", wb, **ZAKRES_DBF)
+        except BrakArkusza: return pd.DataFrame()
+        df["NRW"] = df["NRW"].astype(str).str.strip().str.zfill(3)
+        df["WGM"] = df["WGM"].astype(int)
+
+        # ── 1. Województwo ogółem z arkusza WOJEWÓDZTWO OGÓŁEM ──
+        try: df_w = _load_excel_or_parquet(p["sciezka"], "WOJEWÓDZTWO OGÓŁEM", wb, **ZAKRES_WOJ)
+        except Exception: df_w = None
+        if df_w is not None:
+            try:
+                r = list(df_w.iloc[15])  # Ogółem wiersz
+                def gc(idx):
+                    v = r[idx] if idx < len(r) else None
+                    return pd.to_numeric(v, errors="coerce")
+                # Zarejestrowani=col8, Wyrej=col10, Stan_koniec=col12, Stan_K=col13
+                zarej_w       = gc(8)
+                wyr_w         = gc(10)
+                stan_koniec_w = gc(12)
+                stan_K_w      = gc(13)
+                z_zasilkiem_w = gc(14)
+
+                # Kategorie z kolejnych wierszy (col 12 = stan_koniec)
+                def kat_woj(row_idx):
+                    try:
+                        return pd.to_numeric(list(df_w.iloc[row_idx])[12], errors="coerce")
+                    except: return np.nan
+
+                rec_w = {
+                    "Okres":p["nazwa_pl"],"Rok":p["rok"],
+                    "Miesiąc_num":p["miesiac"],"Sort_key":p["sort_key"],
+                    "Region":"Mazowieckie","Typ":"województwo",
+                    "Zarejestrowani":zarej_w,"Wyrejestrowani":wyr_w,
+                    "Stan_koniec":stan_koniec_w,"Stan_koniec_K":stan_K_w,
+                    "Z_zasilkiem":z_zasilkiem_w,
+                    "Na_wsi":     kat_woj(20),
+                    "Cudzoziemcy":kat_woj(23),
+                    "Bez_kwalif": kat_woj(24),
+                    "Do_30_lat":  kat_woj(28),
+                    "Do_25_lat":  kat_woj(29),
+                    "Pow_50_lat": kat_woj(31),
+                    "Dlugoterwale":kat_woj(32),
+                    "Niepelnosprawni":kat_woj(33),
+                }
+                czesci.append(pd.DataFrame([rec_w]))
+            except Exception as e:
+                zglos_blad(e)
+
+        # ── 2. Powiaty z arkusza dbf – jeden filtr TABELA=1, potem grupowanie po WGM/NRW ──
+        t1 = df[(df["TABELA"]==1) & df["WGM"].isin(WGM_MAP)]
+        ogolem = t1[t1["NRW"]=="001"]
+        # Pierwszy blok NRW=001: R1=zarej, R5=z zasiłkiem; ostatni: R1=stan_koniec_ogół, R2=stan_K
+        r_first = ogolem.drop_duplicates("WGM", keep="first").set_index("WGM")
+        r_last  = ogolem.drop_duplicates("WGM", keep="last").set_index("WGM")
+        wgm = [w for w in WGM_MAP if w in r_first.index]   # kolejność jak w WGM_MAP
+        powiaty = pd.DataFrame({
+            "Okres":p["nazwa_pl"],"Rok":p["rok"],
+            "Miesiąc_num":p["miesiac"],"Sort_key":p["sort_key"],
+            "Region":[WGM_MAP[w][0] for w in wgm],"Typ":[WGM_MAP[w][1] for w in wgm],
+            "Zarejestrowani":r_first["R1"].reindex(wgm).values,
+            "Stan_koniec":r_last["R1"].reindex(wgm).values,
+            "Stan_koniec_K":r_last["R2"].reindex(wgm).values,
+            "Z_zasilkiem":r_first["R5"].reindex(wgm).values,
+        })
+        # Kategorie (NRW=005 itp.) – pierwszy wiersz per (WGM, NRW), kolumna R5 = stan_koniec w kategorii
+        kat = (t1[t1["NRW"].isin(NRW_KAT) & t1["WGM"].isin(wgm)]
+               .drop_duplicates(["WGM","NRW"])
+               .pivot(index="WGM", columns="NRW", values="R5")
+               .reindex(wgm))
+        for nrw, col in NRW_KAT.items():
+            if nrw in kat.columns:
+                powiaty[col] = kat[nrw].values
+        if not powiaty.empty:
+            czesci.append(powiaty)
+    finally:
+        wb.zamknij()
+    return pd.concat(czesci, ignore_index=True) if czesci else pd.DataFrame()
+
+def _wiersze_stopy(p, kod, nazwa, typ, bezrob, stopa, geo):
+    geo = geo.astype(object).where(geo.notna(), None)   # brak dopasowania → None, jak dict.get
+    return pd.DataFrame({
+        "Okres":p["nazwa_pl"],"Rok":p["rok"],"Miesiąc_num":p["miesiac"],
+        "Sort_key":p["sort_key"],"Kod":kod,"Nazwa":nazwa,"Typ":typ,
+        "Bezrobotni_tys":bezrob,"Stopa":stopa,"Geo_nazwa":geo,
+    }).reset_index(drop=True)
+
+def parsuj_stope(p):
+    czesci = []
+    wb = _Skoroszyt(p["sciezka"])
+    try:
+        try: df = _load_excel_or_parquet(p["sciezka"], "Tabl.1", wb, **ZAKRES_TABL1)
+        except BrakArkusza: df = None
+        if df is not None:
+            # Województwa (NUTS2, kod PLxx) + makroregion PL9
+            kod = _kolumna(df, 0).astype(str).str.strip()
+            stopa = pd.to_numeric(_kolumna(df, 6), errors="coerce")
+            ok = (kod.str.startswith("PL") & stopa.notna()
+                  & (kod.str.len().eq(4) | kod.isin(["PL9","PL91","PL92"])))
+            kod = kod[ok]
+            czesci.append(_wiersze_stopy(
+                p, kod,
+                _kolumna(df, 4)[ok].astype(str).str.strip()
+                    .str.replace("REGION: ","",regex=False).str.replace("PODREGION: ","",regex=False)
+                    .str.strip().str.title(),
+                "województwo",
+                pd.to_numeric(_kolumna(df, 5)[ok], errors="coerce"), stopa[ok],
+                kod.map(NUTS2_DO_GEO).where(kod.str.len().eq(4), "mazowieckie")))
+        try: df = _load_excel_or_parquet(p["sciezka"], "Tabl.1a", wb, **ZAKRES_TABL1A)
+        except BrakArkusza: df = None
+        if df is not None:
+            # Powiaty mazowieckie (woj. 14), pow. 00 = województwo
+            stopa = pd.to_numeric(_kolumna(df, 4), errors="coerce")
+            ok = _kolumna(df, 0).astype(str).str.strip().eq("14") & stopa.notna()
+            pow_kod = _kolumna(df, 1)[ok].astype(str).str.strip()
+            nazwa = _kolumna(df, 2)[ok].astype(str).str.strip().str.lower().str.strip()
+            czesci.append(_wiersze_stopy(
+                p, "14" + pow_kod, nazwa.str.title(),
+                pow_kod.eq("00").map({True:"województwo", False:"powiat"}),
+                pd.to_numeric(_kolumna(df, 3)[ok], errors="coerce"), stopa[ok],
+                nazwa.map(GUS_DO_GEO)))
+    finally: wb.zamknij()
+    czesci = [c for c in czesci if not c.empty]
+    return pd.concat(czesci, ignore_index=True) if czesci else pd.DataFrame()
+
+# zbiór → (podfolder w dane/, parser pliku, argumenty sortowania)
+ZBIORY = {
+    "bezrobocie":       ("bezrobocie",       parsuj_bezrobocie, (["Sort_key","Typ"],[True,False])),
+    "stopa_bezrobocia": ("stopa_bezrobocia", parsuj_stope,      ("Sort_key",True)),
+    "zwolnienia":       ("zwolnienia",       parsuj_zwolnienia, ("Sort_key",True)),
+}
+
+# Odcisk parserów i ich stałych – zmiana unieważnia gotowe tabele zbiorów; reszta modułu
+# (SQL, GeoJSON, eksport, dokumentacja) nie wymusza ponownego parsowania
+WERSJA_KODU = _odcisk_kodu(WERSJA_ARKUSZY, parsuj_nazwe, znajdz_pliki, _kolumna, _tekst, parsuj_zwolnienia,
+                           parsuj_bezrobocie, _wiersze_stopy, parsuj_stope, MIESIAC_PL, ROMAN, PL_NAMES,
+                           PKD_OPISY, GUS_DO_GEO, NUTS2_DO_GEO, WGM_MAP, NRW_KAT, ZAKRES_ZWOL, ZAKRES_DBF,
+                           ZAKRES_WOJ, ZAKRES_TABL1, ZAKRES_TABL1A, ZWOL_POMIN, ZWOL_LICZBY)
+
+# Schemat ramek w pamięci: wymiary o małej liczności → category, liczności → Int32
+# (nullable – braki w arkuszach zostają <NA>; kolumna z ułamkiem zostaje float64),
+# klucze czasu → małe inty.
+# Stopa i Bezrobotni_tys (ułamki) zostają float64. Okres ustawia _ramka (ordered).
+SCHEMAT = {
+    "Rok": "int16", "Miesiąc_num": "int8", "Sort_key": "int32",
+    **{k: "category" for k in ("Powiat","Nazwa","PKD","PKD_opis","Region","Typ","Kod","Geo_nazwa")},
+    **{k: "Int32" for k in ("Zgłoszeni","Wypow_zmieniające","Zwolnieni","Monitorowani",
+                            "Zarejestrowani","Wyrejestrowani","Stan_koniec","Stan_koniec_K",
+                            "Z_zasilkiem","Na_wsi","Cudzoziemcy","Bez_kwalif","Do_30_lat",
+                            "Do_25_lat","Pow_50_lat","Dlugoterwale","Niepelnosprawni")},
+}
+
+_ZAKRES_INT32 = (-2**31, 2**31 - 1)
+
+def _licznosc(kol):
+    """Kolumna liczności → Int32, gdy wartości są całkowite i mieszczą się w zakresie;
+    inaczej float64 (ułamek albo przepełnienie w arkuszu nie wywraca wczytania)."""
+    x = pd.to_numeric(kol).astype("float64")
+    w = x.dropna()
+    if ((w == w.round()) & w.between(*_ZAKRES_INT32)).all():
+        return x.round().astype("Int32")
+    return x
+
+def _typuj(df):
+    df = df.astype({k: t for k, t in SCHEMAT.items() if k in df.columns and t != "Int32"})
+    for k in [k for k, t in SCHEMAT.items() if k in df.columns and t == "Int32"]:
+        df[k] = _licznosc(df[k])
+    return df
+
+def _dawny_uklad(df):
+    """Ramka w układzie sprzed SCHEMAT (object / float64 / int64) – punkt odniesienia raportu."""
+    typy = {}
+    for k, t in SCHEMAT.items():
+        if k not in df.columns: continue
+        typy[k] = object if t == "category" else "float64" if t == "Int32" else "int64"
+    return df.astype(typy)
+
+def raport_pamieci(ramki):
+    """{zbiór: DataFrame} → tabela zajętości pamięci (deep) przed i po SCHEMAT."""
+    wiersze = []
+    for n, df in ramki.items():
+        po = int(df.memory_usage(index=True, deep=True).sum())
+        przed = int(_dawny_uklad(df).memory_usage(index=True, deep=True).sum())
+        wiersze.append({"Zbiór": n, "Wiersze": len(df), "Przed_B": przed, "Po_B": po,
+                        "Oszczędność_%": round(100*(1-po/przed), 1) if przed else 0.0})
+    return pd.DataFrame(wiersze)
+
+def _wiersze_pliku(records, p):
+    """Wynik parsera (rekordy lub DataFrame) → DataFrame z kolumną _plik (źródło wierszy)."""
+    df = pd.DataFrame(records)
+    df["_plik"] = os.path.basename(p["sciezka"])
+    return df
+
+def _sklej(czesci, pliki):
+    """Części per plik → jedna ramka w kolejności plików (jak przy pełnym parsowaniu)."""
+    ramki = [czesci[b] for b in (os.path.basename(p["sciezka"]) for p in pliki)
+             if b in czesci and not czesci[b].empty]
+    return pd.concat(ramki, ignore_index=True) if ramki else pd.DataFrame()
+
+def _ramka(nazwa, surowa, pliki):
+    """Sklejone wiersze zbioru → DataFrame wg SCHEMAT z uporządkowanym Okres (bez _plik)."""
+    df = surowa.drop(columns="_plik", errors="ignore")
+    if not df.empty:
+        _, _, (by, asc) = ZBIORY[nazwa]
+        kolejnosc = list(dict.fromkeys([p["nazwa_pl"] for p in pliki]))
+        df["Okres"] = pd.Categorical(df["Okres"],categories=kolejnosc,ordered=True)
+        df = _typuj(df).sort_values(by, ascending=asc)
+    return df
+
+# ══════════════════════════════════════════════════════════
+# TABELE PARQUET + MANIFEST – przyrostowe odświeżanie
+# ══════════════════════════════════════════════════════════
+# __cache__/tabela.parquet – wiersze wszystkich plików (z _plik), kolejność plików
+# __cache__/tabela.json    – manifest: plik → rozmiar, mtime, sha1, liczba wierszy
+# Odświeżenie parsuje tylko pliki nowe/zmienione (sha1) i podmienia ich wiersze.
+
+_STAN = {}   # folder → (manifest, surowa ramka) – stan w pamięci procesu
+_STAN_LOCK = threading.Lock()
+_BLOKADY = {}   # folder → Lock – różne zbiory odświeżane równolegle (wątki aplikacji)
+_POSTEP = {}    # folder → (sparsowane, do sparsowania) w trakcie odświeżania
+
+def _blokada(folder):
+    with _STAN_LOCK:
+        return _BLOKADY.setdefault(folder, threading.Lock())
+
+def postep_wczytania(folder):
+    """(sparsowane pliki, pliki do sparsowania) podczas odświeżania tabeli zbioru, poza tym None."""
+    return _POSTEP.get(folder)
+
+def _tabela_path(folder):
+    return os.path.join(folder, "__cache__", "tabela.parquet")
+
+def _sha1_pliku(sciezka):
+    h = hashlib.sha1()
+    with open(sciezka, "rb") as f:
+        for blok in iter(lambda: f.read(1 << 20), b""):
+            h.update(blok)
+    return h.hexdigest()
+
+def _wpis_manifestu(p, sha1=None, wiersze=None):
+    s = os.stat(p["sciezka"])
+    return {"rozmiar":s.st_size, "mtime_ns":s.st_mtime_ns,
+            "sha1":sha1 or _sha1_pliku(p["sciezka"]), "wiersze":wiersze}
+
+def stan_folderu(folder):
+    """Tani odcisk folderu (nazwa, rozmiar, mtime) – klucz cache w aplikacji."""
+    wynik = []
+    for p in znajdz_pliki(folder):
+        s = os.stat(p["sciezka"])
+        wynik.append((os.path.basename(p["sciezka"]), s.st_size, s.st_mtime_ns))
+    return tuple(wynik)
+
+def _zapisz_tabele(folder, manifest, surowa, tylko_manifest=False):
+    pq = _tabela_path(folder)
+    try:
+        os.makedirs(os.path.dirname(pq), exist_ok=True)
+        if not tylko_manifest:
+            _zapisz_atomowo(pq, lambda t: surowa.to_parquet(t, index=False))
+        def zapisz_json(t):
+            with open(t,"w",encoding="utf-8") as f:
+                json.dump({"wersja":[WERSJA_SCHEMATU,WERSJA_KODU],"pliki":manifest}, f, ensure_ascii=False, indent=1)
+        _zapisz_atomowo(pq[:-len(".parquet")]+".json", zapisz_json)
+    except Exception: pass
+
+def _czytaj_tabele(folder):
+    """(manifest, surowa) z dysku albo ({}, None), gdy brak lub inna wersja kodu."""
+    pq = _tabela_path(folder)
+    try:
+        with open(pq[:-len(".parquet")]+".json","r",encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("wersja") != [WERSJA_SCHEMATU,WERSJA_KODU]:
+            return {}, None
+        return meta["pliki"], pd.read_parquet(pq)
+    except Exception:
+        return {}, None
+
+def _aktualizuj_tabele(nazwa, folder, pliki):
+    """Dociąga pliki nowe/zmienione do tabeli zbioru (Parquet + stan w pamięci) → surowa ramka."""
+    with _blokada(folder):
+        manifest, surowa = _STAN.get(folder) or _czytaj_tabele(folder)
+        if surowa is None: manifest = {}
+        nowy, zmienione = {}, []
+        for p in pliki:
+            b = os.path.basename(p["sciezka"])
+            wpis, s = manifest.get(b), os.stat(p["sciezka"])
+            if wpis and wpis.get("blad"):
+                wpis = None   # nieudane parsowanie – ponawiane przy każdym odświeżeniu
+            if wpis and (wpis["rozmiar"], wpis["mtime_ns"]) == (s.st_size, s.st_mtime_ns):
+                nowy[b] = wpis; continue
+            akt = _wpis_manifestu(p, wiersze=wpis and wpis["wiersze"])
+            if wpis and wpis["sha1"] == akt["sha1"]:
+                nowy[b] = akt; continue   # dotknięty, ale treść ta sama
+            nowy[b] = akt; zmienione.append(p)
+        usuniete = set(manifest) - set(nowy)
+
+        if zmienione or usuniete:
+            czesci = dict(tuple(surowa.groupby("_plik", sort=False))) if surowa is not None and not surowa.empty else {}
+            try:
+                for i, p in enumerate(zmienione):
+                    _POSTEP[folder] = (i, len(zmienione))
+                    df_p, blad = _parsuj_plik(nazwa, p)
+                    df_p = _wiersze_pliku(df_p, p)
+                    czesci[os.path.basename(p["sciezka"])] = df_p
+                    nowy[os.path.basename(p["sciezka"])].update(wiersze=len(df_p), blad=blad)
+            finally:
+                _POSTEP.pop(folder, None)
+            surowa = _sklej(czesci, pliki)
+            _zapisz_tabele(folder, nowy, surowa)
+        elif nowy != manifest:
+            _zapisz_tabele(folder, nowy, surowa, tylko_manifest=True)
+        if surowa is None: surowa = pd.DataFrame()
+        _STAN[folder] = (nowy, surowa)
+    return surowa
+
+def _parsuj_plik(nazwa, p):
+    """
+    (DataFrame, błąd) – błąd parsera (plik zablokowany, niedokopiowany, uszkodzony) daje
+    pustą ramkę i opis; wpis manifestu z "blad" wymusza ponowne parsowanie przy odświeżeniu.
+    """
+    with pomiar("plik", zbior=nazwa, plik=os.path.basename(p["sciezka"])) as s:
+        try:
+            df = ZBIORY[nazwa][1](p)
+        except Exception as e:
+            zglos_blad(e)
+            return pd.DataFrame(), f"{type(e).__name__}: {e}"[:200]
+        s.wiersze = len(df)
+        return df, None
+
+def _wczytaj_zbior(nazwa, folder, pliki):
+    with pomiar("loader", zbior=nazwa) as s:
+        df = _ramka(nazwa, _aktualizuj_tabele(nazwa, folder, pliki), pliki)
+        s.wiersze = len(df)
+        return df
+
+def wczytaj_zwolnienia(folder):
+    pliki = znajdz_pliki(folder)
+    return _wczytaj_zbior("zwolnienia", folder, pliki), pliki
+
+def wczytaj_bezrobocie(folder):
+    """Wczytuje pliki MRPiPS-01 (szczegóły w parsuj_bezrobocie)."""
+    return _wczytaj_zbior("bezrobocie", folder, znajdz_pliki(folder))
+
+def wczytaj_stopa_bezrobocia(folder):
+    return _wczytaj_zbior("stopa_bezrobocia", folder, znajdz_pliki(folder))
+
+# zbiór → loader zwracający samą ramkę (wczytaj_zwolnienia zwraca też listę plików)
+LOADERY = {"zwolnienia": lambda f: wczytaj_zwolnienia(f)[0],
+           "bezrobocie": wczytaj_bezrobocie, "stopa_bezrobocia": wczytaj_stopa_bezrobocia}
+
+# ══════════════════════════════════════════════════════════
+# GEOJSON – indeks nazw i uproszczone geometrie per zoom
+# ══════════════════════════════════════════════════════════
+# Uproszczenie topologiczne (jak TopoJSON): pierścienie dzielone są w węzłach
+# (punktach z >2 sąsiadami) na łuki, każdy wspólny łuk upraszczany raz
+# (Douglas–Peucker) – sąsiednie powiaty dostają identyczną granicę, bez szczelin.
+# Poziom z: tolerancja pół piksela przy zoomie z mapbox – w stopniach długości,
+# przeskalowana przez cos(szerokości), bo piksel w pionie obejmuje mniej stopni
+# (Mercator); tak tolerancja nie przekracza pół piksela w żadnym kierunku.
+
+ZOOM_POZIOMY = (4, 5, 6, 7)   # zoom > 7 → pełna geometria
+
+def _tolerancja(zoom, szerokosc=0.0):
+    return 0.5 * 360 / (256 * 2**zoom) * np.cos(np.radians(szerokosc))
+
+def _szerokosc(gj):
+    """Największa |szerokość geograficzna| w GeoJSON – najmniejszy cos, tolerancja z zapasem."""
+    return max((abs(p[1]) for ft in gj["features"] for r in _pierscienie(ft["geometry"]) for p in r),
+               default=0.0)
+
+def _pierscienie(geom):
+    if geom["type"] == "Polygon": return list(geom["coordinates"])
+    if geom["type"] == "MultiPolygon": return [r for poly in geom["coordinates"] for r in poly]
+    return []
+
+def _douglas_peucker(pts, tol):
+    """Indeksy punktów łuku zostających po uproszczeniu (końce zawsze zostają)."""
+    a = np.asarray(pts, dtype=float)
+    keep = np.zeros(len(a), dtype=bool); keep[[0, -1]] = True
+    stos = [(0, len(a)-1)]
+    while stos:
+        i, j = stos.pop()
+        if j - i < 2: continue
+        seg, w = a[j] - a[i], a[i+1:j] - a[i]
+        dl = np.hypot(*seg)
+        d = np.abs(seg[0]*w[:, 1] - seg[1]*w[:, 0]) / dl if dl else np.hypot(w[:, 0], w[:, 1])
+        k = int(d.argmax())
+        if d[k] > tol:
+            keep[i+1+k] = True
+            stos += [(i, i+1+k), (i+1+k, j)]
+    return np.flatnonzero(keep)
+
+def uprosc_geojson(gj, tol, miejsca=None):
+    """Kopia FeatureCollection z geometriami uproszczonymi z zachowaniem wspólnych granic."""
+    sasiedzi = {}
+    for ft in gj["features"]:
+        for r in _pierscienie(ft["geometry"]):
+            pts = [tuple(p[:2]) for p in r]
+            for a, b in zip(pts, pts[1:]):
+                sasiedzi.setdefault(a, set()).add(b); sasiedzi.setdefault(b, set()).add(a)
+    wezly = {p for p, s in sasiedzi.items() if len(s) > 2}
+    gotowe = {}
+
+    def luk(pts):
+        klucz = min(pts, pts[::-1])
+        if klucz not in gotowe:
+            gotowe[klucz] = [klucz[i] for i in _douglas_peucker(klucz, tol)]
+        return gotowe[klucz] if klucz == pts else gotowe[klucz][::-1]
+
+    def pierscien(r):
+        pts = [tuple(p[:2]) for p in r]
+        if pts[0] == pts[-1]: pts = pts[:-1]
+        if len(pts) < 3: return [list(p) for p in r]
+        ciecia = [i for i, p in enumerate(pts) if p in wezly]
+        if not ciecia:
+            # Pierścień bez węzłów (wyspa/enklawa) – stały początek i kierunek,
+            # żeby ten sam pierścień w dwóch obiektach uprościł się identycznie
+            k = pts.index(min(pts)); pts = pts[k:] + pts[:k]
+            if pts[-1] < pts[1]: pts = [pts[0]] + pts[:0:-1]
+            ciecia = [0]
+        k = ciecia[0]; pts = pts[k:] + pts[:k]
+        ciecia = [i - k for i in ciecia] + [len(pts)]
+        pts = pts + [pts[0]]
+        wynik = []
+        for i, j in zip(ciecia, ciecia[1:]):
+            wynik += luk(tuple(pts[i:j+1]))[:-1]
+        wynik.append(wynik[0])
+        if miejsca is not None:
+            wynik = [(round(x, miejsca), round(y, miejsca)) for x, y in wynik]
+            wynik = [p for i, p in enumerate(wynik) if i == 0 or p != wynik[i-1]]
+        return [list(p) for p in wynik] if len(wynik) >= 4 else [list(p) for p in r]
+
+    def geometria(g):
+        if g["type"] == "Polygon":
+            return {"type": "Polygon", "coordinates": [pierscien(r) for r in g["coordinates"]]}
+        if g["type"] == "MultiPolygon":
+            return {"type": "MultiPolygon",
+                    "coordinates": [[pierscien(r) for r in poly] for poly in g["coordinates"]]}
+        return g
+
+    return {**gj, "features": [{**ft, "geometry": geometria(ft["geometry"])} for ft in gj["features"]]}
+
+def _geojson_poziomu(sciezka, gj, zoom):
+    """Uproszczony GeoJSON z cache (__cache__/<plik>.z<zoom>.<klucz>.json) lub policzony i zapisany."""
+    d = os.path.join(os.path.dirname(sciezka), "__cache__")
+    os.makedirs(d, exist_ok=True)
+    base = os.path.splitext(os.path.basename(sciezka))[0]
+    s = os.stat(sciezka)
+    opis = [WERSJA_GEOJSON, os.path.abspath(sciezka), s.st_size, s.st_mtime_ns, zoom]
+    plik = os.path.join(d, f"{base}.z{zoom}.{hashlib.sha1(json.dumps(opis).encode()).hexdigest()[:16]}.json")
+    try:
+        with open(plik, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): pass
+    for stary in glob.glob(glob.escape(os.path.join(d, f"{base}.z{zoom}.")) + "*"):
+        try: os.remove(stary)
+        except OSError: pass
+    tol = _tolerancja(zoom, _szerokosc(gj))
+    wynik = uprosc_geojson(gj, tol, miejsca=max(2, int(np.ceil(-np.log10(tol))) + 1))
+    def zapisz(t):
+        with open(t, "w", encoding="utf-8") as f:
+            json.dump(wynik, f, ensure_ascii=False, separators=(",", ":"))
+    try: _zapisz_atomowo(plik, zapisz)
+    except OSError: pass
+    return wynik
+
+def wczytaj_geojson(sciezka):
+    """
+    GeoJSON granic → {"geojson": pełny, "indeks": nazwa→id, "poziomy": zoom→uproszczony}.
+    Pusty dict, gdy pliku nie da się wczytać.
+    """
+    with pomiar("geojson", plik=os.path.basename(sciezka)) as s:
+        try:
+            with open(sciezka, "r", encoding="utf-8") as f:
+                gj = json.load(f)
+        except Exception as e:
+            zglos_blad(e)
+            return {}
+        s.wiersze = len(gj["features"])
+        return {"geojson": gj,
+                "indeks": {ft["properties"]["nazwa"]: ft["properties"]["id"] for ft in gj["features"]},
+                "poziomy": {z: _geojson_poziomu(sciezka, gj, z) for z in ZOOM_POZIOMY}}
+
+# Odcisk upraszczania – klucz cache poziomów GeoJSON
+WERSJA_GEOJSON = _odcisk_kodu(_tolerancja, _szerokosc, _pierscienie, _douglas_peucker, uprosc_geojson, ZOOM_POZIOMY)
+
+def geojson_dla_zoomu(mapa, zoom):
+    """Najprostszy poziom nie grubszy niż pół piksela przy danym zoomie – pierwszy poziom ≥ zoom
+    (zaokrąglenie w górę); zoom > ZOOM_POZIOMY[-1] → pełna geometria."""
+    poziomy = [z for z in ZOOM_POZIOMY if z >= zoom]
+    return mapa["poziomy"][poziomy[0]] if poziomy else mapa["geojson"]
+
+# ══════════════════════════════════════════════════════════
+# SQL – DuckDB w procesie nad tabelami Parquet zbiorów
+# ══════════════════════════════════════════════════════════
+# Widoki zwolnienia / bezrobocie / stopa_bezrobocia czytają __cache__/tabela.parquet
+# przy każdym zapytaniu – DuckDB przepycha projekcje i filtry do skanu Parquet,
+# więc zapytanie nie ładuje całych ramek do pamięci. Dostęp tylko do odczytu:
+# pojedyncze SELECT/EXPLAIN, system plików ograniczony do plików tabel.
+
+SQL_LIMIT = 10_000   # maks. wierszy wyniku w panelu aplikacji
+
+def polacz_sql(base_dir=BASE_DIR, odswiez=True):
+    """Połączenie DuckDB (in-memory) z widokiem na zbiór; odswiez – najpierw dociąga zmienione pliki."""
+    import duckdb
+    con = duckdb.connect()
+    tabele = []
+    for n, (sub, _, _) in ZBIORY.items():
+        folder = os.path.join(base_dir, "dane", sub)
+        if not os.path.isdir(folder): continue
+        if odswiez: _aktualizuj_tabele(n, folder, znajdz_pliki(folder))
+        pq = os.path.abspath(_tabela_path(folder))
+        if not os.path.exists(pq): continue
+        sciezka = pq.replace("'", "''")
+        con.execute(f"CREATE VIEW {n} AS SELECT * EXCLUDE (_plik) FROM read_parquet('{sciezka}')")
+        tabele.append(pq)
+    con.execute("SET allowed_paths = ?", [tabele])
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con
+
+def sql(zapytanie, parametry=None, base_dir=BASE_DIR, limit=None, odswiez=True):
+    """
+    Wynik zapytania SQL nad zbiorami jako DataFrame, np.
+    sql("SELECT Powiat, sum(Zwolnieni) FROM zwolnienia WHERE Rok = ? GROUP BY 1", [2025]).
+    ValueError, gdy to nie jest pojedyncze SELECT/EXPLAIN.
+    """
+    import duckdb
+    instrukcje = duckdb.extract_statements(zapytanie)
+    if len(instrukcje) != 1 or instrukcje[0].type not in (duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN):
+        raise ValueError("Dozwolone jest tylko pojedyncze zapytanie SELECT")
+    con = polacz_sql(base_dir, odswiez)
+    try:
+        rel = con.sql(zapytanie, params=parametry)
+        return (rel.limit(limit) if limit else rel).df()
+    finally:
+        con.close()
+
+def schemat_sql(base_dir=BASE_DIR):
+    """Widoki i ich kolumny (nazwa, typ) – do podpowiedzi w panelu SQL."""
+    con = polacz_sql(base_dir, odswiez=False)
+    try:
+        return {t: con.sql(f"DESCRIBE {t}").df()[["column_name","column_type"]]
+                for (t,) in con.sql("SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()}
+    finally:
+        con.close()
+
+# ══════════════════════════════════════════════════════════
+# MIGAWKA – najnowsze wartości jednostek i KPI Pulpitu
+# ══════════════════════════════════════════════════════════
+# Wiersz na (zbiór, jednostka, miara): ostatni okres jednostki, wartość, poprzedni
+# miesiąc i ten sam miesiąc rok wcześniej (braki, gdy tych okresów nie ma w danych)
+# oraz delty m/m i r/r. Liczona raz na wersję zbiorów – Pulpit nie skanuje historii.
+# KPI wskazane kodem/nazwą, nie dopasowaniem tekstu: w stopie GUS typ
+# "województwo" obejmuje wszystkie województwa i makroregiony PL9/PL91/PL92.
+
+MIGAWKA_MIARY = {"stopa_bezrobocia": ("Kod", ["Stopa","Bezrobotni_tys"]),
+                 "bezrobocie":       ("Region", ["Stan_koniec","Zarejestrowani","Wyrejestrowani"])}
+KPI_JEDNOSTKI = {"Mazowieckie": {"stopa_bezrobocia": "1400", "bezrobocie": "Mazowieckie"},
+                 "m. Warszawa": {"stopa_bezrobocia": "1465", "bezrobocie": "m. Warszawa"}}
+KPI_MIARY = {"Stopa": "stopa_bezrobocia", "Bezrobotni_tys": "stopa_bezrobocia", "Stan_koniec": "bezrobocie"}
+MIGAWKA_KOLUMNY = ["Zbiór","Klucz","Nazwa","Typ","Miara","Okres","Sort_key",
+                   "Wartość","Poprzednia","Rok_temu","Delta_mm","Delta_rr"]
+
+def _migawka_zbioru(nazwa, df):
+    klucz, miary = MIGAWKA_MIARY[nazwa]
+    d = pd.DataFrame({"Klucz": df[klucz].astype(str), "Nazwa": df["Nazwa" if "Nazwa" in df.columns else klucz].astype(str),
+                      "Typ": df["Typ"].astype(str), "Sort_key": df["Sort_key"], "Okres": df["Okres"].astype(str),
+                      **{m: df[m].astype("float64") for m in miary}})
+    d = d.sort_values("Sort_key", kind="stable").drop_duplicates(["Klucz","Sort_key"], keep="last")
+    d = d.melt(["Klucz","Nazwa","Typ","Sort_key","Okres"], miary, "Miara", "Wartość").dropna(subset=["Wartość"])
+    wartosci = d.set_index(["Klucz","Miara","Sort_key"])["Wartość"]
+    akt = d.drop_duplicates(["Klucz","Miara"], keep="last").reset_index(drop=True)
+    rok, mies = np.divmod(akt["Sort_key"].to_numpy(), 100)
+    for kol, sk in (("Poprzednia", np.where(mies == 1, (rok-1)*100 + 12, akt["Sort_key"] - 1)),
+                    ("Rok_temu", akt["Sort_key"] - 100)):
+        akt[kol] = wartosci.reindex(pd.MultiIndex.from_arrays([akt["Klucz"], akt["Miara"], sk])).to_numpy()
+    akt["Delta_mm"] = (akt["Wartość"] - akt["Poprzednia"]).round(2)
+    akt["Delta_rr"] = (akt["Wartość"] - akt["Rok_temu"]).round(2)
+    return akt.assign(Zbiór=nazwa)[MIGAWKA_KOLUMNY]
+
+def migawka(ramki):
+    """{zbiór: DataFrame} → tabela najnowszych wartości wszystkich jednostek (MIGAWKA_KOLUMNY)."""
+    czesci = [_migawka_zbioru(n, df) for n, df in ramki.items()
+              if n in MIGAWKA_MIARY and df is not None and not df.empty]
+    return pd.concat(czesci, ignore_index=True) if czesci else pd.DataFrame(columns=MIGAWKA_KOLUMNY)
+
+def kpi_najnowsze(tabela):
+    """Migawka → wiersze KPI Pulpitu (Jednostka + kolumny migawki), kolejność KPI_JEDNOSTKI × KPI_MIARY."""
+    klucze = pd.DataFrame([(j, KPI_MIARY[m], k[KPI_MIARY[m]], m) for j, k in KPI_JEDNOSTKI.items() for m in KPI_MIARY],
+                          columns=["Jednostka","Zbiór","Klucz","Miara"])
+    return klucze.merge(tabela, on=["Zbiór","Klucz","Miara"])
+
+# ══════════════════════════════════════════════════════════
+# EKSPORT – pliki do pobrania budowane na żądanie, paczkami
+# ══════════════════════════════════════════════════════════
+# Plik powstaje dopiero przy pobraniu i trafia do __cache__/eksport/<klucz>.<roz>;
+# klucz = format + arkusze + wersja (odcisk folderu, aktywne filtry) od wywołującego.
+
+FORMATY_EKSPORTU = {
+    "CSV":     ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "XLSX":    ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+EKSPORT_PACZKA = 20_000   # wierszy na paczkę zapisu
+EKSPORT_LIMIT = 20        # tyle ostatnich plików zostaje w cache
+
+def _paczki(df):
+    for i in range(0, max(len(df), 1), EKSPORT_PACZKA):
+        yield df.iloc[i:i+EKSPORT_PACZKA]
+
+def _zapisz_csv(ramki, t):
+    (df,) = ramki.values()
+    with open(t, "w", encoding="utf-8", newline="") as f:
+        for i, czesc in enumerate(_paczki(df)):
+            czesc.to_csv(f, index=False, header=i == 0)
+
+def _zapisz_parquet(ramki, t):
+    import pyarrow as pa, pyarrow.parquet as pq
+    (df,) = ramki.values()
+    schemat = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(t, schemat) as w:
+        for czesc in _paczki(df):
+            w.write_table(pa.Table.from_pandas(czesc, schema=schemat, preserve_index=False))
+
+def _zapisz_xlsx(ramki, t):
+    # write_only – wiersze idą prosto do pliku, pamięć nie rośnie z liczbą wierszy
+    wb = openpyxl.Workbook(write_only=True)
+    for arkusz, df in ramki.items():
+        ws = wb.create_sheet(str(arkusz)[:31])
+        ws.append([str(c) for c in df.columns])
+        for czesc in _paczki(df):
+            czesc = czesc.astype(object).where(czesc.notna(), None)
+            for wiersz in czesc.itertuples(index=False, name=None):
+                ws.append([v.item() if isinstance(v, np.generic) else v for v in wiersz])
+    wb.save(t)
+
+WERSJA_EKSPORTU = _odcisk_kodu(_paczki, _zapisz_csv, _zapisz_parquet, _zapisz_xlsx, EKSPORT_PACZKA)
+
+def eksportuj(ramki, fmt, wersja, katalog=None):
+    """
+    {arkusz: DataFrame} → ścieżka pliku eksportu w formacie fmt (klucz FORMATY_EKSPORTU).
+    CSV i Parquet przyjmują jedną ramkę, XLSX – dowolnie wiele (arkusz na ramkę).
+    Gotowy plik o tym samym kluczu (fmt, arkusze, wersja) jest używany ponownie.
+    """
+    roz, _ = FORMATY_EKSPORTU[fmt]
+    if fmt != "XLSX" and len(ramki) != 1:
+        raise ValueError(f"{fmt}: eksport jednej ramki, podano {len(ramki)}")
+    katalog = katalog or os.path.join(BASE_DIR, "__cache__", "eksport")
+    os.makedirs(katalog, exist_ok=True)
+    opis = repr([WERSJA_EKSPORTU, fmt, list(ramki), [df.shape for df in ramki.values()], wersja])
+    sciezka = os.path.join(katalog, f"{hashlib.sha1(opis.encode('utf-8')).hexdigest()[:16]}.{roz}")
+    if os.path.exists(sciezka):
+        os.utime(sciezka)
+        return sciezka
+    zapis = {"CSV": _zapisz_csv, "Parquet": _zapisz_parquet, "XLSX": _zapisz_xlsx}[fmt]
+    _zapisz_atomowo(sciezka, lambda t: zapis(ramki, t))
+    stare = sorted(glob.glob(os.path.join(katalog, "*.*")), key=os.path.getmtime)
+    for plik in stare[:-EKSPORT_LIMIT]:
+        try: os.remove(plik)
+        except OSError: pass
+    return sciezka
+
+# ══════════════════════════════════════════════════════════
+# SIATKA – filtr, sortowanie i okno wierszy po stronie serwera
+# ══════════════════════════════════════════════════════════
+
+def _maska_frazy(df, fraza):
+    """Wiersze, w których któraś kolumna tekstowa zawiera frazę (bez wielkości liter)."""
+    maska = np.zeros(len(df), dtype=bool)
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # Dopasowanie na kategoriach (kilkadziesiąt) zamiast na każdym wierszu
+            kat = s.cat.categories.astype(str)
+            maska |= s.isin(kat[kat.str.contains(fraza, case=False, regex=False)]).to_numpy()
+        elif s.dtype == object:
+            maska |= s.astype(str).str.contains(fraza, case=False, regex=False, na=False).to_numpy()
+    return maska
+
+def porzadek_wierszy(df, kolumna=None, rosnaco=True, fraza=""):
+    """Pozycje wierszy df po filtrze frazy i sortowaniu (stabilnym, braki na końcu)."""
+    poz = np.arange(len(df))
+    if fraza:
+        poz = poz[_maska_frazy(df, fraza)]
+    if kolumna is not None and len(poz):
+        s = df[kolumna].iloc[poz].reset_index(drop=True)
+        poz = poz[s.sort_values(ascending=rosnaco, kind="stable", na_position="last").index.to_numpy()]
+    return poz
+
+# ══════════════════════════════════════════════════════════
+# WYSZUKIWANIE FIRM – indeks trigramów po znormalizowanych nazwach
+# ══════════════════════════════════════════════════════════
+# Normalizacja: małe litery, bez polskich znaków (ł→l, reszta przez NFKD), bez
+# interpunkcji i form prawnych. Trigramy jak w pg_trgm (słowo z dopełnieniem
+# "  x "). Indeks obejmuje różne nazwy, nie wiersze – koszt zapytania nie rośnie
+# z liczbą rekordów. Ranking: pokrycie trigramów zapytania, potem podobieństwo.
+
+FORMY_PRAWNE = re.compile(r"(?<![a-z0-9])(" + "|".join([
+    r"spolka z ograniczona odpowiedzialnoscia", r"spolka komandytowo akcyjna", r"spolka akcyjna",
+    r"spolka (komandytowa|jawna|cywilna|partnerska)", r"sp(olka)? ?z ?o ?o", r"sp ?(k ?a|k|j|p)",
+    r"s ?a", r"s ?c", r"oddzial w polsce", r"gmbh", r"ltd", r"llp", r"plc", r"inc",
+]) + r")(?![a-z0-9])")
+WYSZUKIWANIE_PROG = 0.5   # min. część trigramów zapytania obecna w nazwie
+
+def normalizuj_nazwe(nazwa):
+    t = unicodedata.normalize("NFKD", str(nazwa).replace("ł", "l").replace("Ł", "L"))
+    t = "".join(c for c in t if not unicodedata.combining(c)).lower()
+    t = re.sub(r"[^0-9a-z]+", " ", t)
+    return " ".join(FORMY_PRAWNE.sub(" ", t).split())
+
+def _trigramy(tekst):
+    return {f"  {s} "[i:i+3] for s in tekst.split() for i in range(len(s)+1)}
+
+def indeks_nazw(nazwy):
+    nazwy = list(nazwy)
+    trigramy = [_trigramy(normalizuj_nazwe(n)) for n in nazwy]
+    listy = {}
+    for i, tg in enumerate(trigramy):
+        for t in tg: listy.setdefault(t, []).append(i)
+    return {"nazwy": nazwy, "trigramy": trigramy, "listy": listy}
+
+def szukaj_nazw(indeks, fraza, prog=WYSZUKIWANIE_PROG, limit=None):
+    """
+    Nazwy pasujące do frazy, od najlepszej. None, gdy fraza po normalizacji jest
+    pusta (np. sama forma prawna) – wtedy wyszukiwanie nie filtruje.
+    """
+    q = _trigramy(normalizuj_nazwe(fraza))
+    if not q: return None
+    trafienia = {}
+    for t in q:
+        for i in indeks["listy"].get(t, ()):
+            trafienia[i] = trafienia.get(i, 0) + 1
+    wyniki = []
+    for i, wspolne in trafienia.items():
+        pokrycie = wspolne / len(q)
+        if pokrycie >= prog:
+            podobienstwo = wspolne / len(q | indeks["trigramy"][i])
+            wyniki.append((-pokrycie, -podobienstwo, indeks["nazwy"][i]))
+    wyniki.sort()
+    return [n for _, _, n in wyniki[:limit]]
+
+# ══════════════════════════════════════════════════════════
+# KOSTKA ZWOLNIEŃ – agregaty liczone raz przy wczytaniu
+# ══════════════════════════════════════════════════════════
+# "firmy"   – (Okres, Powiat, PKD, PKD_opis, Nazwa) → sumy miar
+# "komorki" – (Okres, Powiat, PKD, PKD_opis)        → sumy miar + bitmapa firm
+# Bitmapa to int z bitem na kod kategorii Nazwa – OR komórek i bit_count() dają
+# dokładną liczbę różnych firm dla dowolnego filtru bez wracania do wierszy.
+# "indeks"  – poziom → wymiar → wartość → bitmapa wierszy (int, bit = pozycja):
+# filtr wielokrotnego wyboru to OR bitmap wybranych wartości, AND między wymiarami.
+# "opcje"   – posortowane listy wartości do filtrów strony.
+
+ZWOL_MIARY = list(ZWOL_LICZBY.values())
+KOSTKA_WYMIARY = ["Okres","Powiat","PKD","PKD_opis"]
+INDEKS_WYMIARY = ["Okres","Powiat","PKD","Nazwa"]
+
+def _bitmapa(kody):
+    m = 0
+    for k in kody:
+        if k >= 0: m |= 1 << int(k)
+    return m
+
+def _liczba_firm(bitmapy):
+    m = 0
+    for b in bitmapy: m |= b
+    return m.bit_count()
+
+def _indeks_bitmap(df):
+    """Wymiar → {wartość: bitmapa pozycji wierszy}; braki (NaN) nie trafiają do indeksu."""
+    indeks = {}
+    for kol in INDEKS_WYMIARY:
+        if kol not in df.columns: continue
+        s = df[kol]
+        kody = s.cat.codes.to_numpy()
+        poz = np.argsort(kody, kind="stable")
+        granice = np.flatnonzero(np.diff(kody[poz])) + 1
+        indeks[kol] = {}
+        for grupa in np.split(poz, granice):
+            if len(grupa) and kody[grupa[0]] >= 0:
+                bity = np.zeros(len(df), dtype=np.uint8); bity[grupa] = 1
+                indeks[kol][s.cat.categories[kody[grupa[0]]]] = int.from_bytes(
+                    np.packbits(bity, bitorder="little").tobytes(), "little")
+    return indeks
+
+def _maska_bitmap(indeks, n, filtry):
+    """{wymiar: wybrane wartości} → maska bool długości n (None = bez filtru wymiaru)."""
+    wynik = (1 << n) - 1
+    for kol, wartosci in filtry.items():
+        if wartosci is None: continue
+        b = 0
+        for v in wartosci: b |= indeks[kol].get(v, 0)
+        wynik &= b
+    bajty = np.frombuffer(wynik.to_bytes((n+7)//8, "little"), dtype=np.uint8)
+    return np.unpackbits(bajty, bitorder="little")[:n].astype(bool)
+
+def kostka_zwolnien(df):
+    if df.empty:
+        return {"firmy": df, "komorki": df, "indeks": {"firmy": {}, "komorki": {}}, "nazwy": indeks_nazw([]),
+                "opcje": {"okresy": [], "lata": [], "pkd": [], "firmy": [], "powiaty": []}}
+    g = df.groupby(KOSTKA_WYMIARY+["Nazwa"], observed=True, dropna=False, sort=False)
+    firmy = g[ZWOL_MIARY].sum().reset_index()
+    firmy["_kod"] = firmy["Nazwa"].cat.codes
+    g = firmy.groupby(KOSTKA_WYMIARY, observed=True, dropna=False, sort=False)
+    komorki = g[ZWOL_MIARY].sum()
+    komorki["_firmy"] = g["_kod"].agg(_bitmapa)
+    firmy, komorki = firmy.drop(columns="_kod"), komorki.reset_index()
+    opcje = {"okresy": list(df["Okres"].cat.categories), "lata": sorted(df["Rok"].unique()),
+             **{k: sorted(df[kol].dropna().unique()) for k, kol in
+                (("pkd","PKD"), ("firmy","Nazwa"), ("powiaty","Powiat"))}}
+    return {"firmy": firmy, "komorki": komorki, "opcje": opcje, "nazwy": indeks_nazw(opcje["firmy"]),
+            "indeks": {"firmy": _indeks_bitmap(firmy), "komorki": _indeks_bitmap(komorki)}}
+
+def wybierz_z_kostki(kostka, okresy=None, pkd=None, powiaty=None, firmy=None, szukane=None):
+    """
+    Filtr kostki (jak maska na wierszach zwolnień) przez indeks bitmap. szukane – wynik
+    szukaj_nazw (None = bez wyszukiwania). Przy filtrze firm (lista lub wyszukiwanie)
+    zostaje tylko poziom "firmy" (komorki=None).
+    """
+    filtry = {"Okres": okresy, "PKD": pkd or None, "Powiat": powiaty or None}
+    f = kostka["firmy"]
+    m = _maska_bitmap(kostka["indeks"]["firmy"], len(f), {**filtry, "Nazwa": firmy or None})
+    if szukane is not None: m &= _maska_bitmap(kostka["indeks"]["firmy"], len(f), {"Nazwa": szukane})
+    if firmy or szukane is not None:
+        return {"firmy": f[m], "komorki": None}
+    k = kostka["komorki"]
+    return {"firmy": f[m], "komorki": k[_maska_bitmap(kostka["indeks"]["komorki"], len(k), filtry)]}
+
+def agreguj_zwolnienia(wybor, by, miary=ZWOL_MIARY, firmy=False):
+    """Sumy miar w grupach by (+ kolumna Firmy – liczba różnych firm); by=[] → jeden wiersz."""
+    k = wybor["komorki"]
+    zrodlo = wybor["firmy"] if k is None or "Nazwa" in by else k
+    if not by:
+        wynik = zrodlo[miary].sum().to_frame().T
+        if firmy:
+            wynik["Firmy"] = (zrodlo["Nazwa"].nunique() if zrodlo is wybor["firmy"]
+                              else _liczba_firm(zrodlo["_firmy"]))
+        return wynik
+    g = zrodlo.groupby(by, observed=True)
+    wynik = g[miary].sum()
+    if firmy:
+        wynik["Firmy"] = g["Nazwa"].nunique() if zrodlo is wybor["firmy"] else g["_firmy"].agg(_liczba_firm)
+    return wynik.reset_index()
+
+# ══════════════════════════════════════════════════════════
+# KONWERSJA WSADOWA (--convert)
+# ══════════════════════════════════════════════════════════
+
+def _parsuj_zadanie(zadanie):
+    return _parsuj_plik(*zadanie)
+
+def konwertuj(base_dir=BASE_DIR, workers=None):
+    """Parsuje wszystkie pliki XLSX w puli procesów i zapisuje tabele Parquet per zbiór."""
+    foldery = {n: os.path.join(base_dir, "dane", sub) for n, (sub, _, _) in ZBIORY.items()}
+    pliki = {n: znajdz_pliki(f) for n, f in foldery.items() if os.path.isdir(f)}
+    # Największe pliki (MRPiPS-01) na początek kolejki – lepsze rozłożenie obciążenia
+    zadania = [(n, p) for n in pliki for p in pliki[n]]
+    zadania.sort(key=lambda z: -os.path.getsize(z[1]["sciezka"]))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        wyniki = dict(zip(((n, p["sciezka"]) for n, p in zadania),
+                          ex.map(_parsuj_zadanie, zadania, chunksize=1)))
+    podsumowanie = {}
+    for n, lista in pliki.items():
+        czesci, manifest = {}, {}
+        for p in lista:
+            b = os.path.basename(p["sciezka"])
+            df_p, blad = wyniki[(n, p["sciezka"])]
+            czesci[b] = _wiersze_pliku(df_p, p)
+            manifest[b] = {**_wpis_manifestu(p, wiersze=len(czesci[b])), "blad": blad}
+        surowa = _sklej(czesci, lista)
+        _zapisz_tabele(foldery[n], manifest, surowa)
+        with _blokada(foldery[n]):
+            _STAN.pop(foldery[n], None)
+        podsumowanie[n] = (len(lista), len(surowa), sum(1 for w in manifest.values() if w["blad"]))
+    return podsumowanie
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WUP Mazowieckie – konwersja XLSX → Parquet")
+    parser.add_argument("--convert", action="store_true", help="sparsuj wszystkie pliki i zapisz tabele Parquet")
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie: wszystkie rdzenie)")
+    parser.add_argument("--base-dir", default=BASE_DIR, help="folder zawierający dane/")
+    parser.add_argument("--memory", action="store_true", help="raport zajętości pamięci ramek (przed/po schemacie)")
+    parser.add_argument("--sql", metavar="ZAPYTANIE", help="wykonaj zapytanie SELECT (DuckDB) i wypisz wynik")
+    args = parser.parse_args(argv)
+    if not (args.convert or args.memory or args.sql):
+        parser.print_help()
+        return 1
+    if args.convert:
+        t0 = time.perf_counter()
+        for n, (n_plikow, n_wierszy, n_bledow) in konwertuj(args.base_dir, args.workers).items():
+            print(f"{n:<18} {n_plikow:>3} plików  {n_wierszy:>7,} wierszy"
+                  + (f"  {n_bledow} nieudanych (ponowione przy odświeżeniu)" if n_bledow else ""))
+        print(f"Gotowe w {time.perf_counter()-t0:.1f} s")
+    if args.memory:
+        ramki = {n: LOADERY[n](os.path.join(args.base_dir, "dane", sub))
+                 for n, (sub, _, _) in ZBIORY.items() if os.path.isdir(os.path.join(args.base_dir, "dane", sub))}
+        print(raport_pamieci(ramki).to_string(index=False))
+    if args.sql:
+        print(sql(args.sql, base_dir=args.base_dir).to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())